@@ -7,14 +7,27 @@ import time
 import json
 import logging
 import random
-from typing import Dict, Any, Optional, Tuple, List
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Tuple, List, Callable
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
+from rate_limiter import RateLimiter
+from circuit_breaker import CircuitBreaker, CIRCUIT_OPEN_ERROR
+from cassette import CassetteStore, CASSETTE_OFF, CASSETTE_RECORD, CASSETTE_REPLAY
+from latency import LatencyRecorder, latency_recorder
+from content_hash import raw_hasher, canonical_hash
+from response_cache import ResponseCache, UNCACHED_ENDPOINTS, cache_key
+from retry_queue import RetryBudget, RetryQueue, RetryLater, deferred_retries, retries_deferred
+from comparison_stage import ComparisonStage
 from config import (
-    API_IMPL1, API_IMPL2, REQUEST_TIMEOUT, MAX_RETRIES, RETRY_DELAY, OUTPUT_DIR,
-    INITIAL_BACKOFF, MAX_BACKOFF, BACKOFF_FACTOR, REQUEST_DELAY
+    API_IMPL1, API_IMPL2, REQUEST_TIMEOUT, MAX_RETRIES, OUTPUT_DIR,
+    INITIAL_BACKOFF, MAX_BACKOFF, BACKOFF_FACTOR, MAX_CONCURRENT_REQUESTS,
+    CONCURRENT_MODE, CONCURRENT_PAGES, API1_CASSETTE_MODE, DEFAULT_LIMIT, LARGE_PAGES,
+    RESPONSE_CACHE_SIZE, DERIVE_DETAILS, COMPARISON_PROCESSES
 )
 
 # Set up logging
@@ -24,6 +37,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger('api_client')
 
+# Bytes read from a response body at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
 # Ensure output directory exists
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -31,25 +47,68 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 class ApiResponse:
     """Class to represent an API response with status code and body."""
     
-    def __init__(self, status_code: int, body: Any, headers: Dict[str, str] = None, error: str = None):
+    def __init__(self, status_code: int, body: Any, headers: Dict[str, str] = None, error: str = None,
+                 elapsed: float = None, ttfb: float = None, size: int = None, body_hash: str = None):
+        """
+        Args:
+            status_code: HTTP status code (0 if the request failed)
+            body: Parsed JSON body, or the raw text if it isn't JSON
+            headers: Response headers
+            error: Error message if the request failed
+            elapsed: Total request time in seconds
+            ttfb: Time to first byte (response headers received) in seconds
+            size: Response body size in bytes
+            body_hash: Hash of the raw body bytes as received (None if the
+                body didn't come over the network)
+        """
         self.status_code = status_code
         self.body = body
         self.headers = headers or {}
         self.error = error
+        self.elapsed = elapsed
+        self.ttfb = ttfb
+        self.size = size
+        self.body_hash = body_hash
+        self._canonical_hash = None
     
     def is_success(self) -> bool:
         """Check if the response was successful (status code 2xx)."""
         return 200 <= self.status_code < 300
     
+    def is_blocked(self) -> bool:
+        """Check if the request was refused by an open circuit breaker without being sent."""
+        return self.status_code == 0 and self.error == CIRCUIT_OPEN_ERROR
+    
+    def canonical_hash(self) -> str:
+        """Order-insensitive hash of the parsed body (see content_hash.canonical_hash), computed once."""
+        if self._canonical_hash is None:
+            self._canonical_hash = canonical_hash(self.body)
+        return self._canonical_hash
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert the response to a dictionary."""
         return {
             'status_code': self.status_code,
             'body': self.body,
             'headers': self.headers,
-            'error': self.error
+            'error': self.error,
+            'elapsed': self.elapsed,
+            'ttfb': self.ttfb,
+            'size': self.size,
+            'body_hash': self.body_hash
         }
     
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ApiResponse':
+        """Create a response from a dictionary produced by to_dict."""
+        return cls(
+            status_code=data['status_code'],
+            body=data.get('body'),
+            headers=data.get('headers'),
+            error=data.get('error'),
+            body_hash=data.get('body_hash')
+        )
+    
     def __str__(self) -> str:
         """String representation of the response."""
         return f"ApiResponse(status_code={self.status_code}, error={self.error})"
@@ -58,127 +117,592 @@ class ApiResponse:
 class ApiClient:
     """Client for making requests to the Sunnah.com API."""
     
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, rate_limit: Optional[float] = None,
+                 cassette_mode: str = CASSETTE_OFF, cassette: Optional[CassetteStore] = None,
+                 name: str = None, latency: Optional[LatencyRecorder] = None,
+                 cache: Optional[ResponseCache] = None, retry_budget: Optional[RetryBudget] = None):
+        """
+        Args:
+            base_url: Base URL of the API implementation
+            api_key: API key sent in the X-API-Key header
+            rate_limit: Maximum requests per second to this host (None for no limit)
+            cassette_mode: 'record' to save every response to the cassette store,
+                'replay' to serve responses from it without network access,
+                'off' to do neither
+            cassette: Cassette store to use (defaults to CASSETTE_DIR when a
+                cassette mode is enabled)
+            name: Name of the implementation in latency statistics (e.g. 'API1')
+            latency: Recorder that receives the timing of every live response
+            cache: Response cache for the run (None to always fetch)
+            retry_budget: Retry budget for the run (None to retry every
+                request up to MAX_RETRIES attempts)
+        """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
+        self.rate_limiter = RateLimiter(rate_limit, name=self.base_url)
+        self.circuit_breaker = CircuitBreaker(name=self.base_url)
+        self.cassette_mode = cassette_mode
+        self.cassette = cassette
+        if cassette_mode != CASSETTE_OFF and cassette is None:
+            self.cassette = CassetteStore()
+        self.name = name or self.base_url
+        self.latency = latency
+        self.cache = cache
+        self.retry_budget = retry_budget
+        # Attempts made so far at requests whose retry was deferred, by cache key
+        self._deferred_attempts: Dict[tuple, int] = {}
+        self._deferred_lock = threading.Lock()
         self.session = requests.Session()
+        # Size the connection pool so concurrent comparisons don't discard connections
+        adapter = HTTPAdapter(pool_maxsize=max(MAX_CONCURRENT_REQUESTS, 10))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'X-API-Key': api_key,
             'Accept': 'application/json'
         })
     
-    def get(self, endpoint: str, params: Dict[str, Any] = None) -> ApiResponse:
+    def get(self, endpoint: str, params: Dict[str, Any] = None, use_cache: bool = True,
+            defer: Optional[bool] = None) -> ApiResponse:
         """
-        Make a GET request to the API.
+        Make a GET request to the API, waiting for any retries.
+        
+        Responses already fetched in this run are served from the response
+        cache, and identical requests in flight share one fetch. In replay
+        mode the response is served from the cassette store; in record mode
+        the live response is also written to it.
+        
+        Rate limits (429), 5xx responses and network errors are retried with
+        exponential backoff (see retry_delay). Requests refused by an open
+        circuit breaker are re-queued until the circuit half-opens, and are
+        only returned blocked once it has been open for CIRCUIT_MAX_OPEN_TIME.
+        
+        With deferred retries (see retry_queue.deferred_retries) RetryLater is
+        raised instead of waiting, so that batches (ApiComparisonClient.map)
+        and the streaming crawl can do other work until the retry is due. The
+        attempts made so far are remembered for when the request is made again.
         
         Args:
             endpoint: The API endpoint (without the base URL)
             params: Query parameters to include in the request
+            use_cache: Set to False to always make a new request
+            defer: Raise RetryLater instead of waiting (defaults to whether
+                retries are deferred in the current thread)
             
         Returns:
             ApiResponse object containing the response data
+            
+        Raises:
+            RetryLater: If a retry is needed and retries are deferred
         """
+        if defer is None:
+            defer = retries_deferred()
+        key = cache_key(self.name, endpoint, params) if defer else None
+        attempt = 0
+        if defer:
+            with self._deferred_lock:
+                attempt = self._deferred_attempts.pop(key, 0)
+        
+        while True:
+            response = self.try_get(endpoint, params, use_cache)
+            wait_time = self.retry_delay(endpoint, response, attempt)
+            if wait_time is None:
+                return response
+            
+            if not response.is_blocked():
+                attempt += 1
+            if defer:
+                with self._deferred_lock:
+                    self._deferred_attempts[key] = attempt
+                raise RetryLater(wait_time)
+            time.sleep(wait_time)
+    
+    def try_get(self, endpoint: str, params: Dict[str, Any] = None, use_cache: bool = True) -> ApiResponse:
+        """Make a single attempt at a GET request (see get), without retrying."""
+        if self.cache is None or not use_cache or endpoint.strip('/') in UNCACHED_ENDPOINTS:
+            return self._fetch(endpoint, params)
+        
+        return self.cache.get_or_fetch(
+            cache_key(self.name, endpoint, params),
+            lambda: self._fetch(endpoint, params),
+            # Don't hold on to failures that a later request might not hit
+            cacheable=lambda response: response.status_code not in (0, 429) and response.status_code < 500
+        )
+    
+    def retry_delay(self, endpoint: str, response: ApiResponse, attempt: int) -> Optional[float]:
+        """
+        Decide whether and when to retry a request.
+        
+        429s, 5xx responses and network errors are retried up to MAX_RETRIES
+        attempts in all, while the run's retry budget lasts. The wait is the
+        Retry-After header of a 429 if it has one, otherwise exponential
+        backoff with jitter. Requests blocked by the circuit breaker are
+        retried once it half-opens, without using up attempts or budget.
+        
+        Args:
+            endpoint: The API endpoint (for log messages)
+            response: The response to the latest attempt
+            attempt: Number of earlier attempts, not counting blocked ones
+            
+        Returns:
+            Seconds to wait before retrying, or None to keep the response
+        """
+        if self.cassette_mode == CASSETTE_REPLAY:
+            return None
+        
+        if response.is_blocked():
+            if self.circuit_breaker.gave_up:
+                return None
+            wait_time = self.circuit_breaker.retry_after()
+            logger.info(f"Circuit for {self.base_url} is open, re-queuing {endpoint} in {wait_time:.1f} seconds")
+            return wait_time
+        
+        if response.status_code not in (0, 429) and response.status_code < 500:
+            return None
+        if attempt + 1 >= MAX_RETRIES or (self.retry_budget and not self.retry_budget.take()):
+            return None
+        
+        retry_after = response.headers.get('Retry-After')
+        if response.status_code == 429 and retry_after and retry_after.isdigit():
+            # If Retry-After header is present and is a number, use it
+            wait_time = int(retry_after)
+        else:
+            # Otherwise use exponential backoff with jitter
+            wait_time = min(INITIAL_BACKOFF * BACKOFF_FACTOR ** attempt + random.uniform(0, 1), MAX_BACKOFF)
+        
+        reason = 'Rate limited' if response.status_code == 429 else f'Request failed ({response.error or response.status_code})'
+        logger.warning(f"{reason} for {endpoint} (attempt {attempt + 1}/{MAX_RETRIES}). "
+                       f"Retrying in {wait_time:.2f} seconds.")
+        return wait_time
+    
+    def _fetch(self, endpoint: str, params: Dict[str, Any] = None) -> ApiResponse:
+        """Get a response from the cassette store or the network."""
+        if self.cassette_mode == CASSETTE_REPLAY:
+            return self._replay(endpoint, params)
+        
+        response = self._get_live(endpoint, params)
+        
+        # Network failures and exhausted rate limits are not worth replaying
+        if self.cassette_mode == CASSETTE_RECORD and response.status_code not in (0, 429):
+            self.cassette.save(endpoint, params, response.to_dict())
+        
+        return response
+    
+    def _replay(self, endpoint: str, params: Dict[str, Any] = None) -> ApiResponse:
+        """Serve a response from the cassette store."""
+        recorded = self.cassette.load(endpoint, params)
+        if recorded is None:
+            logger.warning(f"No recorded response for {endpoint} with params {params}")
+            return ApiResponse(
+                status_code=0,
+                body=None,
+                error="No recorded response (replay mode)"
+            )
+        
+        logger.info(f"Replaying recorded response for {self.base_url}/{endpoint.lstrip('/')}")
+        return ApiResponse.from_dict(recorded)
+    
+    def _get_live(self, endpoint: str, params: Dict[str, Any] = None) -> ApiResponse:
+        """Make a single GET request over the network; retrying is up to the caller."""
+        # Fail fast while the server is known to be down
+        if not self.circuit_breaker.allow_request():
+            return ApiResponse(
+                status_code=0,
+                body=None,
+                error=CIRCUIT_OPEN_ERROR
+            )
+        
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         logger.info(f"Making GET request to {url}")
         
-        backoff_time = INITIAL_BACKOFF
+        self.rate_limiter.acquire()
+        try:
+            # Stream so that the headers arrive before the body is read,
+            # which separates time to first byte from the total time
+            start_time = time.perf_counter()
+            response = self.session.get(
+                url,
+                params=params,
+                timeout=REQUEST_TIMEOUT,
+                stream=True
+            )
+            ttfb = time.perf_counter() - start_time
+            # Hash the raw bytes as they arrive, so identical bodies can be
+            # recognised without comparing them
+            hasher = raw_hasher()
+            chunks = []
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+                chunks.append(chunk)
+            content = b''.join(chunks)
+            size = len(content)
+            elapsed = time.perf_counter() - start_time
+        except RequestException as e:
+            self.circuit_breaker.on_failure()
+            logger.warning(f"Request to {url} failed: {str(e)}")
+            return ApiResponse(
+                status_code=0,
+                body=None,
+                error=str(e)
+            )
         
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = self.session.get(
-                    url,
-                    params=params,
-                    timeout=REQUEST_TIMEOUT
-                )
-                
-                # Try to parse JSON response
-                try:
-                    body = response.json() if response.text else None
-                except ValueError:
-                    body = response.text
-                
-                # Check if we're being rate limited
-                if response.status_code == 429:
-                    # Get retry-after header if available
-                    retry_after = response.headers.get('Retry-After')
-                    
-                    if retry_after and retry_after.isdigit():
-                        # If Retry-After header is present and is a number, use it
-                        wait_time = int(retry_after)
-                    else:
-                        # Otherwise use exponential backoff with jitter
-                        wait_time = min(backoff_time + random.uniform(0, 1), MAX_BACKOFF)
-                        backoff_time *= BACKOFF_FACTOR
-                    
-                    logger.warning(f"Rate limited (attempt {attempt + 1}/{MAX_RETRIES}). Waiting {wait_time:.2f} seconds before retry.")
-                    time.sleep(wait_time)
-                    continue
-                
-                # Return response for non-rate-limit errors or successful responses
-                return ApiResponse(
-                    status_code=response.status_code,
-                    body=body,
-                    headers=dict(response.headers)
-                )
-            
-            except RequestException as e:
-                logger.warning(f"Request failed (attempt {attempt + 1}/{MAX_RETRIES}): {str(e)}")
-                if attempt < MAX_RETRIES - 1:
-                    # Use exponential backoff with jitter for network errors too
-                    wait_time = min(backoff_time + random.uniform(0, 1), MAX_BACKOFF)
-                    logger.info(f"Waiting {wait_time:.2f} seconds before retry.")
-                    time.sleep(wait_time)
-                    backoff_time *= BACKOFF_FACTOR
-                else:
-                    return ApiResponse(
-                        status_code=0,
-                        body=None,
-                        error=str(e)
-                    )
+        # Try to parse JSON response
+        text = content.decode(response.encoding or 'utf-8', errors='replace')
+        try:
+            body = json.loads(text) if text else None
+        except ValueError:
+            body = text
+        
+        if response.status_code >= 500:
+            self.circuit_breaker.on_failure()
+        else:
+            self.circuit_breaker.on_success()
+        
+        # Slow down on rate limits; only unthrottled responses are timed
+        if response.status_code == 429:
+            self.rate_limiter.on_throttle()
+        else:
+            self.rate_limiter.on_success()
+            if self.latency:
+                self.latency.record(self.name, endpoint, elapsed, ttfb, size)
         
-        # If we've exhausted all retries and still getting rate limited
         return ApiResponse(
-            status_code=429,
-            body=None,
-            error="Rate limit exceeded after maximum retries"
+            status_code=response.status_code,
+            body=body,
+            headers=dict(response.headers),
+            elapsed=elapsed,
+            ttfb=ttfb,
+            size=size,
+            body_hash=hasher.hexdigest()
         )
 
 
+class _PendingComparison:
+    """A comparison in compare_get_many, with the responses received so far."""
+    
+    def __init__(self, index: int, endpoint: str, params: Optional[Dict[str, Any]]):
+        self.index = index
+        self.endpoint = endpoint
+        self.params = params
+        self.responses: List[Optional[ApiResponse]] = [None, None]
+        self.attempts = [0, 0]
+
+
 class ApiComparisonClient:
     """Client for comparing responses from two API implementations."""
     
-    def __init__(self):
-        self.api1 = ApiClient(API_IMPL1['base_url'], API_IMPL1['api_key'])
-        self.api2 = ApiClient(API_IMPL2['base_url'], API_IMPL2['api_key'])
+    def __init__(self, concurrent: bool = CONCURRENT_MODE, max_workers: int = MAX_CONCURRENT_REQUESTS,
+                 cassette_mode: str = API1_CASSETTE_MODE, concurrent_pages: bool = CONCURRENT_PAGES,
+                 large_pages: bool = LARGE_PAGES, cache_size: int = RESPONSE_CACHE_SIZE,
+                 derive_details: bool = DERIVE_DETAILS, comparison_processes: int = COMPARISON_PROCESSES):
+        """
+        Args:
+            concurrent: If True, request both APIs at the same time and run
+                batches of comparisons in parallel
+            max_workers: Maximum number of comparisons in flight at once
+            cassette_mode: Record/replay mode for API1 ('off', 'record' or 'replay');
+                API2 is always requested live
+            concurrent_pages: If True, compare_pages runs in parallel even
+                when concurrent is False
+            large_pages: If True, list endpoints are requested with large
+                pages and compared in DEFAULT_LIMIT windows (see pagination.py)
+            cache_size: Number of responses the run-wide response cache holds
+                (0 disables it)
+            derive_details: If True, detail endpoints are compared against
+                API1 list data instead of API1 requests (see derived_details.py)
+            comparison_processes: Number of worker processes that compare
+                responses while fetching goes on (0 to compare in the
+                fetching threads)
+        """
+        # One cache for both implementations (keys include the implementation)
+        self.cache = ResponseCache(cache_size) if cache_size > 0 else None
+        # Likewise one retry budget, so the run as a whole can't retry forever
+        self.retry_budget = RetryBudget()
+        self.api1 = ApiClient(API_IMPL1['base_url'], API_IMPL1['api_key'], API_IMPL1.get('rate_limit'),
+                              cassette_mode=cassette_mode, name='API1', latency=latency_recorder,
+                              cache=self.cache, retry_budget=self.retry_budget)
+        self.api2 = ApiClient(API_IMPL2['base_url'], API_IMPL2['api_key'], API_IMPL2.get('rate_limit'),
+                              name='API2', latency=latency_recorder, cache=self.cache,
+                              retry_budget=self.retry_budget)
+        self.concurrent = concurrent
+        self.concurrent_pages = concurrent_pages
+        self.large_pages = large_pages
+        self.derive_details = derive_details
+        self.max_workers = max_workers
+        self.comparisons = ComparisonStage(comparison_processes)
+        
+        # Two separate pools: comparison workers block on API2 requests, so
+        # sharing one pool could deadlock once every worker is waiting
+        self._comparison_executor = None
+        self._request_executor = None
+        if concurrent or concurrent_pages:
+            self._comparison_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='compare'
+            )
+        if concurrent:
+            self._request_executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='api2'
+            )
     
-    def compare_get(self, endpoint: str, params: Dict[str, Any] = None) -> Tuple[ApiResponse, ApiResponse]:
+    def compare_get(self, endpoint: str, params: Dict[str, Any] = None,
+                    use_cache: bool = True) -> Tuple[ApiResponse, ApiResponse]:
         """
         Make GET requests to both API implementations and return the responses.
         
         Args:
             endpoint: The API endpoint (without the base URL)
             params: Query parameters to include in the request
+            use_cache: Set to False to bypass the response cache
             
         Returns:
             Tuple of (api1_response, api2_response)
         """
         logger.info(f"Comparing GET {endpoint} with params {params}")
         
+        if self.concurrent:
+            # Send both requests at the same time; each client paces itself
+            # through its own rate limiter
+            future2 = self._request_executor.submit(self.api2.get, endpoint, params, use_cache,
+                                                    retries_deferred())
+            try:
+                response1 = self.api1.get(endpoint, params, use_cache)
+            except RetryLater as e:
+                # Let API2's request finish, so a re-run finds its response in the cache
+                try:
+                    future2.result()
+                except RetryLater as e2:
+                    raise RetryLater(max(e.delay, e2.delay))
+                raise
+            response2 = future2.result()
+            logger.info(f"API1 response: {response1.status_code}, API2 response: {response2.status_code}")
+            return response1, response2
+        
         # Make request to first API
-        response1 = self.api1.get(endpoint, params)
+        response1 = self.api1.get(endpoint, params, use_cache)
         logger.info(f"API1 response: {response1.status_code}")
         
-        # Add a delay between requests to avoid hitting rate limits
-        # This is especially important if both APIs are actually the same server
-        # but with different endpoints
-        time.sleep(REQUEST_DELAY)
-        
         # Make request to second API
-        response2 = self.api2.get(endpoint, params)
+        response2 = self.api2.get(endpoint, params, use_cache)
         logger.info(f"API2 response: {response2.status_code}")
         
         return response1, response2
     
+    def compare_get_many(self, requests_list: List[Tuple[str, Optional[Dict[str, Any]]]],
+                         compare: Callable[..., Any] = None, concurrent: bool = None,
+                         use_cache: bool = True) -> List[Any]:
+        """
+        Make GET requests to both API implementations for several endpoints.
+        
+        In concurrent mode up to max_workers comparisons run in parallel,
+        otherwise the endpoints are requested one after another. A request
+        that has to be retried (see ApiClient.retry_delay) goes to a delayed
+        retry queue, and the other endpoints are requested in the meantime.
+        
+        Args:
+            requests_list: List of (endpoint, params) tuples
+            compare: Optional function called as compare(response1, response2,
+                endpoint, params) as soon as each pair of responses arrives,
+                on the comparison stage (see compare)
+            concurrent: Overrides the client's concurrent mode for this batch
+            use_cache: Set to False to bypass the response cache
+            
+        Returns:
+            List of (api1_response, api2_response) tuples, or of compare
+            results if compare is given, in the same order as requests_list
+        """
+        if concurrent is None:
+            concurrent = self.concurrent
+        
+        results = [None] * len(requests_list)
+        comparisons = [_PendingComparison(index, endpoint, params)
+                       for index, (endpoint, params) in enumerate(requests_list)]
+        
+        def finish(comparison: _PendingComparison) -> None:
+            response1, response2 = comparison.responses
+            logger.info(f"API1 response: {response1.status_code}, API2 response: {response2.status_code}")
+            if compare is None:
+                results[comparison.index] = (response1, response2)
+            else:
+                # Keep fetching while the comparison runs
+                results[comparison.index] = self.comparisons.submit(
+                    compare, response1, response2, comparison.endpoint, comparison.params
+                )
+        
+        self._run_queue(comparisons, lambda comparison: self._attempt(comparison, use_cache), finish, concurrent)
+        
+        if compare is not None:
+            results = [future.result() for future in results]
+        return results
+    
+    def _run_queue(self, items: List[Any], attempt: Callable[[Any], Optional[float]],
+                   finish: Callable[[Any], None], concurrent: bool) -> None:
+        """
+        Attempt every item, with a delayed retry queue for the items that must wait.
+        
+        Args:
+            items: The items, attempted in order
+            attempt: Called as attempt(item), on the comparison workers in
+                concurrent mode; returns seconds to wait before attempting the
+                item again, or None once the item is done
+            finish: Called as finish(item) in the calling thread once the item is done
+            concurrent: Attempt up to max_workers items at once
+        """
+        executor = self._comparison_executor if concurrent else None
+        max_in_flight = self.max_workers if executor else 1
+        
+        ready = list(reversed(items))
+        retries = RetryQueue()
+        in_flight: Dict[Future, Any] = {}
+        
+        while ready or retries or in_flight:
+            ready.extend(reversed(retries.pop_due()))
+            while ready and len(in_flight) < max_in_flight:
+                item = ready.pop()
+                if executor:
+                    future = executor.submit(attempt, item)
+                else:
+                    future = Future()
+                    try:
+                        future.set_result(attempt(item))
+                    except Exception as e:
+                        future.set_exception(e)
+                in_flight[future] = item
+            
+            if not in_flight:
+                time.sleep(retries.wait_time())
+                continue
+            
+            done, _ = wait(in_flight, timeout=retries.wait_time(), return_when=FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                wait_time = future.result()
+                if wait_time is not None:
+                    retries.push(item, wait_time)
+                else:
+                    finish(item)
+    
+    def compare(self, compare: Callable[..., Any], response1: ApiResponse, response2: ApiResponse,
+                endpoint: str, params: Dict[str, Any] = None) -> Any:
+        """
+        Run a comparison on the comparison stage and wait for its result.
+        
+        With comparison_processes the comparison runs in a worker process,
+        so other threads can go on fetching in the meantime.
+        
+        Args:
+            compare: Module-level function called as compare(response1,
+                response2, endpoint, params), e.g. compare_responses
+            response1: API1 response
+            response2: API2 response
+            endpoint: The API endpoint (for reporting)
+            params: Query parameters (for reporting)
+            
+        Returns:
+            The result of compare
+        """
+        return self.comparisons.submit(compare, response1, response2, endpoint, params).result()
+    
+    def _attempt(self, comparison: '_PendingComparison', use_cache: bool = True) -> Optional[float]:
+        """
+        Make one attempt at the missing responses of a comparison.
+        
+        Returns:
+            Seconds to wait before the next attempt, or None once both
+            responses are final
+        """
+        clients = (self.api1, self.api2)
+        missing = [i for i, response in enumerate(comparison.responses) if response is None]
+        logger.info(f"Comparing GET {comparison.endpoint} with params {comparison.params}")
+        
+        if self.concurrent and len(missing) == 2:
+            future2 = self._request_executor.submit(self.api2.try_get, comparison.endpoint,
+                                                    comparison.params, use_cache)
+            comparison.responses[0] = self.api1.try_get(comparison.endpoint, comparison.params, use_cache)
+            comparison.responses[1] = future2.result()
+        else:
+            for i in missing:
+                comparison.responses[i] = clients[i].try_get(comparison.endpoint, comparison.params, use_cache)
+        
+        wait_time = None
+        for i in missing:
+            response = comparison.responses[i]
+            delay = clients[i].retry_delay(comparison.endpoint, response, comparison.attempts[i])
+            if delay is None:
+                continue
+            # Only the failed side is requested again
+            comparison.responses[i] = None
+            if not response.is_blocked():
+                comparison.attempts[i] += 1
+            wait_time = max(wait_time or 0.0, delay)
+        return wait_time
+    
+    def map(self, function: Callable[[Any], Any], items: List[Any], concurrent: bool = None) -> List[Any]:
+        """
+        Apply function to every item, on the comparison workers in concurrent mode.
+        
+        function runs with deferred retries: when one of its requests has to
+        be retried, the item goes to the delayed retry queue and function is
+        called for it again once the retry is due, while the other items go
+        ahead. Responses it already received come from the response cache on
+        the second call, so only the failed request is made again.
+        
+        Args:
+            function: Function to apply (typically making comparison requests)
+            items: The items
+            concurrent: Overrides the client's concurrent mode for this batch
+            
+        Returns:
+            The results, in the same order as items
+        """
+        if concurrent is None:
+            concurrent = self.concurrent
+        
+        results = [None] * len(items)
+        
+        def attempt(index: int) -> Optional[float]:
+            try:
+                with deferred_retries():
+                    results[index] = function(items[index])
+            except RetryLater as e:
+                return e.delay
+            return None
+        
+        self._run_queue(list(range(len(items))), attempt, lambda index: None,
+                        concurrent and self._comparison_executor is not None)
+        return results
+    
+    def compare_pages(self, endpoint: str, pages: int, compare: Callable[..., Any],
+                      first_page: int = 2, limit: int = DEFAULT_LIMIT) -> List[Any]:
+        """
+        Request and compare a range of pages of a list endpoint.
+        
+        The page URLs are known up front (from the first page's total), so
+        with concurrent_pages the pages are fetched and compared in parallel;
+        API1 requests are still paced by its rate limiter.
+        
+        Args:
+            endpoint: The API endpoint (without the base URL)
+            pages: The last page number
+            compare: Called as compare(response1, response2, endpoint, params)
+                for each page as soon as its responses arrive
+            first_page: The first page number
+            limit: Page size
+            
+        Returns:
+            The compare results, in page order
+        """
+        requests_list = [(endpoint, {'page': page, 'limit': limit}) for page in range(first_page, pages + 1)]
+        if requests_list:
+            logger.info(f"Comparing GET {endpoint} pages {first_page}-{pages}")
+        return self.compare_get_many(requests_list, compare, concurrent=self.concurrent or self.concurrent_pages)
+    
+    def close(self) -> None:
+        """Shut down the worker pools used in concurrent mode and the comparison processes."""
+        for executor in (self._comparison_executor, self._request_executor):
+            if executor:
+                executor.shutdown(wait=True)
+        self.comparisons.close()
+    
     def save_responses(self, endpoint: str, params: Dict[str, Any], 
                       response1: ApiResponse, response2: ApiResponse) -> None:
         """
@@ -224,46 +748,67 @@ def extract_data_from_paginated_response(response: ApiResponse) -> List[Dict[str
     return [response.body] if isinstance(response.body, dict) else []
 
 
+def _page_count(response: ApiResponse, limit: int) -> Optional[int]:
+    """Number of pages according to a paginated response's total, if it has one."""
+    if not isinstance(response.body, dict) or not isinstance(response.body.get('total'), int):
+        return None
+    limit = response.body.get('limit') or limit
+    return (response.body['total'] + limit - 1) // limit
+
+
 def get_all_pages(client: ApiClient, endpoint: str, 
-                 base_params: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+                 base_params: Dict[str, Any] = None,
+                 max_workers: int = MAX_CONCURRENT_REQUESTS) -> List[Dict[str, Any]]:
     """
     Get all pages of a paginated API endpoint.
     
+    Once the first page has given the total, the remaining pages are fetched
+    in parallel; without a total the 'next' links are followed one by one.
+    
     Args:
         client: The API client
         endpoint: The API endpoint
         base_params: Base query parameters
+        max_workers: Maximum number of pages requested at once
         
     Returns:
-        List of all data items across all pages
+        List of all data items across all pages, in page order
     """
-    all_items = []
-    page = 1
-    has_more = True
+    def get_page(page: int) -> ApiResponse:
+        return client.get(endpoint, {**(base_params or {}), 'page': page})
     
-    while has_more:
-        params = {**(base_params or {}), 'page': page}
-        response = client.get(endpoint, params)
-        
-        # If we got rate limited even after retries, log and break
+    def check(page: int, response: ApiResponse) -> bool:
+        # If we got rate limited even after retries, log and stop
         if response.status_code == 429:
             logger.error(f"Rate limit exceeded for page {page} of {endpoint} after maximum retries")
-            break
-        # For other errors, log and break
+            return False
+        # For other errors, log and stop
         elif not response.is_success():
             logger.error(f"Failed to get page {page} of {endpoint}: {response.error or response.status_code}")
+            return False
+        return True
+    
+    response = get_page(1)
+    if not check(1, response):
+        return []
+    all_items = list(extract_data_from_paginated_response(response))
+    
+    pages = _page_count(response, (base_params or {}).get('limit', DEFAULT_LIMIT))
+    if pages is not None:
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, pages - 1)) as executor:
+                for page, response in zip(range(2, pages + 1), executor.map(get_page, range(2, pages + 1))):
+                    if not check(page, response):
+                        break
+                    all_items.extend(extract_data_from_paginated_response(response))
+        return all_items
+    
+    page = 1
+    while isinstance(response.body, dict) and response.body.get('next'):
+        page += 1
+        response = get_page(page)
+        if not check(page, response):
             break
-        
-        # Extract data from the response
-        items = extract_data_from_paginated_response(response)
-        all_items.extend(items)
-        
-        # Check if there are more pages
-        if isinstance(response.body, dict) and response.body.get('next'):
-            page += 1
-            # Add a delay between paginated requests to avoid hitting rate limits
-            time.sleep(REQUEST_DELAY)
-        else:
-            has_more = False
+        all_items.extend(extract_data_from_paginated_response(response))
     
     return all_items
@@ -0,0 +1,297 @@
+"""
+Benchmarks for the harness itself: response comparison, the data store,
+report generation and an end-to-end crawl against the mock API server.
+
+    python benchmarks.py                          # write benchmark_results.json
+    python benchmarks.py --compare baseline.json  # also flag slowdowns
+
+Everything runs in a temporary working directory, so the harness's own
+output/ directory (reports, crawl database, logs) is left untouched.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+# Harness modules write to the relative output/ directory when imported, so
+# switch to a scratch directory first
+WORK_DIR = tempfile.mkdtemp(prefix='harness-benchmarks-')
+os.chdir(WORK_DIR)
+
+from config import OUTPUT_DIR, API_IMPL1, API_IMPL2  # noqa: E402
+from api_client import ApiResponse, ApiComparisonClient  # noqa: E402
+from response_comparator import (  # noqa: E402
+    compare_responses, compare_paginated_responses, format_comparison_for_report
+)
+from crawl_store import CrawlStore  # noqa: E402
+from data_store import JsonlLog, UrnIndex  # noqa: E402
+from report_generator import generate_html_report  # noqa: E402
+from mock_server import MockDataset, paginate, start_mock_server  # noqa: E402
+from test_collections import run_collections_tests  # noqa: E402
+from test_books import run_books_tests  # noqa: E402
+from test_hadiths import run_hadiths_tests  # noqa: E402
+from streaming_crawl import run_streaming_tests  # noqa: E402
+
+logger = logging.getLogger('benchmarks')
+
+# Benchmarks slower than this multiple of the baseline are reported as regressions
+REGRESSION_RATIO = 1.25
+
+
+def measure(function: Callable[[], Any], repeat: int, setup: Callable[[], Any] = None) -> Dict[str, Any]:
+    """
+    Time a function.
+
+    Args:
+        function: Code to time
+        repeat: Number of timed runs
+        setup: Untimed code run before each timed run
+
+    Returns:
+        Dictionary with the minimum and median run time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {'repeat': repeat, 'min_s': min(times), 'median_s': statistics.median(times)}
+
+
+def hadith_page_responses(size: int, drift_rate: float) -> tuple:
+    """Two responses for the same page of hadiths, the second with some drift."""
+    params = {'page': 1, 'limit': size}
+    base = MockDataset(hadiths_per_book=size)
+    drifted = MockDataset(hadiths_per_book=size, drift_rate=drift_rate, seed=1)
+    body1 = paginate(size, lambda i: base.hadith(0, 1, i), params)
+    body2 = paginate(size, lambda i: drifted.hadith(0, 1, i), params)
+    return ApiResponse(200, body1), ApiResponse(200, body2)
+
+
+def bench_comparison(repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for size in (50, 100):
+        for label, drift_rate in (('identical', 0.0), ('drifted', 0.05)):
+            response1, response2 = hadith_page_responses(size, drift_rate)
+            results[f'compare_paginated_responses/{size}_hadiths/{label}'] = {
+                'n': size,
+                **measure(lambda: compare_paginated_responses(response1, response2, 'bench'), repeat)
+            }
+            results[f'compare_responses/{size}_hadiths/{label}'] = {
+                'n': size,
+                **measure(lambda: compare_responses(response1, response2, 'bench'), repeat)
+            }
+    return results
+
+
+def bench_data_store(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    dataset = MockDataset(hadiths_per_book=100)
+
+    for n in sizes:
+        books = max(1, n // dataset.hadiths_per_book)
+        dataset.books_per_collection = books
+        pages = [[dataset.hadith(0, book, i) for i in range(dataset.hadiths_per_book)]
+                 for book in range(1, books + 1)]
+        store = CrawlStore(os.path.join(OUTPUT_DIR, f'bench_{n}.db'))
+
+        def save():
+            for book, hadiths in enumerate(pages, 1):
+                store.save_hadiths('bukhari', str(book), hadiths)
+
+        def load():
+            for book in range(1, books + 1):
+                store.load_hadiths('bukhari', str(book))
+
+        lookups = [str(random.randint(1, n)) for _ in range(1000)]
+
+        def find():
+            for hadith_number in lookups:
+                store.find_hadith('bukhari', hadith_number)
+
+        results[f'crawl_store/save_hadiths/{n}'] = {'n': n, **measure(save, repeat)}
+        results[f'crawl_store/load_hadiths/{n}'] = {'n': n, **measure(load, repeat)}
+        results[f'crawl_store/find_hadith_x1000/{n}'] = {'n': n, **measure(find, repeat)}
+
+        records = [{'endpoint': f'collections/bukhari/hadiths/{i}', 'params': 'None', 'status': 'PASS',
+                    'differences': []} for i in range(n)]
+        log = JsonlLog(f'bench_{n}.jsonl')
+
+        def append():
+            for record in records:
+                log.append(record)
+            log.flush()
+
+        results[f'jsonl_log/append/{n}'] = {'n': n, **measure(append, repeat, setup=log.clear)}
+        results[f'jsonl_log/iterate/{n}'] = {'n': n, **measure(lambda: sum(1 for _ in log), repeat)}
+
+        urns = UrnIndex(f'bench_urns_{n}.jsonl')
+
+        def add_urns():
+            for i in range(n):
+                urns.add(100000 + i, 'bukhari', str(i + 1), 'en')
+            urns.flush()
+
+        results[f'urn_index/add/{n}'] = {'n': n, **measure(add_urns, repeat, setup=urns.clear)}
+
+    return results
+
+
+def bench_report(n: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    response1, response2 = hadith_page_responses(50, 0.05)
+    failed = format_comparison_for_report(compare_paginated_responses(response1, response2, 'bench'))
+    results = []
+    for i in range(n):
+        if i % 10 == 0:
+            results.append({**failed, 'endpoint': f'collections/bukhari/books/{i}/hadiths'})
+        else:
+            results.append({'endpoint': f'collections/bukhari/hadiths/{i}', 'params': 'None',
+                            'status': 'PASS', 'differences': []})
+
+    return {f'generate_html_report/{n}': {'n': n, **measure(lambda: generate_html_report(results), repeat)}}
+
+
+def bench_crawl(repeat: int) -> Dict[str, Dict[str, Any]]:
+    options = {'collections': 2, 'books_per_collection': 5, 'chapters_per_book': 10,
+               'hadiths_per_book': 100, 'latency_ms': 5}
+    server1 = start_mock_server(**options)
+    server2 = start_mock_server(**options, drift_rate=0.01)
+    API_IMPL1.update(base_url=server1.base_url, rate_limit=None)
+    API_IMPL2.update(base_url=server2.base_url, rate_limit=None)
+
+    results = {}
+    try:
+        for concurrent in (False, True):
+            mode = 'concurrent' if concurrent else 'serial'
+
+            def phases():
+                client = ApiComparisonClient(concurrent=concurrent)
+                try:
+                    run_collections_tests(client)
+                    run_books_tests(client)
+                    run_hadiths_tests(client)
+                finally:
+                    client.close()
+
+            before = server2.request_count
+            results[f'crawl/phases/{mode}'] = {**measure(phases, repeat),
+                                               'requests': (server2.request_count - before) // repeat}
+
+        def streaming():
+            client = ApiComparisonClient(concurrent=True)
+            try:
+                run_streaming_tests(client)
+            finally:
+                client.close()
+
+        before = server2.request_count
+        results['crawl/streaming'] = {**measure(streaming, repeat),
+                                      'requests': (server2.request_count - before) // repeat}
+    finally:
+        for server in (server1, server2):
+            server.shutdown()
+            server.server_close()
+
+    return results
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                        max_ratio: float = REGRESSION_RATIO) -> List[str]:
+    """
+    Compare median times against a baseline.
+
+    Returns:
+        Human-readable descriptions of benchmarks slower than max_ratio times
+        the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('median_s'):
+            continue
+        ratio = result['median_s'] / previous['median_s']
+        if ratio > max_ratio:
+            regressions.append(f"{name}: {result['median_s'] * 1000:.2f}ms vs "
+                               f"{previous['median_s'] * 1000:.2f}ms ({ratio:.2f}x)")
+    return regressions
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the regression harness')
+    parser.add_argument('--output', default=os.path.join(SCRIPT_DIR, 'benchmark_results.json'),
+                        help='File to write the results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='Results file of an earlier run to check for slowdowns')
+    parser.add_argument('--quick', action='store_true', help='Skip the largest data sizes')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per micro benchmark')
+    parser.add_argument('--skip-crawl', action='store_true', help='Skip the end-to-end crawl benchmarks')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(os.path.join(SCRIPT_DIR, args.output))
+    compare = os.path.abspath(os.path.join(SCRIPT_DIR, args.compare)) if args.compare else None
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # The harness logs every difference and request; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.CRITICAL)
+    logger.setLevel(logging.INFO)
+    random.seed(0)
+
+    sizes = [10 ** 3, 10 ** 4] if args.quick else [10 ** 3, 10 ** 4, 10 ** 5]
+    report_size = 10 ** 4 if args.quick else 10 ** 5
+    slow_repeat = max(1, args.repeat // 2)
+
+    results = {}
+    logger.info("Benchmarking response comparison")
+    results.update(bench_comparison(args.repeat))
+    logger.info("Benchmarking data store")
+    results.update(bench_data_store(sizes, slow_repeat))
+    logger.info("Benchmarking HTML report generation")
+    results.update(bench_report(report_size, slow_repeat))
+    if not args.skip_crawl:
+        logger.info("Benchmarking end-to-end crawl against the mock server")
+        results.update(bench_crawl(1))
+
+    for name, result in results.items():
+        logger.info(f"{name}: median {result['median_s'] * 1000:.2f}ms, min {result['min_s'] * 1000:.2f}ms")
+
+    with open(output, 'w') as f:
+        json.dump({
+            'generated': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'benchmarks': results
+        }, f, indent=2)
+    logger.info(f"Results written to {output}")
+
+    if compare:
+        with open(compare, 'r') as f:
+            baseline = json.load(f).get('benchmarks', {})
+        regressions = compare_to_baseline(results, baseline)
+        for regression in regressions:
+            logger.info(f"SLOWER: {regression}")
+        if regressions:
+            return 1
+        logger.info(f"No benchmark is more than {REGRESSION_RATIO}x slower than {compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
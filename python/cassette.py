@@ -0,0 +1,106 @@
+"""
+Record/replay store for API responses, keyed by endpoint and query parameters.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from config import CASSETTE_DIR
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('cassette')
+
+# Supported cassette modes
+CASSETTE_OFF = 'off'
+CASSETTE_RECORD = 'record'
+CASSETTE_REPLAY = 'replay'
+CASSETTE_MODES = (CASSETTE_OFF, CASSETTE_RECORD, CASSETTE_REPLAY)
+
+
+def cassette_key(endpoint: str, params: Dict[str, Any] = None) -> str:
+    """
+    Build the lookup key for an (endpoint, params) pair.
+
+    Parameter values are compared as strings, since that is how they are
+    sent in the query string.
+
+    Args:
+        endpoint: The API endpoint (without the base URL)
+        params: Query parameters
+
+    Returns:
+        Hex digest identifying the request
+    """
+    canonical = json.dumps({
+        'endpoint': endpoint.strip('/'),
+        'params': {str(k): str(v) for k, v in (params or {}).items()}
+    }, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class CassetteStore:
+    """Directory of recorded responses, one JSON file per request."""
+
+    def __init__(self, directory: str = CASSETTE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, endpoint: str, params: Dict[str, Any] = None) -> str:
+        return os.path.join(self.directory, f"{cassette_key(endpoint, params)}.json")
+
+    def load(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Load a recorded response.
+
+        Args:
+            endpoint: The API endpoint
+            params: Query parameters
+
+        Returns:
+            The recorded response dictionary (as produced by ApiResponse.to_dict),
+            or None if nothing was recorded for this request
+        """
+        filepath = self._path(endpoint, params)
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'r') as f:
+                return json.load(f)['response']
+        except Exception as e:
+            logger.error(f"Error loading recorded response from {filepath}: {str(e)}")
+            return None
+
+    def save(self, endpoint: str, params: Dict[str, Any], response: Dict[str, Any]) -> None:
+        """
+        Record a response, replacing any earlier recording of the same request.
+
+        Args:
+            endpoint: The API endpoint
+            params: Query parameters
+            response: Response dictionary (as produced by ApiResponse.to_dict)
+        """
+        filepath = self._path(endpoint, params)
+        entry = {
+            'endpoint': endpoint,
+            'params': params,
+            'recorded_at': datetime.now().isoformat(),
+            'response': response
+        }
+
+        # Write to a temporary file first so concurrent readers never see a partial file
+        tmp_path = f"{filepath}.{os.getpid()}.{id(entry)}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, filepath)
+        except Exception as e:
+            logger.error(f"Error recording response to {filepath}: {str(e)}")
@@ -0,0 +1,91 @@
+"""
+Checkpoint log for resumable crawls.
+
+The crawl frontier is recorded as it grows: a 'task' record when a task is
+scheduled and a 'done' record, carrying the task's test results, when it
+finishes. Tasks scheduled but never finished form the frontier to resume from.
+"""
+
+import json
+import logging
+from typing import Dict, Any, List, Tuple
+
+from data_store import JsonlLog
+from config import CHECKPOINT_FILE
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('checkpoint')
+
+
+def task_key(name: str, args: tuple) -> str:
+    """Identify a task by its name and arguments."""
+    return json.dumps([name, list(args)])
+
+
+class Checkpoint:
+    """Append-only record of scheduled and completed crawl tasks."""
+
+    def __init__(self, filename: str = CHECKPOINT_FILE):
+        """
+        Args:
+            filename: The checkpoint filename (without path)
+        """
+        self._log = JsonlLog(filename)
+        # Keys of every task scheduled in the checkpointed run (filled by load)
+        self.scheduled_keys = set()
+
+    @property
+    def filepath(self) -> str:
+        return self._log.filepath
+
+    def reset(self) -> None:
+        """Start a new checkpoint, discarding the previous run."""
+        self._log.clear()
+
+    def task_scheduled(self, name: str, args: tuple) -> None:
+        self._log.append({'type': 'task', 'task': name, 'args': list(args)})
+
+    def task_done(self, name: str, args: tuple, results: List[Dict[str, Any]]) -> None:
+        self._log.append({'type': 'done', 'task': name, 'args': list(args), 'results': results})
+
+    def finished(self) -> None:
+        """Mark the run as complete and write everything to disk."""
+        self._log.append({'type': 'finished'})
+        self._log.flush()
+
+    def flush(self) -> None:
+        self._log.flush()
+
+    def load(self) -> Tuple[List[Dict[str, Any]], List[Tuple[str, tuple]], bool]:
+        """
+        Read the checkpoint back.
+
+        Returns:
+            Tuple of (results of completed tasks, frontier of (task name, args)
+            still to run, whether the checkpointed run had finished)
+        """
+        results = []
+        scheduled = {}
+        done = set()
+        finished = False
+
+        for record in self._log:
+            record_type = record.get('type')
+            if record_type == 'task':
+                args = tuple(record['args'])
+                scheduled[task_key(record['task'], args)] = (record['task'], args)
+            elif record_type == 'done':
+                done.add(task_key(record['task'], tuple(record['args'])))
+                results.extend(record.get('results', []))
+            elif record_type == 'finished':
+                finished = True
+
+        self.scheduled_keys = set(scheduled)
+        frontier = [task for key, task in scheduled.items() if key not in done]
+        logger.info(f"Loaded checkpoint from {self.filepath}: {len(done)} tasks done, "
+                    f"{len(frontier)} tasks to resume")
+        return results, frontier, finished
@@ -0,0 +1,131 @@
+"""
+Circuit breaker that stops requests to an API implementation that is down.
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, CIRCUIT_MAX_OPEN_TIME
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('circuit_breaker')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# Error of the responses to requests blocked by an open circuit
+CIRCUIT_OPEN_ERROR = 'Circuit open'
+
+# How often requests blocked behind a half-open probe check back
+PROBE_POLL_INTERVAL = 0.5
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one API implementation.
+
+    The circuit opens after failure_threshold failures (connection errors or
+    5xx responses) in a row. While it is open, allow_request() refuses every
+    request without touching the network. After reset_timeout seconds a
+    single request is let through as a probe (half-open): if it succeeds the
+    circuit closes, otherwise it opens again for another reset_timeout.
+
+    A failure_threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, name: str = None,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+                 max_open_time: float = CIRCUIT_MAX_OPEN_TIME):
+        """
+        Args:
+            name: Name used in log messages (usually the base URL)
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a probe
+            max_open_time: Seconds after which an open circuit is given up
+                on (see gave_up)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_open_time = max_open_time
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_since: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether this breaker ever opens."""
+        return self.failure_threshold > 0
+
+    @property
+    def gave_up(self) -> bool:
+        """Whether the circuit has been open for longer than max_open_time."""
+        with self._lock:
+            return (self._open_since is not None
+                    and time.monotonic() - self._open_since > self.max_open_time)
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now. A True in half-open state makes it the probe."""
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"Circuit for {self.name} is half-open, probing")
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """Seconds until a blocked request is worth trying again."""
+        with self._lock:
+            if self.state == OPEN:
+                return max(self.reset_timeout - (time.monotonic() - self._opened_at), PROBE_POLL_INTERVAL)
+            return PROBE_POLL_INTERVAL
+
+    def on_success(self) -> None:
+        """Record a response from a server that is up, closing the circuit."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                self._open_since = None
+                self._probe_in_flight = False
+                logger.info(f"Circuit for {self.name} closed, server recovered")
+
+    def on_failure(self) -> None:
+        """Record a connection error or 5xx response, opening the circuit if due."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                now = time.monotonic()
+                if self._open_since is None:
+                    self._open_since = now
+                self.state = OPEN
+                self._opened_at = now
+                self._probe_in_flight = False
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} failures in a row; "
+                               f"probing again in {self.reset_timeout:.1f}s")
@@ -0,0 +1,200 @@
+"""
+Declarative comparison rules, loaded from COMPARISON_RULES_PATH.
+
+The rules file holds a list of rules, each applying to the endpoints whose
+template (see latency.endpoint_template) matches its 'endpoint' pattern
+(fnmatch syntax, '*' for all) and, for field rules, to the fields matching
+its 'path':
+
+    {"rules": [
+        {"endpoint": "*", "path": "**", "null_equals_missing": true},
+        {"endpoint": "*", "path": "**.body", "normalize": ["nfc", "tashkeel", "whitespace"]},
+        {"endpoint": "collections/{collectionName}", "path": "totalAvailableHadith", "ignore": true},
+        {"endpoint": "hadiths/random", "compare_body": false}
+    ]}
+
+A path is a dotted list of object keys; list items are transparent, so
+'hadith.body' matches the body of every entry in a 'hadith' list. '*'
+matches any one key and '**' any number of keys.
+
+Field rules:
+    ignore: the field is left out of the comparison
+    null_equals_missing: null on one side and no such key on the other is
+        not a difference
+    normalize: strings are compared after these normalizations: 'nfc'
+        (Unicode NFC), 'tashkeel' (Arabic diacritics and tatweel removed),
+        'whitespace' (runs of whitespace collapsed, ends trimmed)
+
+Endpoint rules (no 'path'):
+    compare_body: false to compare only status codes and errors
+
+Rules are compiled once per endpoint template, and the field rules are only
+consulted by keyed_diff inside branches that already differ, so equal
+responses cost nothing extra.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency import endpoint_template
+from config import COMPARISON_RULES_PATH
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('comparison_rules')
+
+# Arabic diacritics (harakat, tanwin, shadda, sukun, Quranic marks) and tatweel
+_TASHKEEL = re.compile('[\u0610-\u061A\u0640\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E8\u06EA-\u06ED]')
+
+NORMALIZERS: Dict[str, Callable[[str], str]] = {
+    'nfc': lambda text: unicodedata.normalize('NFC', text),
+    'tashkeel': lambda text: _TASHKEEL.sub('', text),
+    'whitespace': lambda text: ' '.join(text.split())
+}
+
+
+class FieldRule:
+    """The combined rules for one field."""
+
+    def __init__(self, ignore: bool = False, null_equals_missing: bool = False,
+                 normalize: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            ignore: Leave the field out of the comparison
+            null_equals_missing: Treat null and a missing key as equal
+            normalize: Applied to both strings before comparing them
+        """
+        self.ignore = ignore
+        self.null_equals_missing = null_equals_missing
+        self.normalize = normalize
+
+
+NO_RULE = FieldRule()
+
+
+def _compile_path(path: str) -> re.Pattern:
+    """Compile a dotted path pattern into a regex over '/'-joined keys."""
+    regex = ''
+    for part in path.split('.'):
+        if part == '**':
+            regex += '(?:[^/]*/)*'
+        else:
+            regex += re.escape(part).replace('\\*', '[^/]*') + '/'
+    return re.compile(regex)
+
+
+def _compile_normalizer(names: List[str]) -> Callable[[str], str]:
+    functions = [NORMALIZERS[name] for name in names]
+
+    def normalize(text: str) -> str:
+        for function in functions:
+            text = function(text)
+        return text
+
+    return normalize
+
+
+class RuleSet:
+    """The rules for one endpoint template, with field lookups memoized by key path."""
+
+    def __init__(self, template: str, rules: List[Dict[str, Any]]):
+        """
+        Args:
+            template: The endpoint template
+            rules: The rules from the rules file that apply to the template
+        """
+        self.template = template
+        self.compare_body = all(rule.get('compare_body', True) for rule in rules if 'path' not in rule)
+        self._field_rules = [(_compile_path(rule['path']), rule) for rule in rules if 'path' in rule]
+        self._fields: Dict[Tuple[str, ...], FieldRule] = {}
+
+    def field(self, keys: Tuple[str, ...]) -> FieldRule:
+        """
+        The combined rules for a field.
+
+        Args:
+            keys: Object keys leading to the field, list items left out
+
+        Returns:
+            The field's rules (NO_RULE if none apply)
+        """
+        field = self._fields.get(keys)
+        if field is None:
+            field = self._match(keys)
+            self._fields[keys] = field
+        return field
+
+    def _match(self, keys: Tuple[str, ...]) -> FieldRule:
+        joined = ''.join(f'{key}/' for key in keys)
+        matching = [rule for pattern, rule in self._field_rules if pattern.fullmatch(joined)]
+        if not matching:
+            return NO_RULE
+        normalizations = [name for rule in matching for name in rule.get('normalize', [])]
+        return FieldRule(
+            ignore=any(rule.get('ignore') for rule in matching),
+            null_equals_missing=any(rule.get('null_equals_missing') for rule in matching),
+            normalize=_compile_normalizer(list(dict.fromkeys(normalizations))) if normalizations else None
+        )
+
+
+def load_rules(path: str = COMPARISON_RULES_PATH) -> List[Dict[str, Any]]:
+    """
+    Load and validate the rules file.
+
+    Args:
+        path: Path of the rules file
+
+    Returns:
+        The rules (empty if the file doesn't exist)
+    """
+    if not os.path.exists(path):
+        logger.info(f"No comparison rules file at {path}; comparing responses as they are")
+        return []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f).get('rules', [])
+
+    for rule in rules:
+        unknown = set(rule.get('normalize', [])) - set(NORMALIZERS)
+        if unknown:
+            raise ValueError(f"Unknown normalization(s) {sorted(unknown)} in comparison rule {rule}")
+    logger.info(f"Loaded {len(rules)} comparison rules from {path}")
+    return rules
+
+
+# Rule sets compiled so far, by endpoint template
+_rules: Optional[List[Dict[str, Any]]] = None
+_rule_sets: Dict[str, RuleSet] = {}
+_lock = threading.Lock()
+
+
+def rules_for(endpoint: str) -> RuleSet:
+    """
+    The compiled rules for an endpoint.
+
+    Args:
+        endpoint: The API endpoint (without the base URL)
+
+    Returns:
+        The rule set of the endpoint's template
+    """
+    global _rules
+    template = endpoint_template(endpoint)
+    rule_set = _rule_sets.get(template)
+    if rule_set is None:
+        with _lock:
+            if _rules is None:
+                _rules = load_rules()
+            rule_set = RuleSet(template, [rule for rule in _rules
+                                          if fnmatchcase(template, rule.get('endpoint', '*'))])
+            _rule_sets[template] = rule_set
+    return rule_set
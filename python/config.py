@@ -13,13 +13,15 @@ load_dotenv(dotenv_path=env_path)
 # API Implementation 1 (Original)
 API_IMPL1 = {
     'base_url': 'https://api.sunnah.com/v1',
-    'api_key': os.getenv('API1_KEY', '')  # Get from .env or use empty string as fallback
+    'api_key': os.getenv('API1_KEY', ''),  # Get from .env or use empty string as fallback
+    'rate_limit': 2.0  # Requests per second (None disables rate limiting)
 }
 
 # API Implementation 2 (New)
 API_IMPL2 = {
     'base_url': 'http://localhost:8084/v1',
-    'api_key': os.getenv('API2_KEY', 'your-api-key-2')  # Get from .env or use default as fallback
+    'api_key': os.getenv('API2_KEY', 'your-api-key-2'),  # Get from .env or use default as fallback
+    'rate_limit': None  # Requests per second (None disables rate limiting)
 }
 
 # Request timeout in seconds
@@ -28,27 +30,125 @@ REQUEST_TIMEOUT = 10
 # Maximum number of retries for failed requests
 MAX_RETRIES = 3
 
-# Delay between retries in seconds (for non-rate-limited errors)
-RETRY_DELAY = 1
-
 # Exponential backoff settings for rate limiting
 INITIAL_BACKOFF = 1  # Initial backoff time in seconds
 MAX_BACKOFF = 60     # Maximum backoff time in seconds
 BACKOFF_FACTOR = 2   # Multiplicative factor for exponential backoff
 
-# Delay between consecutive API requests (in seconds) to avoid hitting rate limits
-REQUEST_DELAY = 0.5
+# Retries of 429s, 5xx responses and network errors allowed in a whole run,
+# for both implementations together (None for no limit). Failed requests in
+# a batch wait in a delayed retry queue while the other endpoints go ahead.
+RETRY_BUDGET = 500
+
+# Adaptive rate limiting (per API implementation, see 'rate_limit' above)
+RATE_LIMIT_BURST = 1                 # Maximum number of requests sent back to back
+RATE_LIMIT_MIN_RATE = 0.1            # Lowest rate (req/s) the limiter backs off to
+RATE_LIMIT_DECREASE_FACTOR = 0.5     # Rate multiplier applied on each 429 response
+RATE_LIMIT_RECOVERY_STEP = 0.1       # Fraction of the configured rate restored after a run of successes
+RATE_LIMIT_RECOVERY_SUCCESSES = 20   # Consecutive successes needed before the rate is increased
+
+# Circuit breaker (per API implementation): after this many connection
+# errors or 5xx responses in a row, requests to that implementation fail
+# fast and are re-queued until a half-open probe succeeds
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 10.0     # Seconds the circuit stays open before a probe
+CIRCUIT_MAX_OPEN_TIME = 300.0    # Stop re-queuing once the circuit has been open this long
 
 # Maximum number of concurrent requests
 MAX_CONCURRENT_REQUESTS = 5
 
+# Request both APIs at the same time and run comparisons in parallel
+# (capped by MAX_CONCURRENT_REQUESTS). Can also be enabled with --concurrent.
+CONCURRENT_MODE = False
+
+# Compare responses in this many worker processes, overlapping with fetching
+# (0 compares them in the fetching threads). Can also be set with
+# --comparison-processes.
+COMPARISON_PROCESSES = 0
+COMPARISON_QUEUE_SIZE = 50    # Comparisons queued for the processes before fetching waits
+
+# Responses kept in memory during a run, so repeated requests for the same
+# endpoint and parameters are served without another fetch (0 disables)
+RESPONSE_CACHE_SIZE = 500
+
+# Fetch and compare pages 2..N of a list endpoint in parallel (capped by
+# MAX_CONCURRENT_REQUESTS), even when CONCURRENT_MODE is off
+CONCURRENT_PAGES = True
+
 # Output directory for test results and data
 OUTPUT_DIR = 'output'
 
+# SQLite database holding crawled collections, books, chapters and hadiths
+CRAWL_DB_PATH = os.path.join(OUTPUT_DIR, 'crawl.db')
+
+# Record/replay of API1 responses: 'off', 'record' or 'replay'.
+# Can also be set with --record / --replay.
+API1_CASSETTE_MODE = os.getenv('API1_CASSETTE_MODE', 'off')
+CASSETTE_DIR = os.path.join(OUTPUT_DIR, 'cassettes')
+
+# Buffered writes to the results logs (test_results.jsonl, failed_endpoints.jsonl)
+RESULTS_FLUSH_EVERY = 100     # Flush after this many buffered results
+RESULTS_FLUSH_INTERVAL = 5.0  # Flush buffered results at least this often (seconds)
+
+# Checkpoint log for resumable streaming crawls (see --resume)
+CHECKPOINT_FILE = 'checkpoint.jsonl'
+
+# Number of newly discovered URNs buffered before they are written to urns.jsonl
+URN_FLUSH_EVERY = 200
+
 # Pagination settings
 DEFAULT_LIMIT = 50
 MAX_LIMIT = 100
 
+# Request list endpoints with the largest page size both APIs accept (up to
+# MAX_LIMIT) and compare them in DEFAULT_LIMIT windows. Can also be enabled with --large-pages.
+LARGE_PAGES = False
+PAGE_SIZE_PROBES = 3  # Real DEFAULT_LIMIT pages requested per run to check the windows against
+
+# Latency regression gate (opt-in with --latency-gate). The run fails when API2's
+# latency for an endpoint template exceeds API1's by more than the ratio or the
+# absolute budget (set either to None to disable it).
+LATENCY_GATE_MAX_RATIO = 1.5         # Maximum API2/API1 ratio per percentile
+LATENCY_GATE_MAX_EXTRA_MS = 250      # Maximum API2 - API1 difference in milliseconds
+# Percentiles checked by the gate, with the samples per API needed to judge them
+LATENCY_GATE_PERCENTILES = {'p95_ms': 50, 'p99_ms': 200}
+# Re-request already tested endpoints until every template has enough samples.
+# The top-up stops at whichever bound comes first; with API1's rate limit of
+# 2 requests per second the time bound allows about 240 comparisons.
+LATENCY_GATE_TOP_UP = True
+LATENCY_GATE_MAX_TOP_UP_REQUESTS = 200     # Upper bound on extra comparisons for the top-up
+LATENCY_GATE_MAX_TOP_UP_SECONDS = 120.0    # Upper bound on the time spent on the top-up
+
+# Open-loop load generation against API2 (see --load)
+LOAD_TARGET_RPS = 20.0        # Requests per second to send, regardless of response times
+LOAD_DURATION = 60.0          # Length of the load test in seconds
+LOAD_MAX_IN_FLIGHT = 200      # Worker threads available for outstanding requests
+
+# Local mock API server (mock_server.py)
+MOCK_SERVER_PORT = 8084
+MOCK_COLLECTIONS = 4
+MOCK_BOOKS_PER_COLLECTION = 20
+MOCK_CHAPTERS_PER_BOOK = 10
+MOCK_HADITHS_PER_BOOK = 100
+
+# Compare book, chapter and hadith detail endpoints of API2 against the API1
+# list entries already fetched, instead of requesting API1 again. Can also be
+# enabled with --derive-details.
+DERIVE_DETAILS = False
+DERIVED_SPOT_CHECK_EVERY = 10  # Every Nth derived check per endpoint template still requests API1
+
+# Align list items by their natural keys (name, bookNumber, hadithNumber, ...)
+# when comparing responses. Set to False to use DeepDiff(ignore_order=True).
+KEYED_LIST_COMPARISON = True
+
+# Most differences recorded for one comparison; the diff stops once it
+# reaches this many and the result is marked truncated (None for no limit)
+MAX_DIFFERENCES_PER_COMPARISON = 100
+
+# Comparison rules (ignored fields, Arabic text normalization, null vs missing
+# keys, per-endpoint settings), see comparison_rules.py
+COMPARISON_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'comparison_rules.json')
+
 # Test settings
 TEST_ALL_PAGES = True  # Set to True to test all pages of paginated endpoints
 SAMPLE_SIZE = 5  # Number of items to sample from each collection/book for detailed testing
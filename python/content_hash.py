@@ -0,0 +1,41 @@
+"""
+Content hashes of response bodies, used to skip the deep comparison of
+bodies that are certainly equal.
+"""
+
+import hashlib
+from typing import Any
+
+# Digest size in bytes; collisions only matter within a single run
+DIGEST_SIZE = 16
+
+
+def raw_hasher():
+    """New hash object for the raw bytes of a body, fed as they arrive."""
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+def canonical_hash(value: Any) -> str:
+    """
+    Hash a JSON value the way the comparator sees it.
+
+    Dict key order and list item order don't change the hash, since the
+    comparator ignores both. Types do: 1, 1.0, true and "1" all hash
+    differently, as the comparator reports type changes.
+
+    Args:
+        value: Parsed JSON value
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.blake2b(_canonical(value).encode('utf-8', 'surrogatepass'),
+                           digest_size=DIGEST_SIZE).hexdigest()
+
+
+def _canonical(value: Any) -> str:
+    if isinstance(value, dict):
+        return '{' + ','.join(f'{key!r}:{_canonical(item)}' for key, item in sorted(value.items())) + '}'
+    if isinstance(value, list):
+        return '[' + ','.join(sorted(_canonical(item) for item in value)) + ']'
+    return repr(value)
@@ -0,0 +1,303 @@
+"""
+SQLite store for the entities discovered during a crawl (collections, books,
+chapters and hadiths).
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from config import CRAWL_DB_PATH, OUTPUT_DIR
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('crawl_store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_collections_name ON collections (name);
+
+CREATE TABLE IF NOT EXISTS books (
+    collection TEXT NOT NULL,
+    book_number TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_books ON books (collection, book_number);
+
+CREATE TABLE IF NOT EXISTS chapters (
+    collection TEXT NOT NULL,
+    book_number TEXT NOT NULL,
+    chapter_id TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chapters ON chapters (collection, book_number, chapter_id);
+
+CREATE TABLE IF NOT EXISTS hadiths (
+    collection TEXT NOT NULL,
+    book_number TEXT NOT NULL,
+    hadith_number TEXT,
+    position INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hadiths_book ON hadiths (collection, book_number, hadith_number);
+CREATE INDEX IF NOT EXISTS idx_hadiths_number ON hadiths (collection, hadith_number);
+"""
+
+
+def _key(value: Any) -> Optional[str]:
+    """Normalize an identifier (book numbers etc. may arrive as int or str)."""
+    return None if value is None else str(value)
+
+
+def _dumps(item: Dict[str, Any]) -> str:
+    return json.dumps(item, ensure_ascii=False)
+
+
+class CrawlStore:
+    """
+    Indexed SQLite tables for crawled entities.
+
+    Each thread gets its own connection; writes are serialized and each
+    save_* call replaces its rows in a single transaction.
+    """
+
+    def __init__(self, path: str = CRAWL_DB_PATH, legacy_dir: Optional[str] = OUTPUT_DIR):
+        """
+        Args:
+            path: Path of the SQLite database file
+            legacy_dir: Directory of the JSON files written before the crawl
+                store existed, imported while the store is empty (None to
+                skip the import)
+        """
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        with self._write_lock:
+            self._connection().executescript(SCHEMA)
+
+        if legacy_dir and self.is_empty():
+            self.import_legacy_json(legacy_dir)
+
+    def is_empty(self) -> bool:
+        """Return True if no entities have been stored yet."""
+        return not any(self._select(f"SELECT 1 FROM {table} LIMIT 1")
+                       for table in ('collections', 'books', 'chapters', 'hadiths'))
+
+    def import_legacy_json(self, directory: str) -> int:
+        """
+        Import the per-list JSON files (collections.json, books_<collection>.json,
+        chapters_<collection>_<book>.json, hadiths_<collection>_<book>.json).
+
+        Args:
+            directory: Directory holding the JSON files
+
+        Returns:
+            Number of files imported
+        """
+        try:
+            filenames = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+        except OSError:
+            return 0
+
+        def load(filename: str) -> Optional[List[Dict[str, Any]]]:
+            try:
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable {filename} in {directory}: {str(e)}")
+                return None
+            return items if isinstance(items, list) else None
+
+        imported = 0
+        names = set()
+        if 'collections.json' in filenames:
+            collections = load('collections.json')
+            if collections is not None:
+                self.save_collections(collections)
+                names.update(_key(c.get('name')) for c in collections if c.get('name') is not None)
+                imported += 1
+
+        for filename in filenames:
+            if filename.startswith('books_'):
+                collection_name = filename[len('books_'):-len('.json')]
+                books = load(filename)
+                if books is not None:
+                    self.save_books(collection_name, books)
+                    names.add(collection_name)
+                    imported += 1
+
+        # Collection names may contain underscores, so split chapters_ and
+        # hadiths_ file names at the longest known collection name
+        for prefix, save in (('chapters_', self.save_chapters), ('hadiths_', self.save_hadiths)):
+            for filename in filenames:
+                if not filename.startswith(prefix):
+                    continue
+                stem = filename[len(prefix):-len('.json')]
+                matches = [name for name in names if stem.startswith(f"{name}_")]
+                if not matches:
+                    logger.warning(f"Skipping {filename}: no known collection matches its name")
+                    continue
+                collection_name = max(matches, key=len)
+                items = load(filename)
+                if items is not None:
+                    save(collection_name, stem[len(collection_name) + 1:], items)
+                    imported += 1
+
+        if imported:
+            logger.info(f"Imported {imported} JSON files from {directory} into {self.path}")
+        return imported
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _replace(self, table: str, where: Dict[str, Any], columns: List[str], rows: List[tuple]) -> None:
+        """Delete the rows matching where and insert the new rows in one transaction."""
+        connection = self._connection()
+        conditions = ' AND '.join(f"{column} = ?" for column in where) or '1'
+        placeholders = ', '.join('?' for _ in columns)
+
+        with self._write_lock:
+            try:
+                with connection:
+                    connection.execute(f"DELETE FROM {table} WHERE {conditions}", tuple(where.values()))
+                    connection.executemany(
+                        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Error saving {table} to {self.path}: {str(e)}")
+
+    def _select(self, query: str, args: tuple = ()) -> List[Any]:
+        try:
+            return self._connection().execute(query, args).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error querying {self.path}: {str(e)}")
+            return []
+
+    def _select_items(self, query: str, args: tuple = ()) -> List[Dict[str, Any]]:
+        return [json.loads(row[0]) for row in self._select(query, args)]
+
+    # Collections
+
+    def save_collections(self, collections: List[Dict[str, Any]]) -> None:
+        rows = [(_key(c.get('name')), i, _dumps(c)) for i, c in enumerate(collections)]
+        self._replace('collections', {}, ['name', 'position', 'data'], rows)
+
+    def load_collections(self) -> List[Dict[str, Any]]:
+        return self._select_items("SELECT data FROM collections ORDER BY position")
+
+    # Books
+
+    def save_books(self, collection_name: str, books: List[Dict[str, Any]]) -> None:
+        rows = [(collection_name, _key(b.get('bookNumber')), i, _dumps(b)) for i, b in enumerate(books)]
+        self._replace('books', {'collection': collection_name},
+                      ['collection', 'book_number', 'position', 'data'], rows)
+
+    def load_books(self, collection_name: str) -> List[Dict[str, Any]]:
+        return self._select_items(
+            "SELECT data FROM books WHERE collection = ? ORDER BY position", (collection_name,)
+        )
+
+    def find_book(self, collection_name: str, book_number: str) -> Optional[Dict[str, Any]]:
+        items = self._select_items(
+            "SELECT data FROM books WHERE collection = ? AND book_number = ? LIMIT 1",
+            (collection_name, _key(book_number))
+        )
+        return items[0] if items else None
+
+    # Chapters
+
+    def save_chapters(self, collection_name: str, book_number: str, chapters: List[Dict[str, Any]]) -> None:
+        book_number = _key(book_number)
+        rows = [(collection_name, book_number, _key(c.get('chapterId')), i, _dumps(c))
+                for i, c in enumerate(chapters)]
+        self._replace('chapters', {'collection': collection_name, 'book_number': book_number},
+                      ['collection', 'book_number', 'chapter_id', 'position', 'data'], rows)
+
+    def load_chapters(self, collection_name: str, book_number: str) -> List[Dict[str, Any]]:
+        return self._select_items(
+            "SELECT data FROM chapters WHERE collection = ? AND book_number = ? ORDER BY position",
+            (collection_name, _key(book_number))
+        )
+
+    def find_chapter(self, collection_name: str, book_number: str, chapter_id: str) -> Optional[Dict[str, Any]]:
+        items = self._select_items(
+            "SELECT data FROM chapters WHERE collection = ? AND book_number = ? AND chapter_id = ? LIMIT 1",
+            (collection_name, _key(book_number), _key(chapter_id))
+        )
+        return items[0] if items else None
+
+    # Hadiths
+
+    def save_hadiths(self, collection_name: str, book_number: str, hadiths: List[Dict[str, Any]]) -> None:
+        book_number = _key(book_number)
+        rows = [(collection_name, book_number, _key(h.get('hadithNumber')), i, _dumps(h))
+                for i, h in enumerate(hadiths)]
+        self._replace('hadiths', {'collection': collection_name, 'book_number': book_number},
+                      ['collection', 'book_number', 'hadith_number', 'position', 'data'], rows)
+
+    def load_hadiths(self, collection_name: str, book_number: str) -> List[Dict[str, Any]]:
+        return self._select_items(
+            "SELECT data FROM hadiths WHERE collection = ? AND book_number = ? ORDER BY position",
+            (collection_name, _key(book_number))
+        )
+
+    def hadith_numbers(self, collection_name: str, book_number: str) -> List[str]:
+        """Return the hadith numbers stored for a book, in list order."""
+        rows = self._select(
+            "SELECT hadith_number FROM hadiths WHERE collection = ? AND book_number = ? ORDER BY position",
+            (collection_name, _key(book_number))
+        )
+        return [row[0] for row in rows if row[0] is not None]
+
+    def find_hadith(self, collection_name: str, hadith_number: str) -> Optional[Dict[str, Any]]:
+        items = self._select_items(
+            "SELECT data FROM hadiths WHERE collection = ? AND hadith_number = ? LIMIT 1",
+            (collection_name, _key(hadith_number))
+        )
+        return items[0] if items else None
+
+    # Keys of everything crawled so far
+
+    def collection_names(self) -> List[str]:
+        rows = self._select("SELECT name FROM collections WHERE name IS NOT NULL ORDER BY position")
+        return [row[0] for row in rows]
+
+    def book_keys(self) -> List[tuple]:
+        """Return (collection, book_number) for every stored book."""
+        return self._select(
+            "SELECT collection, book_number FROM books WHERE book_number IS NOT NULL "
+            "ORDER BY collection, position"
+        )
+
+    def chapter_keys(self) -> List[tuple]:
+        """Return (collection, book_number, chapter_id) for every stored chapter."""
+        return self._select(
+            "SELECT collection, book_number, chapter_id FROM chapters WHERE chapter_id IS NOT NULL "
+            "ORDER BY collection, book_number, position"
+        )
+
+    def hadith_keys(self) -> List[tuple]:
+        """Return (collection, book_number, hadith_number) for every stored hadith."""
+        return self._select(
+            "SELECT collection, book_number, hadith_number FROM hadiths WHERE hadith_number IS NOT NULL "
+            "ORDER BY collection, book_number, position"
+        )
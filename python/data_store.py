@@ -4,11 +4,15 @@ Data store for saving and retrieving data between test runs.
 
 import os
 import json
+import time
+import atexit
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
-from config import OUTPUT_DIR
+from crawl_store import CrawlStore
+from config import OUTPUT_DIR, RESULTS_FLUSH_EVERY, RESULTS_FLUSH_INTERVAL, URN_FLUSH_EVERY
 
 # Set up logging
 logging.basicConfig(
@@ -64,6 +68,10 @@ def load_data(filename: str, default: Any = None) -> Any:
         return default
 
 
+# Crawled entities are stored in SQLite rather than one JSON file per list
+crawl_store = CrawlStore()
+
+
 def save_collections(collections: List[Dict[str, Any]]) -> None:
     """
     Save collections data.
@@ -71,7 +79,7 @@ def save_collections(collections: List[Dict[str, Any]]) -> None:
     Args:
         collections: List of collection objects
     """
-    save_data(collections, 'collections.json')
+    crawl_store.save_collections(collections)
 
 
 def load_collections() -> List[Dict[str, Any]]:
@@ -81,7 +89,7 @@ def load_collections() -> List[Dict[str, Any]]:
     Returns:
         List of collection objects
     """
-    return load_data('collections.json', [])
+    return crawl_store.load_collections()
 
 
 def save_books(collection_name: str, books: List[Dict[str, Any]]) -> None:
@@ -92,7 +100,7 @@ def save_books(collection_name: str, books: List[Dict[str, Any]]) -> None:
         collection_name: Name of the collection
         books: List of book objects
     """
-    save_data(books, f'books_{collection_name}.json')
+    crawl_store.save_books(collection_name, books)
 
 
 def load_books(collection_name: str) -> List[Dict[str, Any]]:
@@ -105,7 +113,7 @@ def load_books(collection_name: str) -> List[Dict[str, Any]]:
     Returns:
         List of book objects
     """
-    return load_data(f'books_{collection_name}.json', [])
+    return crawl_store.load_books(collection_name)
 
 
 def save_chapters(collection_name: str, book_number: str, chapters: List[Dict[str, Any]]) -> None:
@@ -117,7 +125,7 @@ def save_chapters(collection_name: str, book_number: str, chapters: List[Dict[st
         book_number: Number of the book
         chapters: List of chapter objects
     """
-    save_data(chapters, f'chapters_{collection_name}_{book_number}.json')
+    crawl_store.save_chapters(collection_name, book_number, chapters)
 
 
 def load_chapters(collection_name: str, book_number: str) -> List[Dict[str, Any]]:
@@ -131,7 +139,7 @@ def load_chapters(collection_name: str, book_number: str) -> List[Dict[str, Any]
     Returns:
         List of chapter objects
     """
-    return load_data(f'chapters_{collection_name}_{book_number}.json', [])
+    return crawl_store.load_chapters(collection_name, book_number)
 
 
 def save_hadiths(collection_name: str, book_number: str, hadiths: List[Dict[str, Any]]) -> None:
@@ -143,7 +151,7 @@ def save_hadiths(collection_name: str, book_number: str, hadiths: List[Dict[str,
         book_number: Number of the book
         hadiths: List of hadith objects
     """
-    save_data(hadiths, f'hadiths_{collection_name}_{book_number}.json')
+    crawl_store.save_hadiths(collection_name, book_number, hadiths)
 
 
 def load_hadiths(collection_name: str, book_number: str) -> List[Dict[str, Any]]:
@@ -157,50 +165,133 @@ def load_hadiths(collection_name: str, book_number: str) -> List[Dict[str, Any]]
     Returns:
         List of hadith objects
     """
-    return load_data(f'hadiths_{collection_name}_{book_number}.json', [])
+    return crawl_store.load_hadiths(collection_name, book_number)
 
 
-def save_urns(urns: List[int]) -> None:
+def load_hadith_numbers(collection_name: str, book_number: str) -> List[str]:
     """
-    Save URNs data.
+    Load the hadith numbers of a book without loading the hadiths themselves.
     
     Args:
-        urns: List of URNs
+        collection_name: Name of the collection
+        book_number: Number of the book
+        
+    Returns:
+        List of hadith numbers
     """
-    save_data(urns, 'urns.json')
+    return crawl_store.hadith_numbers(collection_name, book_number)
 
 
-def load_urns() -> List[int]:
+class JsonlLog:
     """
-    Load URNs data.
+    Append-only, line-delimited JSON log with buffered writes.
     
-    Returns:
-        List of URNs
+    Records are kept in memory and appended to the file once the buffer holds
+    RESULTS_FLUSH_EVERY records or RESULTS_FLUSH_INTERVAL seconds have passed
+    since the last flush, so appending never rereads or rewrites the file.
     """
-    return load_data('urns.json', [])
+    
+    def __init__(self, filename: str, flush_every: int = RESULTS_FLUSH_EVERY,
+                 flush_interval: float = RESULTS_FLUSH_INTERVAL):
+        """
+        Args:
+            filename: The filename (without path)
+            flush_every: Number of buffered records that triggers a flush
+            flush_interval: Seconds after which buffered records are flushed
+        """
+        self.filepath = os.path.join(OUTPUT_DIR, filename)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Append a record to the log.
+        
+        Args:
+            record: JSON-serializable record
+        """
+        with self._lock:
+            self._buffer.append(json.dumps(record, default=str))
+            if (len(self._buffer) >= self.flush_every or
+                    time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+    
+    def flush(self) -> None:
+        """Write all buffered records to the file."""
+        with self._lock:
+            self._flush_locked()
+    
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        try:
+            with open(self.filepath, 'a') as f:
+                f.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+        except Exception as e:
+            logger.error(f"Error writing to {self.filepath}: {str(e)}")
+    
+    def clear(self) -> None:
+        """Discard buffered records and truncate the file."""
+        with self._lock:
+            self._buffer = []
+            try:
+                open(self.filepath, 'w').close()
+            except Exception as e:
+                logger.error(f"Error clearing {self.filepath}: {str(e)}")
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Stream the records back, oldest first."""
+        self.flush()
+        if not os.path.exists(self.filepath):
+            return
+        
+        with open(self.filepath, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.error(f"Skipping malformed line {line_number} in {self.filepath}")
+
+
+# Logs for this run's results and for failures across runs
+results_log = JsonlLog('test_results.jsonl')
+failed_endpoints_log = JsonlLog('failed_endpoints.jsonl')
 
 
-def append_urn(urn: int) -> None:
+def save_test_results(results: List[Dict[str, Any]]) -> None:
     """
-    Append a URN to the URNs list.
+    Save test results, replacing the existing results log.
     
     Args:
-        urn: The URN to append
+        results: List of test result objects
     """
-    urns = load_urns()
-    if urn not in urns:
-        urns.append(urn)
-        save_urns(urns)
+    results_log.clear()
+    for result in results:
+        results_log.append(result)
+    results_log.flush()
 
 
-def save_test_results(results: List[Dict[str, Any]]) -> None:
+def clear_test_results() -> None:
+    """Clear the results log (e.g. at the start of a run)."""
+    results_log.clear()
+
+
+def iter_test_results() -> Iterator[Dict[str, Any]]:
     """
-    Save test results.
+    Stream test results from the results log.
     
-    Args:
-        results: List of test result objects
+    Returns:
+        Iterator over test result objects
     """
-    save_data(results, 'test_results.json')
+    return iter(results_log)
 
 
 def load_test_results() -> List[Dict[str, Any]]:
@@ -210,76 +301,238 @@ def load_test_results() -> List[Dict[str, Any]]:
     Returns:
         List of test result objects
     """
-    return load_data('test_results.json', [])
+    return list(iter_test_results())
 
 
 def append_test_result(result: Dict[str, Any]) -> None:
     """
-    Append a test result to the results list.
+    Append a test result to the results log.
     
     Args:
         result: The test result to append
     """
-    results = load_test_results()
-    results.append(result)
-    save_test_results(results)
+    results_log.append(result)
     
-    # If the test failed, also save it to the failed endpoints file
+    # If the test failed, also save it to the failed endpoints log
     if result.get('status') == 'FAIL':
         save_failed_endpoint(result)
 
 
 def save_failed_endpoint(result: Dict[str, Any]) -> None:
     """
-    Save a failed endpoint to the failed endpoints file.
+    Save a failed endpoint to the failed endpoints log.
     
     Args:
         result: The test result to save
     """
-    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.json')
-    
-    # Load existing failed endpoints
-    failed_endpoints = []
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                failed_endpoints = json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading failed endpoints from {filepath}: {str(e)}")
-    
     # Add timestamp to the result
     result_with_timestamp = result.copy()
     result_with_timestamp['timestamp'] = datetime.now().isoformat()
     
-    # Append the new failed endpoint
-    failed_endpoints.append(result_with_timestamp)
+    failed_endpoints_log.append(result_with_timestamp)
+
+
+def iter_failed_endpoints() -> Iterator[Dict[str, Any]]:
+    """
+    Stream failed endpoints from the failed endpoints log.
     
-    # Save the updated list
-    try:
-        with open(filepath, 'w') as f:
-            json.dump(failed_endpoints, f, indent=2)
-        logger.info(f"Saved failed endpoint to {filepath}")
-    except Exception as e:
-        logger.error(f"Error saving failed endpoint to {filepath}: {str(e)}")
+    Returns:
+        Iterator over failed endpoint objects
+    """
+    return iter(failed_endpoints_log)
 
 
 def load_failed_endpoints() -> List[Dict[str, Any]]:
     """
-    Load failed endpoints from the failed endpoints file.
+    Load failed endpoints from the failed endpoints log.
     
     Returns:
         List of failed endpoint objects
     """
-    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.json')
-    try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r') as f:
-                failed_endpoints = json.load(f)
-            logger.info(f"Loaded failed endpoints from {filepath}")
-            return failed_endpoints
-        else:
-            logger.warning(f"File {filepath} not found, returning empty list")
-            return []
-    except Exception as e:
-        logger.error(f"Error loading failed endpoints from {filepath}: {str(e)}")
-        return []
+    return list(iter_failed_endpoints())
+
+
+def clear_failed_endpoints() -> None:
+    """Clear the failed endpoints log."""
+    failed_endpoints_log.clear()
+
+
+class UrnIndex:
+    """
+    Persistent set of hadith URNs, with where each URN was found.
+    
+    Membership checks are constant time. New URNs are appended to a
+    line-delimited log in batches, and the log is read once per process
+    the first time the index is used.
+    """
+    
+    def __init__(self, filename: str = 'urns.jsonl', flush_every: int = URN_FLUSH_EVERY):
+        """
+        Args:
+            filename: The log filename (without path)
+            flush_every: Number of new URNs buffered before they are written
+        """
+        self._log = JsonlLog(filename, flush_every=flush_every)
+        self._sources = None
+        self._lock = threading.Lock()
+    
+    def _ensure_loaded(self) -> Dict[int, Dict[str, Any]]:
+        """Load the log into memory on first use. Caller holds the lock."""
+        if self._sources is None:
+            self._sources = {}
+            for record in self._log:
+                self._sources.setdefault(record['urn'], record)
+        return self._sources
+    
+    def add(self, urn: int, collection: str = None, hadith_number: str = None, lang: str = None) -> bool:
+        """
+        Add a URN to the index.
+        
+        Args:
+            urn: The URN
+            collection: Name of the collection the URN was found in
+            hadith_number: Number of the hadith the URN belongs to
+            lang: Language of the hadith entry
+            
+        Returns:
+            True if the URN was new, False if it was already indexed
+        """
+        with self._lock:
+            sources = self._ensure_loaded()
+            if urn in sources:
+                return False
+            record = {'urn': urn, 'collection': collection, 'hadithNumber': hadith_number, 'lang': lang}
+            sources[urn] = record
+            self._log.append(record)
+            return True
+    
+    def __contains__(self, urn: int) -> bool:
+        with self._lock:
+            return urn in self._ensure_loaded()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ensure_loaded())
+    
+    def urns(self) -> List[int]:
+        """Return all indexed URNs in the order they were added."""
+        with self._lock:
+            return list(self._ensure_loaded())
+    
+    def source(self, urn: int) -> Optional[Dict[str, Any]]:
+        """
+        Look up where a URN was found.
+        
+        Args:
+            urn: The URN
+            
+        Returns:
+            Dictionary with 'urn', 'collection', 'hadithNumber' and 'lang',
+            or None if the URN isn't indexed
+        """
+        with self._lock:
+            return self._ensure_loaded().get(urn)
+    
+    def sample(self, size: int, lang: str = None) -> List[int]:
+        """
+        Pick URNs spread across collections.
+        
+        URNs are taken round-robin from each collection in the order they
+        were added, so a small sample doesn't come from a single collection.
+        No collection can contribute more than size URNs, so only that many
+        candidates are kept per collection, and the log is streamed rather
+        than loaded if the index isn't in memory yet.
+        
+        Args:
+            size: Maximum number of URNs to return
+            lang: Only pick URNs of hadith entries in this language
+            
+        Returns:
+            List of URNs
+        """
+        with self._lock:
+            records = self._sources.values() if self._sources is not None else self._log
+            by_collection = {}
+            seen = set()
+            for record in records:
+                if lang is not None and record.get('lang') != lang:
+                    continue
+                candidates = by_collection.setdefault(record.get('collection'), [])
+                if len(candidates) < size and record['urn'] not in seen:
+                    candidates.append(record['urn'])
+                    seen.add(record['urn'])
+        
+        sample = []
+        queues = [iter(urns) for urns in by_collection.values()]
+        while queues and len(sample) < size:
+            for queue in list(queues):
+                urn = next(queue, None)
+                if urn is None:
+                    queues.remove(queue)
+                    continue
+                sample.append(urn)
+                if len(sample) >= size:
+                    break
+        return sample
+    
+    def flush(self) -> None:
+        """Write buffered URNs to disk."""
+        self._log.flush()
+    
+    def clear(self) -> None:
+        """Remove all URNs from the index and the log."""
+        with self._lock:
+            self._log.clear()
+            self._sources = {}
+
+
+urn_index = UrnIndex()
+
+
+def save_urns(urns: List[int]) -> None:
+    """
+    Save URNs data, replacing the existing index.
+    
+    Args:
+        urns: List of URNs
+    """
+    urn_index.clear()
+    for urn in urns:
+        urn_index.add(urn)
+    urn_index.flush()
+
+
+def load_urns() -> List[int]:
+    """
+    Load URNs data.
+    
+    Returns:
+        List of URNs
+    """
+    return urn_index.urns()
+
+
+def append_urn(urn: int, collection: str = None, hadith_number: str = None, lang: str = None) -> bool:
+    """
+    Add a URN to the URN index if it isn't there yet.
+    
+    Args:
+        urn: The URN to append
+        collection: Name of the collection the URN was found in
+        hadith_number: Number of the hadith the URN belongs to
+        lang: Language of the hadith entry
+        
+    Returns:
+        True if the URN was new
+    """
+    return urn_index.add(urn, collection, hadith_number, lang)
+
+
+def flush_logs() -> None:
+    """Write all buffered results, failures and URNs to disk."""
+    results_log.flush()
+    failed_endpoints_log.flush()
+    urn_index.flush()
+
+
+atexit.register(flush_logs)
@@ -0,0 +1,101 @@
+"""
+Detail checks against expected responses derived from list data.
+
+Books, chapters and hadiths come back in full from the list endpoints, so
+with derive_details enabled the detail endpoints of API2 are compared against
+the API1 list entries already in the crawl store, without requesting API1.
+Every DERIVED_SPOT_CHECK_EVERY-th check of each endpoint template still
+requests API1 for real and verifies that its detail response matches the
+list entry.
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from api_client import ApiResponse, ApiComparisonClient
+from response_comparator import ComparisonResult, Difference, diff_bodies, diff_records
+from latency import endpoint_template
+from comparison_rules import rules_for
+from config import DERIVED_SPOT_CHECK_EVERY
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('derived_details')
+
+# Derived checks made so far, per endpoint template
+_check_counts: Dict[str, int] = {}
+_counts_lock = threading.Lock()
+
+
+def _take_spot_check(endpoint: str) -> bool:
+    template = endpoint_template(endpoint)
+    with _counts_lock:
+        count = _check_counts.get(template, 0)
+        _check_counts[template] = count + 1
+    return DERIVED_SPOT_CHECK_EVERY > 0 and count % DERIVED_SPOT_CHECK_EVERY == 0
+
+
+def _spot_check(endpoint: str, expected: Dict[str, Any], response1: ApiResponse) -> Optional[ComparisonResult]:
+    """Compare API1's real detail response with its list entry."""
+    if not response1.is_success():
+        return None
+
+    result = ComparisonResult(False, [Difference('Derived detail mismatch', "API1 detail response differs "
+                                                 "from its list entry")], endpoint, {'derived_spot_check': True})
+    diff, truncated = diff_bodies(expected, response1.body, rules_for(endpoint), limit=result.remaining())
+    if not diff:
+        return None
+    result.add_differences(diff_records(diff), truncated)
+
+    logger.error(f"❌ API1 {endpoint} differs from its list entry; derived checks of "
+                 f"{endpoint_template(endpoint)} are not reliable")
+    return result
+
+
+def compare_get_derived(client: ApiComparisonClient, endpoint: str, expected: Optional[Dict[str, Any]]
+                        ) -> Tuple[ApiResponse, ApiResponse, Optional[ComparisonResult]]:
+    """
+    Get the API1 and API2 responses for a detail endpoint.
+
+    Args:
+        client: The API comparison client
+        endpoint: The detail endpoint (without the base URL)
+        expected: API1's list entry for the object (None to request API1)
+
+    Returns:
+        Tuple of (api1_response, api2_response, spot check failure or None);
+        api1_response is built from expected unless API1 was requested
+    """
+    if not client.derive_details or expected is None:
+        response1, response2 = client.compare_get(endpoint)
+        return response1, response2, None
+
+    if _take_spot_check(endpoint):
+        logger.info(f"Spot-checking derived response for {endpoint} against API1")
+        response1, response2 = client.compare_get(endpoint)
+        return response1, response2, _spot_check(endpoint, expected, response1)
+
+    logger.info(f"Comparing GET {endpoint} against API1 list data")
+    response2 = client.api2.get(endpoint)
+    logger.info(f"API2 response: {response2.status_code}")
+    return ApiResponse(200, expected), response2, None
+
+
+def compare_get_many_derived(client: ApiComparisonClient,
+                             requests_list: List[Tuple[str, Optional[Dict[str, Any]]]]
+                             ) -> List[Tuple[ApiResponse, ApiResponse, Optional[ComparisonResult]]]:
+    """
+    compare_get_derived for several endpoints, in parallel in concurrent mode.
+
+    Args:
+        client: The API comparison client
+        requests_list: List of (endpoint, expected) tuples
+
+    Returns:
+        The compare_get_derived results, in the same order as requests_list
+    """
+    return client.map(lambda request: compare_get_derived(client, *request), requests_list)
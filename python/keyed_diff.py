@@ -0,0 +1,242 @@
+"""
+Order-insensitive JSON diff that aligns list items by their natural keys.
+
+DeepDiff(ignore_order=True) matches list items without knowing anything about
+them, which gets close to quadratic on large pages. The API's list items all
+carry an identifying field, so they can be paired in a single pass and only
+the matched pairs need to be compared.
+
+Like a hash tree, the diff only descends into branches that differ: every
+object and list is first checked against its counterpart with a C-level
+equality test plus a check of the value types (== alone takes 1, 1.0 and
+true for the same value), so equal subtrees (most hadiths of a page, with
+their long body texts) are skipped without being compared key by key, and
+the cost scales with the size of the difference rather than the size of
+the page.
+
+Comparison rules (see comparison_rules.py) are applied during the same walk,
+so they are only looked at where the responses differ.
+"""
+
+import json
+from collections import Counter
+from itertools import chain
+from typing import Dict, Any, List, Optional, Tuple
+
+# Fields that identify list items, in order of preference:
+# collections (name), books (bookNumber), chapters (chapterId),
+# hadiths (hadithNumber) and the per-language entries nested in them
+# (urn for hadith entries, lang for the other translated blocks).
+LIST_ITEM_KEYS = ('name', 'bookNumber', 'chapterId', 'hadithNumber', 'urn', 'lang')
+
+
+class KeyedDiff(dict):
+    """
+    Differences found by keyed_diff. truncated is True if the diff stopped
+    at its limit with more differences left unrecorded.
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        super().__init__()
+        self.limit = limit
+        self.count = 0
+        self.truncated = False
+
+
+class _LimitReached(Exception):
+    pass
+
+
+def keyed_diff(old: Any, new: Any, item_keys=LIST_ITEM_KEYS, rules=None,
+               keys: Tuple[str, ...] = (), limit: Optional[int] = None) -> KeyedDiff:
+    """
+    Compare two JSON values, ignoring the order of list items.
+
+    Args:
+        old: First value (API1 body)
+        new: Second value (API2 body)
+        item_keys: Candidate fields for aligning list items
+        rules: Comparison rules to apply (a comparison_rules.RuleSet), or None
+        keys: Object keys leading to old and new within the response body,
+            for matching rule paths
+        limit: Stop walking at the first difference past this many (None
+            for no limit)
+
+    Returns:
+        Dictionary mapping difference types (values_changed, type_changes,
+        dictionary_item_added, dictionary_item_removed, iterable_item_added,
+        iterable_item_removed) to {path: value} dictionaries, in the same
+        shape as DeepDiff output. Empty if the values are equal.
+    """
+    diff = KeyedDiff(limit)
+    try:
+        _diff(old, new, 'root', diff, item_keys, rules, keys)
+    except _LimitReached:
+        diff.truncated = True
+    return diff
+
+
+def _add(diff: KeyedDiff, diff_type: str, path: str, value: Any) -> None:
+    if diff.limit is not None and diff.count >= diff.limit:
+        raise _LimitReached()
+    diff.setdefault(diff_type, {})[path] = value
+    diff.count += 1
+
+
+def _equal(old: Any, new: Any) -> bool:
+    """Whether two values are equal, with the same types throughout (unlike ==, 1 != 1.0 != True)."""
+    return type(old) is type(new) and old == new and _same_types(old, new)
+
+
+def _same_types(old: Any, new: Any) -> bool:
+    """Whether two values that compare equal have the same types throughout."""
+    if type(old) is dict:
+        pairs = ((value, new[key]) for key, value in old.items())
+    elif type(old) is list:
+        pairs = zip(old, new)
+    else:
+        return True
+    for value, other in pairs:
+        if type(value) is not type(other):
+            return False
+        if type(value) in _CONTAINERS and not _same_types(value, other):
+            return False
+    return True
+
+
+_CONTAINERS = (dict, list)
+
+
+def _diff(old: Any, new: Any, path: str, diff: Dict[str, Dict[str, Any]], item_keys,
+          rules=None, keys: Tuple[str, ...] = ()) -> None:
+    """Recursively compare two values and record the differences in diff."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        _diff_dicts(old, new, path, diff, item_keys, rules, keys)
+    elif isinstance(old, list) and isinstance(new, list):
+        _diff_lists(old, new, path, diff, item_keys, rules, keys)
+    elif type(old) is not type(new):
+        _add(diff, 'type_changes', path, {
+            'old_type': type(old), 'new_type': type(new),
+            'old_value': old, 'new_value': new
+        })
+    elif old != new:
+        if rules and isinstance(old, str):
+            normalize = rules.field(keys).normalize
+            if normalize and normalize(old) == normalize(new):
+                return
+        _add(diff, 'values_changed', path, {'new_value': new, 'old_value': old})
+
+
+def _diff_dicts(old: Dict[str, Any], new: Dict[str, Any], path: str,
+                diff: Dict[str, Dict[str, Any]], item_keys, rules=None, keys: Tuple[str, ...] = ()) -> None:
+    if _equal(old, new):
+        return
+
+    for key, value in old.items():
+        field = rules.field(keys + (key,)) if rules else None
+        if field and field.ignore:
+            continue
+        child_path = f"{path}[{key!r}]"
+        if key in new:
+            _diff(value, new[key], child_path, diff, item_keys, rules, keys + (key,))
+        elif not (field and field.null_equals_missing and value is None):
+            _add(diff, 'dictionary_item_removed', child_path, value)
+
+    for key, value in new.items():
+        if key not in old:
+            field = rules.field(keys + (key,)) if rules else None
+            if field and (field.ignore or (field.null_equals_missing and value is None)):
+                continue
+            _add(diff, 'dictionary_item_added', f"{path}[{key!r}]", value)
+
+
+def _alignment_key(old: List[Any], new: List[Any], item_keys) -> Optional[str]:
+    """
+    Find a field that identifies every item in both lists.
+
+    Returns:
+        The first key in item_keys that is present in every item and has
+        unique, hashable values within each list, or None if there is none
+    """
+    items = list(chain(old, new))
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+
+    for key in item_keys:
+        if not all(key in item for item in items):
+            continue
+        try:
+            if len({item[key] for item in old}) == len(old) and len({item[key] for item in new}) == len(new):
+                return key
+        except TypeError:
+            # Unhashable key values (e.g. nested objects) can't be used for alignment
+            continue
+
+    return None
+
+
+def _diff_lists(old: List[Any], new: List[Any], path: str,
+                diff: Dict[str, Dict[str, Any]], item_keys, rules=None, keys: Tuple[str, ...] = ()) -> None:
+    if _equal(old, new):
+        return
+
+    key = _alignment_key(old, new, item_keys)
+    if key is not None:
+        _diff_keyed_lists(old, new, key, path, diff, item_keys, rules, keys)
+    else:
+        _diff_unkeyed_lists(old, new, path, diff, item_keys, rules, keys)
+
+
+def _diff_keyed_lists(old: List[Dict[str, Any]], new: List[Dict[str, Any]], key: str, path: str,
+                      diff: Dict[str, Dict[str, Any]], item_keys, rules=None, keys: Tuple[str, ...] = ()) -> None:
+    """Pair items by key, diff each pair and report unmatched items."""
+    new_by_key = {item[key]: item for item in new}
+
+    for item in old:
+        other = new_by_key.pop(item[key], None)
+        if other is None:
+            _add(diff, 'iterable_item_removed', f"{path}[{key}={item[key]!r}]", item)
+        elif not _equal(item, other):
+            _diff(item, other, f"{path}[{key}={item[key]!r}]", diff, item_keys, rules, keys)
+
+    for item_key, item in new_by_key.items():
+        _add(diff, 'iterable_item_added', f"{path}[{key}={item_key!r}]", item)
+
+
+def _fingerprint(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _diff_unkeyed_lists(old: List[Any], new: List[Any], path: str,
+                        diff: Dict[str, Dict[str, Any]], item_keys, rules=None, keys: Tuple[str, ...] = ()) -> None:
+    """
+    Compare lists without an identifying field.
+
+    Identical items are matched as a multiset; whatever is left over is
+    paired up by position and compared recursively, and any surplus is
+    reported as added or removed.
+    """
+    remaining = Counter(_fingerprint(item) for item in new)
+    unmatched_old = []
+    for index, item in enumerate(old):
+        fingerprint = _fingerprint(item)
+        if remaining[fingerprint] > 0:
+            remaining[fingerprint] -= 1
+        else:
+            unmatched_old.append((index, item))
+
+    unmatched_new = []
+    for index, item in enumerate(new):
+        fingerprint = _fingerprint(item)
+        if remaining[fingerprint] > 0:
+            remaining[fingerprint] -= 1
+            unmatched_new.append((index, item))
+
+    for (old_index, old_item), (_, new_item) in zip(unmatched_old, unmatched_new):
+        _diff(old_item, new_item, f"{path}[{old_index}]", diff, item_keys, rules, keys)
+
+    for index, item in unmatched_old[len(unmatched_new):]:
+        _add(diff, 'iterable_item_removed', f"{path}[{index}]", item)
+
+    for index, item in unmatched_new[len(unmatched_old):]:
+        _add(diff, 'iterable_item_added', f"{path}[{index}]", item)
@@ -0,0 +1,181 @@
+"""
+Latency samples per endpoint template, for comparing API1 and API2 speed.
+"""
+
+import math
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('latency')
+
+# Path segments that are followed by an identifier, and the name used for it
+PATH_PARAMETERS = {
+    'collections': '{collectionName}',
+    'books': '{bookNumber}',
+    'chapters': '{chapterId}',
+    'hadiths': '{hadithNumber}',
+}
+
+# Upper bounds (in milliseconds) of the histogram buckets
+HISTOGRAM_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Replace the identifiers in an endpoint with parameter names.
+
+    For example 'collections/bukhari/books/3/hadiths' becomes
+    'collections/{collectionName}/books/{bookNumber}/hadiths', and
+    'hadiths/1234' becomes 'hadiths/{urn}'.
+
+    Args:
+        endpoint: The API endpoint (without the base URL)
+
+    Returns:
+        The endpoint template
+    """
+    segments = endpoint.strip('/').split('/')
+    template = []
+    for i, segment in enumerate(segments):
+        previous = segments[i - 1] if i > 0 else None
+        if i % 2 == 1 and previous in PATH_PARAMETERS:
+            if previous == 'hadiths' and i == 1:
+                # Top-level /hadiths/{urn}, apart from /hadiths/random
+                template.append(segment if segment == 'random' else '{urn}')
+            else:
+                template.append(PATH_PARAMETERS[previous])
+        else:
+            template.append(segment)
+    return '/'.join(template)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction (0.95 for p95)
+
+    Returns:
+        The percentile, or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    # Round first so float noise (0.95 * 300 = 285.00000000000006) doesn't skip a rank
+    rank = max(1, math.ceil(round(fraction * len(sorted_values), 9)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, Any]:
+    """
+    Summarize latency samples.
+
+    Args:
+        samples: Samples with 'elapsed', 'ttfb' (seconds) and 'size' (bytes)
+
+    Returns:
+        Dictionary with the sample count, total time and time-to-first-byte
+        percentiles in milliseconds, mean response size and a histogram of
+        total times
+    """
+    elapsed = sorted(s['elapsed'] * 1000 for s in samples)
+    ttfb = sorted(s['ttfb'] * 1000 for s in samples if s.get('ttfb') is not None)
+    sizes = [s['size'] for s in samples if s.get('size') is not None]
+
+    histogram = {}
+    for bound in HISTOGRAM_BUCKETS_MS:
+        histogram[f'<={bound}ms'] = 0
+    histogram[f'>{HISTOGRAM_BUCKETS_MS[-1]}ms'] = 0
+    for value in elapsed:
+        for bound in HISTOGRAM_BUCKETS_MS:
+            if value <= bound:
+                histogram[f'<={bound}ms'] += 1
+                break
+        else:
+            histogram[f'>{HISTOGRAM_BUCKETS_MS[-1]}ms'] += 1
+
+    return {
+        'count': len(elapsed),
+        'p50_ms': percentile(elapsed, 0.50),
+        'p95_ms': percentile(elapsed, 0.95),
+        'p99_ms': percentile(elapsed, 0.99),
+        'max_ms': elapsed[-1] if elapsed else None,
+        'ttfb_p50_ms': percentile(ttfb, 0.50),
+        'ttfb_p95_ms': percentile(ttfb, 0.95),
+        'mean_size_bytes': sum(sizes) / len(sizes) if sizes else None,
+        'histogram': histogram
+    }
+
+
+class LatencyRecorder:
+    """Thread-safe collection of latency samples per implementation and endpoint template."""
+
+    def __init__(self):
+        self._samples: Dict[str, Dict[str, List[Dict[str, float]]]] = {}
+        self._endpoints: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def record(self, implementation: str, endpoint: str, elapsed: float,
+               ttfb: float = None, size: int = None) -> None:
+        """
+        Record one request.
+
+        Args:
+            implementation: Which API served the request ('API1' or 'API2')
+            endpoint: The API endpoint (without the base URL)
+            elapsed: Total request time in seconds
+            ttfb: Time to first byte in seconds
+            size: Response body size in bytes
+        """
+        template = endpoint_template(endpoint)
+        sample = {'elapsed': elapsed, 'ttfb': ttfb, 'size': size}
+        with self._lock:
+            self._samples.setdefault(template, {}).setdefault(implementation, []).append(sample)
+            self._endpoints.setdefault(template, set()).add(endpoint)
+
+    def endpoints(self, template: str) -> List[str]:
+        """Return the concrete endpoints seen for a template."""
+        with self._lock:
+            return sorted(self._endpoints.get(template, ()))
+
+    def count(self, template: str, implementation: str) -> int:
+        """Return the number of samples for one template and implementation."""
+        with self._lock:
+            return len(self._samples.get(template, {}).get(implementation, ()))
+
+    def samples(self, template: str, implementation: str) -> List[Dict[str, float]]:
+        """Return a copy of the samples for one template and implementation."""
+        with self._lock:
+            return list(self._samples.get(template, {}).get(implementation, []))
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Summarize all samples.
+
+        Returns:
+            Mapping of endpoint template to {implementation: summary}
+        """
+        with self._lock:
+            snapshot = {template: {impl: list(samples) for impl, samples in by_impl.items()}
+                        for template, by_impl in self._samples.items()}
+
+        return {
+            template: {impl: summarize(samples) for impl, samples in sorted(by_impl.items())}
+            for template, by_impl in sorted(snapshot.items())
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples = {}
+            self._endpoints = {}
+
+
+# Shared recorder for the API clients of a run
+latency_recorder = LatencyRecorder()
@@ -0,0 +1,161 @@
+"""
+Latency regression gate: fails a run when API2 is slower than API1 by more
+than the configured ratio or absolute budget.
+"""
+
+import logging
+import time
+from typing import Dict, Any, List, Tuple
+
+from api_client import ApiComparisonClient
+from latency import LatencyRecorder, latency_recorder
+from config import (
+    LATENCY_GATE_MAX_RATIO, LATENCY_GATE_MAX_EXTRA_MS, LATENCY_GATE_PERCENTILES,
+    LATENCY_GATE_MAX_TOP_UP_REQUESTS, LATENCY_GATE_MAX_TOP_UP_SECONDS
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('latency_gate')
+
+# Endpoint templates whose latency isn't gated (responses vary by design)
+UNGATED_TEMPLATES = ('hadiths/random',)
+
+# Comparisons per batch of the top-up; the time bound is checked between batches
+TOP_UP_BATCH_SIZE = 20
+
+
+def required_samples(percentiles: Dict[str, int] = LATENCY_GATE_PERCENTILES) -> int:
+    """Number of samples per API needed to judge every gated percentile."""
+    return max(percentiles.values()) if percentiles else 0
+
+
+def top_up_latency_samples(client: ApiComparisonClient,
+                           recorder: LatencyRecorder = latency_recorder,
+                           percentiles: Dict[str, int] = LATENCY_GATE_PERCENTILES,
+                           max_requests: int = LATENCY_GATE_MAX_TOP_UP_REQUESTS,
+                           max_seconds: float = LATENCY_GATE_MAX_TOP_UP_SECONDS) -> int:
+    """
+    Re-request already tested endpoints of under-sampled templates.
+
+    Endpoints of each template are requested round-robin until both APIs have
+    the required number of samples, max_requests comparisons have been made,
+    or max_seconds have passed. When API1 is rate limited, the number of
+    comparisons is also capped to what the rate allows in max_seconds, and
+    the projected duration is logged before any request is made.
+
+    Args:
+        client: The API comparison client
+        recorder: Latency recorder that receives the samples
+        percentiles: Gated percentiles and the samples each one needs
+        max_requests: Upper bound on the number of extra comparisons
+        max_seconds: Upper bound on the time spent (None for no limit)
+
+    Returns:
+        Number of extra comparisons made
+    """
+    needed = required_samples(percentiles)
+    rate = client.api1.rate_limiter.max_rate
+    if rate and max_seconds is not None:
+        max_requests = min(max_requests, int(rate * max_seconds))
+
+    # Plan the top-up first, so its duration can be projected
+    plan = []
+    planned = 0
+    for template, by_impl in recorder.summary().items():
+        if template in UNGATED_TEMPLATES:
+            continue
+        if 'API1' not in by_impl:
+            # API1 isn't timed in replay mode, so more requests wouldn't help
+            continue
+
+        missing = needed - min(recorder.count(template, 'API1'), recorder.count(template, 'API2'))
+        if missing <= 0:
+            continue
+
+        missing = min(missing, max_requests - planned)
+        if missing <= 0:
+            logger.warning("Latency top-up request budget exhausted; some templates stay under-sampled")
+            break
+        plan.append((template, missing))
+        planned += missing
+
+    if not plan:
+        return 0
+    if rate:
+        logger.info(f"Latency top-up: {planned} extra comparisons for {len(plan)} templates, "
+                    f"about {planned / rate:.0f}s at API1's rate limit of {rate:g} requests per second")
+    else:
+        logger.info(f"Latency top-up: {planned} extra comparisons for {len(plan)} templates")
+
+    deadline = time.monotonic() + max_seconds if max_seconds is not None else None
+    made = 0
+    for template, missing in plan:
+        endpoints = recorder.endpoints(template)
+        logger.info(f"Taking {missing} more latency samples for {template}")
+        for start in range(0, missing, TOP_UP_BATCH_SIZE):
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"Latency top-up stopped after {max_seconds:g}s and {made} comparisons; "
+                               f"some templates stay under-sampled")
+                return made
+            count = min(TOP_UP_BATCH_SIZE, missing - start)
+            requests_list = [(endpoints[i % len(endpoints)], None) for i in range(start, start + count)]
+            # The point is new timings, so don't serve these from the response cache
+            client.compare_get_many(requests_list, use_cache=False)
+            made += count
+
+    return made
+
+
+def evaluate_latency_gate(summary: Dict[str, Dict[str, Dict[str, Any]]],
+                          max_ratio: float = LATENCY_GATE_MAX_RATIO,
+                          max_extra_ms: float = LATENCY_GATE_MAX_EXTRA_MS,
+                          percentiles: Dict[str, int] = LATENCY_GATE_PERCENTILES
+                          ) -> Tuple[List[str], List[str]]:
+    """
+    Compare API2 latency percentiles against API1's.
+
+    A percentile is only judged when both APIs have at least the number of
+    samples configured for it.
+
+    Args:
+        summary: Latency summary (as returned by LatencyRecorder.summary)
+        max_ratio: Maximum allowed API2/API1 ratio (None to disable)
+        max_extra_ms: Maximum allowed API2 - API1 difference in ms (None to disable)
+        percentiles: Gated percentiles and the samples each one needs
+
+    Returns:
+        Tuple of (violations, skipped), each a list of human-readable messages
+    """
+    violations = []
+    skipped = []
+
+    for template, by_impl in summary.items():
+        if template in UNGATED_TEMPLATES:
+            continue
+
+        stats1 = by_impl.get('API1')
+        stats2 = by_impl.get('API2')
+        if not stats1 or not stats2:
+            skipped.append(f"{template}: no samples for {'API1' if not stats1 else 'API2'}")
+            continue
+
+        for key, min_samples in percentiles.items():
+            samples = min(stats1['count'], stats2['count'])
+            if samples < min_samples:
+                skipped.append(f"{template} {key}: {samples} samples, {min_samples} needed")
+                continue
+
+            value1 = stats1[key]
+            value2 = stats2[key]
+            if max_ratio is not None and value1 > 0 and value2 / value1 > max_ratio:
+                violations.append(f"{template} {key}: API2 {value2:.1f}ms is {value2 / value1:.2f}x "
+                                  f"API1 {value1:.1f}ms (max {max_ratio:.2f}x)")
+            elif max_extra_ms is not None and value2 - value1 > max_extra_ms:
+                violations.append(f"{template} {key}: API2 {value2:.1f}ms is {value2 - value1:.1f}ms "
+                                  f"slower than API1 {value1:.1f}ms (max {max_extra_ms}ms)")
+
+    return violations, skipped
@@ -0,0 +1,239 @@
+"""
+Open-loop load generation against API2, replaying the endpoints found by
+earlier crawls.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from api_client import ApiClient
+from data_store import crawl_store, urn_index
+from latency import endpoint_template, percentile
+from config import (
+    API_IMPL2, OUTPUT_DIR, REQUEST_TIMEOUT, DEFAULT_LIMIT,
+    LOAD_TARGET_RPS, LOAD_DURATION, LOAD_MAX_IN_FLIGHT
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('load_generator')
+
+
+def build_endpoint_corpus() -> List[str]:
+    """
+    Build the list of endpoints to replay from the crawl store and URN index.
+
+    Every crawled entity contributes its endpoints once, so the request mix
+    follows the shape of the real corpus (mostly hadith lookups).
+
+    Returns:
+        List of endpoints (without the base URL)
+    """
+    corpus = ['collections', 'hadiths/random']
+
+    for collection_name in crawl_store.collection_names():
+        corpus.append(f'collections/{collection_name}')
+        corpus.append(f'collections/{collection_name}/books')
+
+    for collection_name, book_number in crawl_store.book_keys():
+        base = f'collections/{collection_name}/books/{book_number}'
+        corpus.extend([base, f'{base}/chapters', f'{base}/hadiths'])
+
+    for collection_name, book_number, chapter_id in crawl_store.chapter_keys():
+        corpus.append(f'collections/{collection_name}/books/{book_number}/chapters/{chapter_id}')
+
+    for collection_name, _, hadith_number in crawl_store.hadith_keys():
+        corpus.append(f'collections/{collection_name}/hadiths/{hadith_number}')
+
+    for urn in urn_index.urns():
+        corpus.append(f'hadiths/{urn}')
+
+    return corpus
+
+
+def _summarize_latencies(latencies_ms: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(latencies_ms)
+    return {
+        'count': len(values),
+        'p50_ms': percentile(values, 0.50),
+        'p90_ms': percentile(values, 0.90),
+        'p95_ms': percentile(values, 0.95),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': values[-1] if values else None
+    }
+
+
+class LoadGenerator:
+    """
+    Sends requests on a fixed schedule (open loop).
+
+    Request i is due at start + i / rps whether or not earlier requests have
+    completed, so a slow server can't slow the load down. Latency is measured
+    from the time a request was due, which includes any time it spent waiting
+    for a free worker.
+    """
+
+    def __init__(self, client: ApiClient, corpus: List[str], rps: float = LOAD_TARGET_RPS,
+                 duration: float = LOAD_DURATION, max_in_flight: int = LOAD_MAX_IN_FLIGHT,
+                 seed: int = None):
+        """
+        Args:
+            client: Client for the API under load (its session is used directly,
+                without retries or rate limiting)
+            corpus: Endpoints to pick requests from
+            rps: Target requests per second
+            duration: Length of the test in seconds
+            max_in_flight: Number of worker threads for outstanding requests
+            seed: Random seed for picking endpoints
+        """
+        self.client = client
+        self.corpus = corpus
+        self.rps = rps
+        self.duration = duration
+        self.max_in_flight = max_in_flight
+        self._random = random.Random(seed)
+
+        adapter = HTTPAdapter(pool_maxsize=max_in_flight)
+        client.session.mount('http://', adapter)
+        client.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._samples: List[Dict[str, Any]] = []
+        self._max_dispatch_lag = 0.0
+
+    def _send(self, endpoint: str, due: float) -> None:
+        started = time.perf_counter()
+        status_code = 0
+        error = None
+        try:
+            response = self.client.session.get(
+                f"{self.client.base_url}/{endpoint}",
+                params={'limit': DEFAULT_LIMIT} if endpoint.endswith(('books', 'chapters', 'hadiths')) else None,
+                timeout=REQUEST_TIMEOUT
+            )
+            response.content  # Read the whole body
+            status_code = response.status_code
+        except RequestException as e:
+            error = str(e)
+        finished = time.perf_counter()
+
+        with self._lock:
+            self._samples.append({
+                'template': endpoint_template(endpoint),
+                'status_code': status_code,
+                'error': error,
+                'failed': error is not None or not 200 <= status_code < 300,
+                'latency_ms': (finished - due) * 1000,
+                'service_ms': (finished - started) * 1000,
+                'finished': finished
+            })
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run the load test.
+
+        Returns:
+            Report with achieved throughput, error rate and latency percentiles,
+            overall and per endpoint template
+        """
+        total_requests = int(self.rps * self.duration)
+        logger.info(f"Sending {total_requests} requests at {self.rps} req/s for {self.duration}s "
+                    f"to {self.client.base_url} ({len(self.corpus)} endpoints in corpus)")
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='load')
+        start = time.perf_counter()
+        for i in range(total_requests):
+            due = start + i / self.rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._max_dispatch_lag = max(self._max_dispatch_lag, -delay)
+            executor.submit(self._send, self._random.choice(self.corpus), due)
+        executor.shutdown(wait=True)
+
+        return self._report(start, total_requests)
+
+    def _report(self, start: float, total_requests: int) -> Dict[str, Any]:
+        samples = self._samples
+        failures = sum(1 for s in samples if s['failed'])
+        elapsed = (max(s['finished'] for s in samples) - start) if samples else 0.0
+
+        by_template = {}
+        for sample in samples:
+            by_template.setdefault(sample['template'], []).append(sample)
+
+        status_codes = {}
+        for sample in samples:
+            key = str(sample['status_code']) if not sample['error'] else 'error'
+            status_codes[key] = status_codes.get(key, 0) + 1
+
+        return {
+            'generated': datetime.now().isoformat(),
+            'base_url': self.client.base_url,
+            'target_rps': self.rps,
+            'duration_s': self.duration,
+            'requests': total_requests,
+            'completed': len(samples),
+            'achieved_rps': len(samples) / elapsed if elapsed else 0.0,
+            'error_rate': failures / len(samples) if samples else 0.0,
+            'status_codes': status_codes,
+            'max_dispatch_lag_ms': self._max_dispatch_lag * 1000,
+            'latency': _summarize_latencies([s['latency_ms'] for s in samples]),
+            'service_time': _summarize_latencies([s['service_ms'] for s in samples]),
+            'templates': {
+                template: {
+                    'error_rate': sum(1 for s in items if s['failed']) / len(items),
+                    **_summarize_latencies([s['latency_ms'] for s in items])
+                }
+                for template, items in sorted(by_template.items())
+            }
+        }
+
+
+def run_load_test(rps: float = LOAD_TARGET_RPS, duration: float = LOAD_DURATION,
+                  max_in_flight: int = LOAD_MAX_IN_FLIGHT) -> Optional[Dict[str, Any]]:
+    """
+    Replay the crawled endpoint corpus against API2 and write output/load_report.json.
+
+    Args:
+        rps: Target requests per second
+        duration: Length of the test in seconds
+        max_in_flight: Number of worker threads for outstanding requests
+
+    Returns:
+        The load report, or None if there is no crawled corpus to replay
+    """
+    corpus = build_endpoint_corpus()
+    if len(corpus) <= 2:
+        logger.error("No crawled endpoints found; run the regression tests first to build the corpus")
+        return None
+
+    client = ApiClient(API_IMPL2['base_url'], API_IMPL2['api_key'], name='API2')
+    report = LoadGenerator(client, corpus, rps, duration, max_in_flight).run()
+
+    report_path = os.path.join(OUTPUT_DIR, 'load_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    latency = report['latency']
+    logger.info(f"Achieved {report['achieved_rps']:.1f} req/s (target {rps}), "
+                f"error rate {report['error_rate'] * 100:.2f}%")
+    if latency['count']:
+        logger.info(f"Latency p50 {latency['p50_ms']:.1f}ms, p95 {latency['p95_ms']:.1f}ms, "
+                    f"p99 {latency['p99_ms']:.1f}ms, max {latency['max_ms']:.1f}ms")
+    logger.info(f"Load report written to {report_path}")
+    return report
@@ -9,12 +9,23 @@ import argparse
 import time
 from typing import Dict, Any, List
 
+from api_client import ApiComparisonClient
 from test_collections import run_collections_tests
 from test_books import run_books_tests
 from test_hadiths import run_hadiths_tests
+from streaming_crawl import run_streaming_tests
+from load_generator import run_load_test
 from report_generator import generate_html_report, generate_json_report
-from data_store import load_failed_endpoints
-from config import OUTPUT_DIR, API_IMPL1, API_IMPL2
+from latency import latency_recorder
+from latency_gate import top_up_latency_samples, evaluate_latency_gate
+from data_store import (
+    load_failed_endpoints, clear_test_results, append_test_result, flush_logs
+)
+from cassette import CASSETTE_OFF, CASSETTE_RECORD, CASSETTE_REPLAY, CASSETTE_MODES
+from config import (
+    OUTPUT_DIR, API_IMPL1, API_IMPL2, CONCURRENT_MODE, API1_CASSETTE_MODE, LATENCY_GATE_TOP_UP,
+    LARGE_PAGES, DERIVE_DETAILS, LOAD_TARGET_RPS, LOAD_DURATION, COMPARISON_PROCESSES
+)
 
 # Set up logging
 logging.basicConfig(
@@ -50,6 +61,81 @@ def parse_args():
         help='Run only hadiths tests'
     )
     
+    parser.add_argument(
+        '--concurrent',
+        action='store_true',
+        help='Request both APIs at the same time and run comparisons in parallel'
+    )
+    
+    parser.add_argument(
+        '--comparison-processes',
+        type=int,
+        default=COMPARISON_PROCESSES,
+        help=f'Compare responses in this many worker processes while fetching goes on (default: {COMPARISON_PROCESSES})'
+    )
+    
+    parser.add_argument(
+        '--large-pages',
+        action='store_true',
+        help='Request list endpoints with the largest page size both APIs accept and compare them in standard-size windows'
+    )
+    
+    parser.add_argument(
+        '--derive-details',
+        action='store_true',
+        help='Compare API2 book, chapter and hadith details against API1 list data, spot-checking API1'
+    )
+    
+    parser.add_argument(
+        '--streaming',
+        action='store_true',
+        help='Run all tests as one streaming crawl instead of separate phases'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Resume the last streaming crawl from its checkpoint (implies --streaming)'
+    )
+    
+    parser.add_argument(
+        '--latency-gate',
+        action='store_true',
+        help="Fail the run when API2's p95/p99 latency is worse than API1's beyond the configured limits"
+    )
+    
+    parser.add_argument(
+        '--load',
+        action='store_true',
+        help='Instead of running tests, replay the crawled endpoints against API2 at a fixed request rate'
+    )
+    
+    parser.add_argument(
+        '--rps',
+        type=float,
+        default=LOAD_TARGET_RPS,
+        help=f'Requests per second for --load (default: {LOAD_TARGET_RPS})'
+    )
+    
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=LOAD_DURATION,
+        help=f'Length of the --load run in seconds (default: {LOAD_DURATION})'
+    )
+    
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        '--record',
+        action='store_true',
+        help='Record API1 responses to the cassette store'
+    )
+    cassette_group.add_argument(
+        '--replay',
+        action='store_true',
+        help='Serve API1 responses from the cassette store instead of the network'
+    )
+    
     parser.add_argument(
         '--no-report',
         action='store_true',
@@ -62,6 +148,13 @@ def parse_args():
 def main():
     """Run all tests and generate reports."""
     args = parse_args()
+    if args.resume:
+        args.streaming = True
+    
+    if args.load:
+        logger.info(f"Starting load test against API2: {API_IMPL2['base_url']}")
+        report = run_load_test(rps=args.rps, duration=args.duration)
+        return 0 if report is not None else 1
     
     start_time = time.time()
     logger.info("Starting API regression tests")
@@ -77,34 +170,87 @@ def main():
     api2_key_masked = API_IMPL2['api_key'][:4] + '*' * (len(API_IMPL2['api_key']) - 4) if API_IMPL2['api_key'] else 'Not set'
     logger.info(f"API2 Key: {api2_key_masked}")
     
+    cassette_mode = API1_CASSETTE_MODE
+    if args.record:
+        cassette_mode = CASSETTE_RECORD
+    elif args.replay:
+        cassette_mode = CASSETTE_REPLAY
+    if cassette_mode not in CASSETTE_MODES:
+        logger.error(f"Invalid API1 cassette mode: {cassette_mode}")
+        return 2
+    
+    client = ApiComparisonClient(concurrent=args.concurrent or CONCURRENT_MODE, cassette_mode=cassette_mode,
+                                 large_pages=args.large_pages or LARGE_PAGES,
+                                 derive_details=args.derive_details or DERIVE_DETAILS,
+                                 comparison_processes=args.comparison_processes)
+    if cassette_mode != CASSETTE_OFF:
+        logger.info(f"API1 cassette mode: {cassette_mode} ({client.api1.cassette.directory})")
+    if client.concurrent:
+        logger.info(f"Concurrent mode enabled (max {client.max_workers} comparisons in flight)")
+    if client.large_pages:
+        logger.info("Large-page mode enabled")
+    if client.derive_details:
+        logger.info("Deriving API1 detail responses from list data")
+    
     all_results = []
     
+    # Start a fresh results log for this run (failed endpoints are kept across runs)
+    clear_test_results()
+    
+    # Run everything as one crawl, where each discovered entity schedules its own checks
+    if args.streaming:
+        logger.info("Resuming streaming crawl" if args.resume else "Running streaming crawl")
+        streaming_results = run_streaming_tests(client, resume=args.resume)
+        all_results.extend(streaming_results)
+        for result in streaming_results:
+            append_test_result(result)
+    
     # Run collections tests
-    if not args.books_only and not args.hadiths_only:
+    if not args.streaming and not args.books_only and not args.hadiths_only:
         logger.info("Running collections tests")
-        collections_results = run_collections_tests()
+        collections_results = run_collections_tests(client)
         all_results.extend(collections_results)
+        for result in collections_results:
+            append_test_result(result)
         logger.info(f"Completed collections tests: {len(collections_results)} tests run")
     
     # Run books tests
-    if not args.collections_only and not args.hadiths_only:
+    if not args.streaming and not args.collections_only and not args.hadiths_only:
         logger.info("Running books tests")
-        books_results = run_books_tests()
+        books_results = run_books_tests(client)
         all_results.extend(books_results)
+        for result in books_results:
+            append_test_result(result)
         logger.info(f"Completed books tests: {len(books_results)} tests run")
     
     # Run hadiths tests
-    if not args.collections_only and not args.books_only:
+    if not args.streaming and not args.collections_only and not args.books_only:
         logger.info("Running hadiths tests")
-        hadiths_results = run_hadiths_tests()
+        hadiths_results = run_hadiths_tests(client)
         all_results.extend(hadiths_results)
+        for result in hadiths_results:
+            append_test_result(result)
         logger.info(f"Completed hadiths tests: {len(hadiths_results)} tests run")
     
+    # Make sure every endpoint template has enough samples for the latency gate
+    if args.latency_gate and LATENCY_GATE_TOP_UP:
+        extra = top_up_latency_samples(client)
+        if extra:
+            logger.info(f"Made {extra} extra requests for latency samples")
+    
+    client.close()
+    flush_logs()
+    if client.cache:
+        stats = client.cache.stats()
+        logger.info(f"Response cache: {stats['hits']} hits, {stats['coalesced']} coalesced, "
+                    f"{stats['misses']} fetched")
+    
     # Generate reports
     if not args.no_report:
         logger.info("Generating reports")
-        html_report_path = generate_html_report(all_results)
-        json_report_path = generate_json_report(all_results)
+        latency = latency_recorder.summary()
+        html_report_path = generate_html_report(all_results, latency=latency)
+        json_report_path = generate_json_report(all_results, latency=latency)
         logger.info(f"Reports generated at {html_report_path} and {json_report_path}")
     
     # Calculate statistics
@@ -133,7 +279,7 @@ def main():
         logger.info("Failed Endpoints")
         logger.info("=" * 80)
         logger.info(f"Total Failed Endpoints: {len(failed_endpoints)}")
-        logger.info("Failed endpoints are saved to: output/failed_endpoints.json")
+        logger.info(f"Failed endpoints are saved to: {os.path.join(OUTPUT_DIR, 'failed_endpoints.jsonl')}")
         
         # Group by endpoint
         endpoint_failures = {}
@@ -147,10 +293,27 @@ def main():
         for endpoint, count in endpoint_failures.items():
             logger.info(f"  - {endpoint}: {count} failures")
     
+    # Check API2 latency against API1
+    latency_failed = False
+    if args.latency_gate:
+        violations, skipped = evaluate_latency_gate(latency_recorder.summary())
+        logger.info("=" * 80)
+        logger.info("Latency Gate")
+        logger.info("=" * 80)
+        for message in skipped:
+            logger.warning(f"  Not enough data: {message}")
+        for message in violations:
+            logger.error(f"  - {message}")
+        if violations:
+            latency_failed = True
+            logger.error(f"Latency gate failed: {len(violations)} regressions")
+        else:
+            logger.info("Latency gate passed")
+    
     logger.info("=" * 80)
     
     # Return exit code based on test results
-    return 0 if failed_tests == 0 else 1
+    return 0 if failed_tests == 0 and not latency_failed else 1
 
 
 if __name__ == '__main__':
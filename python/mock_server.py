@@ -0,0 +1,419 @@
+"""
+Local stand-in for the Sunnah.com API with a synthetic dataset.
+
+Serves the same /v1 routes the tests call, so the harness can be run and
+benchmarked without network access:
+
+    python mock_server.py --port 8084 --scale 10 --latency-ms 20
+
+Two instances with different --drift-rate values can stand in for API1 and
+API2 to exercise the comparison code.
+"""
+
+import json
+import time
+import zlib
+import random
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from config import (
+    DEFAULT_LIMIT, MAX_LIMIT,
+    MOCK_SERVER_PORT, MOCK_COLLECTIONS, MOCK_BOOKS_PER_COLLECTION,
+    MOCK_CHAPTERS_PER_BOOK, MOCK_HADITHS_PER_BOOK
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('mock_server')
+
+COLLECTION_NAMES = ('bukhari', 'muslim', 'nasai', 'abudawud', 'tirmidhi', 'ibnmajah', 'malik', 'ahmad')
+
+# URNs are assigned from here upwards, two per hadith (English, then Arabic)
+URN_BASE = 100000
+
+ARABIC_BODY = 'حَدَّثَنَا عَبْدُ اللَّهِ بْنُ يُوسُفَ قَالَ أَخْبَرَنَا مَالِكٌ عَنْ نَافِعٍ'
+
+
+class MockDataset:
+    """
+    Deterministic synthetic collections, books, chapters and hadiths.
+
+    Nothing is stored: every entity is generated from its position when it is
+    requested, so the dataset can be made much larger than the real corpus.
+    """
+
+    def __init__(self, collections: int = MOCK_COLLECTIONS,
+                 books_per_collection: int = MOCK_BOOKS_PER_COLLECTION,
+                 chapters_per_book: int = MOCK_CHAPTERS_PER_BOOK,
+                 hadiths_per_book: int = MOCK_HADITHS_PER_BOOK,
+                 drift_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            collections: Number of collections
+            books_per_collection: Number of books in each collection
+            chapters_per_book: Number of chapters in each book
+            hadiths_per_book: Number of hadiths in each book
+            drift_rate: Fraction of entities whose content is altered, to
+                simulate differences between implementations
+            seed: Selects which entities drift
+        """
+        self.collection_names = [
+            COLLECTION_NAMES[i] if i < len(COLLECTION_NAMES) else f'collection{i + 1}'
+            for i in range(collections)
+        ]
+        self.books_per_collection = books_per_collection
+        self.chapters_per_book = max(1, min(chapters_per_book, hadiths_per_book))
+        self.hadiths_per_book = hadiths_per_book
+        self.drift_rate = drift_rate
+        self.seed = seed
+
+    @property
+    def total_hadiths(self) -> int:
+        return len(self.collection_names) * self.books_per_collection * self.hadiths_per_book
+
+    def _drifted(self, *key: Any) -> bool:
+        """Whether the entity identified by key is altered (stable across requests)."""
+        if not self.drift_rate:
+            return False
+        digest = zlib.crc32(json.dumps([self.seed, *key]).encode())
+        return digest / 0xFFFFFFFF < self.drift_rate
+
+    def _collection_index(self, collection_name: str) -> Optional[int]:
+        try:
+            return self.collection_names.index(collection_name)
+        except ValueError:
+            return None
+
+    def _book_number(self, value: str) -> Optional[int]:
+        if value.isdigit() and 1 <= int(value) <= self.books_per_collection:
+            return int(value)
+        return None
+
+    # Entities
+
+    def collection(self, index: int) -> Dict[str, Any]:
+        name = self.collection_names[index]
+        total = self.books_per_collection * self.hadiths_per_book
+        return {
+            'name': name,
+            'hasBooks': True,
+            'hasChapters': True,
+            'collection': [
+                {'lang': 'en', 'title': f'Collection {name.title()}', 'shortIntro': f'Synthetic collection {name}'},
+                {'lang': 'ar', 'title': f'كتاب {index + 1}', 'shortIntro': ''}
+            ],
+            'totalHadith': total,
+            'totalAvailableHadith': total
+        }
+
+    def book(self, index: int, book_number: int) -> Dict[str, Any]:
+        start = (book_number - 1) * self.hadiths_per_book + 1
+        name = f'Book {book_number}'
+        if self._drifted('book', index, book_number):
+            name += ' (revised)'
+        return {
+            'bookNumber': str(book_number),
+            'book': [
+                {'lang': 'en', 'name': name},
+                {'lang': 'ar', 'name': f'كتاب {book_number}'}
+            ],
+            'hadithStartNumber': start,
+            'hadithEndNumber': start + self.hadiths_per_book - 1,
+            'numberOfHadith': self.hadiths_per_book
+        }
+
+    def chapter(self, index: int, book_number: int, chapter_number: int) -> Dict[str, Any]:
+        title = f'Chapter {chapter_number} of book {book_number}'
+        if self._drifted('chapter', index, book_number, chapter_number):
+            title = title.upper()
+        return {
+            'bookNumber': str(book_number),
+            'chapterId': f'{chapter_number}.00',
+            'chapter': [
+                {'lang': 'en', 'chapterNumber': str(chapter_number), 'chapterTitle': title,
+                 'intro': None, 'ending': None},
+                {'lang': 'ar', 'chapterNumber': str(chapter_number), 'chapterTitle': f'باب {chapter_number}',
+                 'intro': None, 'ending': None}
+            ]
+        }
+
+    def hadith(self, index: int, book_number: int, position: int) -> Dict[str, Any]:
+        """Hadith at a 0-based position within a book."""
+        hadith_number = (book_number - 1) * self.hadiths_per_book + position + 1
+        chapter_number = position * self.chapters_per_book // self.hadiths_per_book + 1
+        serial = (index * self.books_per_collection + book_number - 1) * self.hadiths_per_book + position
+        body = f'<p>Narrated {hadith_number}: synthetic hadith text for {self.collection_names[index]}.</p>'
+        grades = [{'graded_by': None, 'grade': 'Sahih'}]
+        if self._drifted('hadith', index, hadith_number):
+            body = body.replace('synthetic', 'Synthetic')
+            grades = []
+        return {
+            'collection': self.collection_names[index],
+            'bookNumber': str(book_number),
+            'chapterId': f'{chapter_number}.00',
+            'hadithNumber': str(hadith_number),
+            'hadith': [
+                {'lang': 'en', 'chapterNumber': str(chapter_number), 'chapterTitle': f'Chapter {chapter_number}',
+                 'urn': URN_BASE + 2 * serial, 'body': body, 'grades': grades},
+                {'lang': 'ar', 'chapterNumber': str(chapter_number), 'chapterTitle': f'باب {chapter_number}',
+                 'urn': URN_BASE + 2 * serial + 1, 'body': f'<p>{ARABIC_BODY}</p>', 'grades': []}
+            ]
+        }
+
+    def hadith_by_serial(self, serial: int) -> Optional[Dict[str, Any]]:
+        if not 0 <= serial < self.total_hadiths:
+            return None
+        book_serial, position = divmod(serial, self.hadiths_per_book)
+        index, book_offset = divmod(book_serial, self.books_per_collection)
+        return self.hadith(index, book_offset + 1, position)
+
+    # Routes
+
+    def route(self, path: str, params: Dict[str, str]) -> Tuple[int, Any]:
+        """
+        Resolve a request path (relative to /v1) to a response.
+
+        Returns:
+            Tuple of (status code, JSON body)
+        """
+        segments = [s for s in path.strip('/').split('/') if s]
+        not_found = (404, {'error': {'code': 404, 'details': 'Not found'}})
+
+        if segments == ['collections']:
+            return 200, paginate(len(self.collection_names), self.collection, params)
+
+        if segments == ['hadiths', 'random']:
+            return 200, self.hadith_by_serial(random.randrange(self.total_hadiths))
+
+        if len(segments) == 2 and segments[0] == 'hadiths':
+            urn = segments[1]
+            if not urn.isdigit() or int(urn) < URN_BASE:
+                return not_found
+            hadith = self.hadith_by_serial((int(urn) - URN_BASE) // 2)
+            return (200, hadith) if hadith else not_found
+
+        if len(segments) < 2 or segments[0] != 'collections':
+            return not_found
+        index = self._collection_index(segments[1])
+        if index is None:
+            return not_found
+
+        if len(segments) == 2:
+            return 200, self.collection(index)
+
+        if segments[2:] == ['books']:
+            return 200, paginate(self.books_per_collection, lambda i: self.book(index, i + 1), params)
+
+        if len(segments) == 4 and segments[2] == 'hadiths':
+            hadith_number = segments[3]
+            if not hadith_number.isdigit():
+                return not_found
+            book_serial, position = divmod(int(hadith_number) - 1, self.hadiths_per_book)
+            if not 0 <= book_serial < self.books_per_collection:
+                return not_found
+            return 200, self.hadith(index, book_serial + 1, position)
+
+        if len(segments) < 4 or segments[2] != 'books':
+            return not_found
+        book_number = self._book_number(segments[3])
+        if book_number is None:
+            return not_found
+
+        if len(segments) == 4:
+            return 200, self.book(index, book_number)
+
+        if segments[4:] == ['chapters']:
+            return 200, paginate(self.chapters_per_book,
+                                 lambda i: self.chapter(index, book_number, i + 1), params)
+
+        if len(segments) == 6 and segments[4] == 'chapters':
+            chapter_number = segments[5].split('.')[0]
+            if not chapter_number.isdigit() or not 1 <= int(chapter_number) <= self.chapters_per_book:
+                return not_found
+            return 200, self.chapter(index, book_number, int(chapter_number))
+
+        if segments[4:] == ['hadiths']:
+            return 200, paginate(self.hadiths_per_book,
+                                 lambda i: self.hadith(index, book_number, i), params)
+
+        return not_found
+
+
+def paginate(total: int, item, params: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Build a paginated response body like the real API's.
+
+    Args:
+        total: Total number of items
+        item: Function returning the item at a 0-based position
+        params: Query parameters ('page' and 'limit')
+    """
+    try:
+        page = max(1, int(params.get('page', 1)))
+        limit = min(max(1, int(params.get('limit', DEFAULT_LIMIT))), MAX_LIMIT)
+    except ValueError:
+        page, limit = 1, DEFAULT_LIMIT
+
+    start = (page - 1) * limit
+    end = min(start + limit, total)
+    return {
+        'data': [item(i) for i in range(start, end)],
+        'total': total,
+        'limit': limit,
+        'previous': page - 1 if page > 1 else None,
+        'next': page + 1 if end < total else None
+    }
+
+
+class MockServer(ThreadingHTTPServer):
+    """HTTP server for a MockDataset, with injectable latency and rate limiting."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], dataset: MockDataset, latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, throttle_rate: float = 0.0, api_key: str = None):
+        """
+        Args:
+            address: (host, port) to listen on
+            dataset: The data to serve
+            latency_ms: Delay added to every response
+            jitter_ms: Random extra delay of up to this many milliseconds
+            throttle_rate: Fraction of requests answered with 429
+            api_key: If set, requests must send it in X-API-Key
+        """
+        super().__init__(address, MockRequestHandler)
+        self.dataset = dataset
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.api_key = api_key
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server._count_lock:
+            server.request_count += 1
+
+        delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if server.api_key and self.headers.get('X-API-Key') != server.api_key:
+            self._send(403, {'error': {'code': 403, 'details': 'Forbidden'}})
+        elif server.throttle_rate and random.random() < server.throttle_rate:
+            self._send(429, {'error': {'code': 429, 'details': 'Rate limit exceeded'}}, {'Retry-After': '1'})
+        elif not url.path.startswith('/v1/'):
+            self._send(404, {'error': {'code': 404, 'details': 'Not found'}})
+        else:
+            status_code, body = server.dataset.route(url.path[len('/v1'):], params)
+            self._send(status_code, body)
+
+    def _send(self, status_code: int, body: Any, headers: Dict[str, str] = None) -> None:
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_mock_server(port: int = 0, host: str = '127.0.0.1', **options) -> MockServer:
+    """
+    Start a mock server on a background thread.
+
+    Args:
+        port: Port to listen on (0 picks a free port; see MockServer.base_url)
+        host: Interface to listen on
+        **options: Dataset sizes (collections, books_per_collection,
+            chapters_per_book, hadiths_per_book, drift_rate, seed) and
+            server knobs (latency_ms, jitter_ms, throttle_rate, api_key)
+
+    Returns:
+        The running server; call shutdown() and server_close() to stop it
+    """
+    dataset_options = {key: options.pop(key) for key in list(options)
+                       if key in ('collections', 'books_per_collection', 'chapters_per_book',
+                                  'hadiths_per_book', 'drift_rate', 'seed')}
+    server = MockServer((host, port), MockDataset(**dataset_options), **options)
+    threading.Thread(target=server.serve_forever, name='mock-server', daemon=True).start()
+    return server
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Run a local mock Sunnah.com API')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=MOCK_SERVER_PORT, help='Port to listen on')
+    parser.add_argument('--collections', type=int, default=MOCK_COLLECTIONS, help='Number of collections')
+    parser.add_argument('--books', type=int, default=MOCK_BOOKS_PER_COLLECTION, help='Books per collection')
+    parser.add_argument('--chapters', type=int, default=MOCK_CHAPTERS_PER_BOOK, help='Chapters per book')
+    parser.add_argument('--hadiths', type=int, default=MOCK_HADITHS_PER_BOOK, help='Hadiths per book')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the number of books per collection by this factor')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra delay of up to this much')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with 429 Too Many Requests')
+    parser.add_argument('--drift-rate', type=float, default=0.0,
+                        help='Fraction of books, chapters and hadiths with altered content')
+    parser.add_argument('--seed', type=int, default=0, help='Selects which entities drift')
+    parser.add_argument('--api-key', default=None, help='Require this X-API-Key header')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = MockServer(
+        (args.host, args.port),
+        MockDataset(
+            collections=args.collections,
+            books_per_collection=max(1, int(args.books * args.scale)),
+            chapters_per_book=args.chapters,
+            hadiths_per_book=args.hadiths,
+            drift_rate=args.drift_rate,
+            seed=args.seed
+        ),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_rate=args.throttle_rate,
+        api_key=args.api_key
+    )
+    logger.info(f"Serving {server.dataset.total_hadiths} synthetic hadiths at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""
+Comparison of paginated list endpoints, at the standard page size or in
+large-page mode.
+
+In large-page mode list endpoints are requested with the largest page size
+both APIs accept (up to MAX_LIMIT), and each large page is cut back into
+DEFAULT_LIMIT windows locally. The windows are compared and reported exactly
+as the standard pages would be, with about half the requests. A few real
+standard-size pages (PAGE_SIZE_PROBES) are still requested to check that
+both implementations paginate the way the windows assume.
+"""
+
+import logging
+import threading
+from itertools import zip_longest
+from typing import Dict, Any, List, Optional, Tuple
+
+from api_client import ApiResponse, ApiComparisonClient
+from response_comparator import ComparisonResult, Difference, compare_paginated_responses
+from config import DEFAULT_LIMIT, MAX_LIMIT, PAGE_SIZE_PROBES
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('pagination')
+
+# Page size probes still to run in this process
+_probes_left = PAGE_SIZE_PROBES
+_probes_lock = threading.Lock()
+
+
+class FirstPage:
+    """Outcome of comparing the first page of a list endpoint."""
+
+    def __init__(self, results: List[ComparisonResult], response1: ApiResponse, pages: int, limit: int):
+        """
+        Args:
+            results: Comparison results, in page order
+            response1: API1's first standard-size page (for saving its data)
+            pages: Number of pages at the page size used (0 if unknown)
+            limit: The page size used for the remaining pages
+        """
+        self.results = results
+        self.response1 = response1
+        self.pages = pages
+        self.limit = limit
+
+
+def first_page_params(client: ApiComparisonClient) -> Optional[Dict[str, Any]]:
+    """Query parameters for the first page of a list endpoint."""
+    return {'limit': MAX_LIMIT} if client.large_pages else None
+
+
+def _take_probe() -> bool:
+    global _probes_left
+    with _probes_lock:
+        if _probes_left <= 0:
+            return False
+        _probes_left -= 1
+        return True
+
+
+def _window_params(window: int) -> Optional[Dict[str, Any]]:
+    """Parameters a standard-size request for the window would have used."""
+    return None if window == 1 else {'page': window, 'limit': DEFAULT_LIMIT}
+
+
+def _accepted_limit(response: ApiResponse, requested: int) -> int:
+    """Page size an API actually used for a request with the given limit."""
+    body = response.body
+    if isinstance(body.get('limit'), int):
+        return min(body['limit'], requested)
+    data = body.get('data') or []
+    if isinstance(body.get('total'), int) and len(data) < min(body['total'], requested):
+        return len(data)
+    return requested
+
+
+def _has_pages(response: ApiResponse) -> bool:
+    return (response.is_success() and isinstance(response.body, dict)
+            and isinstance(response.body.get('data'), list))
+
+
+def rewindow(response: ApiResponse, page: int, limit: int) -> List[ApiResponse]:
+    """
+    Cut a page into the DEFAULT_LIMIT pages it covers.
+
+    Each window gets the page's fields, with 'data', 'limit', 'previous' and
+    'next' set as the API would set them for a standard-size request.
+
+    Args:
+        response: A successful paginated response
+        page: The page number the response was requested with
+        limit: The page size the response was requested with
+
+    Returns:
+        The windows, in order
+    """
+    body = response.body
+    data = body['data']
+    total = body.get('total') if isinstance(body.get('total'), int) else None
+    first_window = (page - 1) * (limit // DEFAULT_LIMIT) + 1
+
+    windows = []
+    for offset in range(0, max(len(data), 1), DEFAULT_LIMIT):
+        window = first_window + offset // DEFAULT_LIMIT
+        values = {
+            'data': data[offset:offset + DEFAULT_LIMIT],
+            'limit': DEFAULT_LIMIT,
+            'previous': window - 1 if window > 1 else None,
+            'next': window + 1 if total is not None and window * DEFAULT_LIMIT < total else None
+        }
+        window_body = {key: values.get(key, value) for key, value in body.items()}
+        for key in ('limit', 'previous', 'next'):
+            if key not in window_body and key in values:
+                window_body[key] = values[key]
+        windows.append(ApiResponse(response.status_code, window_body, response.headers))
+    return windows
+
+
+def _compare_page(response1: ApiResponse, response2: ApiResponse,
+                  endpoint: str, params: Dict[str, Any]) -> List[ComparisonResult]:
+    """Compare one page, window by window if it is larger than DEFAULT_LIMIT."""
+    page = (params or {}).get('page', 1)
+    limit = (params or {}).get('limit', DEFAULT_LIMIT)
+    if limit <= DEFAULT_LIMIT or not _has_pages(response1) or not _has_pages(response2):
+        return [compare_paginated_responses(response1, response2, endpoint, params)]
+
+    empty = ApiResponse(200, {'data': []})
+    results = []
+    first_window = (page - 1) * (limit // DEFAULT_LIMIT) + 1
+    pairs = zip_longest(rewindow(response1, page, limit), rewindow(response2, page, limit), fillvalue=empty)
+    for i, (window1, window2) in enumerate(pairs):
+        results.append(compare_paginated_responses(window1, window2, endpoint, _window_params(first_window + i)))
+    return results
+
+
+def _probe(client: ApiComparisonClient, endpoint: str, windows1: List[ApiResponse],
+           windows2: List[ApiResponse], limit: int) -> ComparisonResult:
+    """
+    Request page 2 at the standard size and check it against the windows.
+
+    Returns:
+        The comparison of the real page 2, failed if either API's page differs
+        from the window cut from its large page
+    """
+    params = _window_params(2)
+    logger.info(f"Probing GET /{endpoint} page 2 at limit {DEFAULT_LIMIT}")
+    response1, response2 = client.compare_get(endpoint, params)
+    result = compare_paginated_responses(response1, response2, endpoint, params)
+
+    for name, response, window in (('API1', response1, windows1[1]), ('API2', response2, windows2[1])):
+        if response.is_success() and response.body != window.body:
+            result.add_differences([Difference(
+                f"{name} pagination mismatch",
+                f"page 2 at limit {DEFAULT_LIMIT} differs from items {DEFAULT_LIMIT + 1}-"
+                f"{2 * DEFAULT_LIMIT} of its limit {limit} page",
+                section='Pagination'
+            )])
+            logger.error(f"❌ {name} paginates {endpoint} differently at limit {limit} than at {DEFAULT_LIMIT}")
+    return result
+
+
+def compare_first_page(client: ApiComparisonClient, endpoint: str,
+                       response1: ApiResponse, response2: ApiResponse) -> FirstPage:
+    """
+    Compare the first page of a list endpoint.
+
+    Args:
+        client: The API comparison client
+        endpoint: The API endpoint (without the base URL)
+        response1: API1's response to a request with first_page_params
+        response2: API2's response to a request with first_page_params
+
+    Returns:
+        The results and the page count to compare the remaining pages with
+    """
+    params = first_page_params(client)
+    limit = DEFAULT_LIMIT
+
+    if params and _has_pages(response1) and _has_pages(response2):
+        limit = min(_accepted_limit(response1, MAX_LIMIT), _accepted_limit(response2, MAX_LIMIT))
+        limit = limit // DEFAULT_LIMIT * DEFAULT_LIMIT
+        if limit < 2 * DEFAULT_LIMIT:
+            logger.warning(f"Large pages not accepted for {endpoint}, using limit {DEFAULT_LIMIT}")
+            limit = DEFAULT_LIMIT
+            params = None
+            response1, response2 = client.compare_get(endpoint)
+        elif limit != MAX_LIMIT:
+            logger.info(f"Using limit {limit} for {endpoint}")
+            params = {'limit': limit}
+            response1, response2 = client.compare_get(endpoint, params)
+    elif params:
+        # Nothing to cut into windows; report the failed request as it was made
+        return FirstPage([compare_paginated_responses(response1, response2, endpoint, params)],
+                         response1, 0, MAX_LIMIT)
+
+    pages = 0
+    if response1.is_success() and response1.body and isinstance(response1.body.get('total'), int):
+        pages = (response1.body['total'] + limit - 1) // limit
+
+    if limit == DEFAULT_LIMIT or not _has_pages(response1) or not _has_pages(response2):
+        result = compare_paginated_responses(response1, response2, endpoint, params)
+        return FirstPage([result], response1, pages, limit)
+
+    windows1 = rewindow(response1, 1, limit)
+    windows2 = rewindow(response2, 1, limit)
+    results = _compare_page(response1, response2, endpoint, {'page': 1, 'limit': limit})
+    if len(windows1) > 1 and len(windows2) > 1 and _take_probe():
+        results[1] = _probe(client, endpoint, windows1, windows2, limit)
+
+    return FirstPage(results, windows1[0], pages, limit)
+
+
+def compare_first_pages(client: ApiComparisonClient, endpoints: List[str],
+                        responses: List[Tuple[ApiResponse, ApiResponse]]) -> List[FirstPage]:
+    """
+    compare_first_page for several list endpoints.
+
+    The requests compare_first_page may still make (at a smaller page size,
+    or to probe page 2) go through ApiComparisonClient.map, so a throttled
+    one waits in the retry queue instead of holding up the other lists.
+
+    Args:
+        client: The API comparison client
+        endpoints: The API endpoints (without the base URL)
+        responses: (api1_response, api2_response) for each endpoint, as
+            requested with first_page_params
+
+    Returns:
+        The compare_first_page results, in the same order as endpoints
+    """
+    return client.map(lambda request: compare_first_page(client, *request),
+                      [(endpoint, response1, response2)
+                       for endpoint, (response1, response2) in zip(endpoints, responses)])
+
+
+def compare_page(client: ApiComparisonClient, endpoint: str, page: int,
+                 limit: int = DEFAULT_LIMIT) -> List[ComparisonResult]:
+    """
+    Request and compare one page of a list endpoint.
+
+    Args:
+        client: The API comparison client
+        endpoint: The API endpoint (without the base URL)
+        page: The page number
+        limit: The page size (as given by compare_first_page)
+
+    Returns:
+        The results for the page, or for each of its windows in large-page mode
+    """
+    params = {'page': page, 'limit': limit}
+    response1, response2 = client.compare_get(endpoint, params)
+    return client.compare(_compare_page, response1, response2, endpoint, params)
+
+
+def compare_remaining_pages(client: ApiComparisonClient, endpoint: str,
+                            first_page: FirstPage) -> List[ComparisonResult]:
+    """
+    Request and compare pages 2..N of a list endpoint.
+
+    Pages are fetched in parallel (see ApiComparisonClient.compare_pages) and
+    compared as they arrive; results come back in page order.
+
+    Args:
+        client: The API comparison client
+        endpoint: The API endpoint (without the base URL)
+        first_page: The outcome of compare_first_page
+
+    Returns:
+        The results, in page order
+    """
+    page_results = client.compare_pages(endpoint, first_page.pages, _compare_page, limit=first_page.limit)
+    return [result for results in page_results for result in results]
@@ -0,0 +1,115 @@
+"""
+Adaptive token bucket rate limiter used to pace requests to a single API host.
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+from config import (
+    RATE_LIMIT_BURST, RATE_LIMIT_MIN_RATE, RATE_LIMIT_DECREASE_FACTOR,
+    RATE_LIMIT_RECOVERY_STEP, RATE_LIMIT_RECOVERY_SUCCESSES
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('rate_limiter')
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter that adapts to 429 responses.
+
+    Each call to acquire() takes one token, waiting for the bucket to refill
+    if it is empty. The refill rate is cut by RATE_LIMIT_DECREASE_FACTOR on
+    every 429 and grows back by RATE_LIMIT_RECOVERY_STEP of the configured
+    rate after RATE_LIMIT_RECOVERY_SUCCESSES successful requests in a row.
+
+    A rate of None disables limiting entirely.
+    """
+
+    def __init__(self, rate: Optional[float], name: str = None,
+                 burst: int = RATE_LIMIT_BURST,
+                 min_rate: float = RATE_LIMIT_MIN_RATE,
+                 decrease_factor: float = RATE_LIMIT_DECREASE_FACTOR,
+                 recovery_step: float = RATE_LIMIT_RECOVERY_STEP,
+                 recovery_successes: int = RATE_LIMIT_RECOVERY_SUCCESSES):
+        """
+        Args:
+            rate: Requests per second, or None for no limit
+            name: Name used in log messages (usually the base URL)
+            burst: Maximum number of tokens the bucket can hold
+            min_rate: Lower bound for the rate after repeated 429s
+            decrease_factor: Multiplier applied to the rate on a 429
+            recovery_step: Fraction of the configured rate added back after
+                a run of successes
+            recovery_successes: Number of consecutive successes needed before
+                the rate is increased
+        """
+        self.name = name
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.min_rate = min(min_rate, rate) if rate else min_rate
+        self.decrease_factor = decrease_factor
+        self.recovery_step = recovery_step
+        self.recovery_successes = recovery_successes
+
+        self._tokens = float(self.capacity)
+        self._last_refill = time.monotonic()
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether this limiter actually limits anything."""
+        return self.max_rate is not None
+
+    def _refill(self) -> None:
+        """Add the tokens accumulated since the last refill. Caller holds the lock."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self) -> None:
+        """Take one token, blocking until one is available."""
+        if not self.enabled:
+            return
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def on_success(self) -> None:
+        """Record a non-throttled response and recover the rate if due."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.recovery_successes and self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery_step)
+                self._successes = 0
+                logger.info(f"Increased rate limit for {self.name} to {self.rate:.2f} req/s")
+
+    def on_throttle(self) -> None:
+        """Record a 429 response: shrink the rate and empty the bucket."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = 0
+            self._successes = 0
+            logger.warning(f"Reduced rate limit for {self.name} to {self.rate:.2f} req/s")
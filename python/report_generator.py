@@ -6,7 +6,7 @@ import os
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from config import OUTPUT_DIR
 
@@ -21,13 +21,83 @@ logger = logging.getLogger('report_generator')
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def generate_html_report(results: List[Dict[str, Any]], title: str = "API Regression Test Report") -> str:
+def _format_ms(value: Optional[float]) -> str:
+    """Format a latency in milliseconds for display."""
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def generate_latency_html(latency: Dict[str, Dict[str, Dict[str, Any]]]) -> str:
+    """
+    Generate an HTML table comparing API1 and API2 latency per endpoint template.
+    
+    Args:
+        latency: Latency summary (as returned by LatencyRecorder.summary)
+        
+    Returns:
+        HTML fragment
+    """
+    html = """
+        <h2>Latency by Endpoint</h2>
+        <table class="latency">
+            <tr>
+                <th rowspan="2">Endpoint</th>
+                <th colspan="5">API1 (ms)</th>
+                <th colspan="5">API2 (ms)</th>
+                <th rowspan="2">p95 ratio</th>
+            </tr>
+            <tr>
+                <th>n</th><th>TTFB p50</th><th>p50</th><th>p95</th><th>p99</th>
+                <th>n</th><th>TTFB p50</th><th>p50</th><th>p95</th><th>p99</th>
+            </tr>
+    """
+    
+    for template, by_impl in latency.items():
+        html += f"""
+            <tr>
+                <td class="endpoint-template">{template}</td>
+        """
+        for impl in ('API1', 'API2'):
+            stats = by_impl.get(impl, {})
+            html += f"""
+                <td>{stats.get('count', 0)}</td>
+                <td>{_format_ms(stats.get('ttfb_p50_ms'))}</td>
+                <td>{_format_ms(stats.get('p50_ms'))}</td>
+                <td>{_format_ms(stats.get('p95_ms'))}</td>
+                <td>{_format_ms(stats.get('p99_ms'))}</td>
+            """
+        
+        p95_1 = by_impl.get('API1', {}).get('p95_ms')
+        p95_2 = by_impl.get('API2', {}).get('p95_ms')
+        if p95_1 and p95_2 is not None:
+            ratio = p95_2 / p95_1
+            ratio_class = 'slower' if ratio > 1 else 'faster'
+            html += f"""
+                <td class="{ratio_class}">{ratio:.2f}x</td>
+            """
+        else:
+            html += """
+                <td>-</td>
+            """
+        html += """
+            </tr>
+        """
+    
+    html += """
+        </table>
+    """
+    return html
+
+
+def generate_html_report(results: List[Dict[str, Any]], title: str = "API Regression Test Report",
+                         latency: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None) -> str:
     """
     Generate an HTML report from test results.
     
     Args:
         results: List of test results
         title: Report title
+        latency: Latency summary per endpoint template (as returned by
+            LatencyRecorder.summary), shown side by side for API1 and API2
         
     Returns:
         Path to the generated HTML report
@@ -133,6 +203,30 @@ def generate_html_report(results: List[Dict[str, Any]], title: str = "API Regres
             .hidden {{
                 display: none;
             }}
+            .latency {{
+                border-collapse: collapse;
+                margin-bottom: 30px;
+            }}
+            .latency th, .latency td {{
+                border: 1px solid #ddd;
+                padding: 4px 8px;
+                text-align: right;
+            }}
+            .latency th {{
+                background-color: #f0f0f0;
+                text-align: center;
+            }}
+            .latency .endpoint-template {{
+                font-family: monospace;
+                text-align: left;
+            }}
+            .slower {{
+                color: #F44336;
+                font-weight: bold;
+            }}
+            .faster {{
+                color: #4CAF50;
+            }}
         </style>
     </head>
     <body>
@@ -144,7 +238,12 @@ def generate_html_report(results: List[Dict[str, Any]], title: str = "API Regres
             <div class="summary-item">Failed: {failed_tests}</div>
             <div class="summary-item">Pass Rate: <span class="pass-rate">{pass_rate:.2f}%</span></div>
         </div>
-        
+    """
+    
+    if latency:
+        html += generate_latency_html(latency)
+    
+    html += """
         <h2>Results by Endpoint</h2>
     """
     
@@ -229,12 +328,15 @@ def generate_html_report(results: List[Dict[str, Any]], title: str = "API Regres
     return report_path
 
 
-def generate_json_report(results: List[Dict[str, Any]]) -> str:
+def generate_json_report(results: List[Dict[str, Any]],
+                         latency: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None) -> str:
     """
     Generate a JSON report from test results.
     
     Args:
         results: List of test results
+        latency: Latency summary per endpoint template (as returned by
+            LatencyRecorder.summary)
         
     Returns:
         Path to the generated JSON report
@@ -254,13 +356,14 @@ def generate_json_report(results: List[Dict[str, Any]]) -> str:
             'failed_tests': failed_tests,
             'pass_rate': pass_rate
         },
+        'latency': latency or {},
         'results': results
     }
     
     # Write JSON to file
     report_path = os.path.join(OUTPUT_DIR, 'report.json')
     with open(report_path, 'w') as f:
-        json.dump(report_data, f, indent=2)
+        json.dump(report_data, f, indent=2, default=str)
     
     logger.info(f"Generated JSON report at {report_path}")
     return report_path
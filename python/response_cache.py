@@ -0,0 +1,107 @@
+"""
+Run-scoped cache of API responses with coalescing of identical in-flight
+requests.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Tuple
+
+from config import RESPONSE_CACHE_SIZE
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('response_cache')
+
+# Endpoints whose response is expected to differ on every request
+UNCACHED_ENDPOINTS = ('hadiths/random',)
+
+
+def cache_key(implementation: str, endpoint: str, params: Dict[str, Any] = None) -> Tuple[str, str, str]:
+    """Key a request by implementation, endpoint and query parameters."""
+    return implementation, endpoint.strip('/'), json.dumps(params or {}, sort_keys=True, default=str)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of responses, bounded by number of entries.
+
+    While a response is being fetched, other requests for the same key wait
+    for that fetch instead of sending their own.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        """
+        Args:
+            max_entries: Maximum number of cached responses
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key: Tuple[str, str, str], fetch: Callable[[], Any],
+                     cacheable: Callable[[Any], bool] = lambda response: True) -> Any:
+        """
+        Return the cached response for key, fetching it if needed.
+
+        Args:
+            key: Cache key (see cache_key)
+            fetch: Makes the request
+            cacheable: Whether a fetched response may be cached
+
+        Returns:
+            The response
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            response = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if cacheable(response) and self.max_entries > 0:
+                self._entries[key] = response
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(response)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'coalesced': self.coalesced, 'misses': self.misses,
+                    'entries': len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -9,6 +9,9 @@ from typing import Dict, Any, List, Tuple, Optional
 from deepdiff import DeepDiff
 
 from api_client import ApiResponse
+from keyed_diff import keyed_diff
+from comparison_rules import RuleSet, rules_for
+from config import KEYED_LIST_COMPARISON, MAX_DIFFERENCES_PER_COMPARISON
 
 # Set up logging
 logging.basicConfig(
@@ -18,26 +21,190 @@ logging.basicConfig(
 logger = logging.getLogger('response_comparator')
 
 
+class Difference:
+    """
+    One difference found by a comparison, kept as a record and only
+    formatted as text when it is logged or written to a report.
+    """
+    
+    __slots__ = ('kind', 'path', 'value', 'section')
+    
+    def __init__(self, kind: str, value: Any, path: Optional[str] = None, section: str = ''):
+        """
+        Args:
+            kind: Kind of difference (a diff type such as values_changed, or
+                a description such as 'Status codes differ')
+            value: The differing values or details
+            path: Path of the difference within the body, if any
+            section: Part of the response it was found in ('Pagination',
+                'Data'), if any
+        """
+        self.kind = kind
+        self.value = value
+        self.path = path
+        self.section = section
+    
+    def __str__(self) -> str:
+        prefix = f"{self.section} " if self.section else ""
+        if self.path is None:
+            return f"{prefix}{self.kind}: {self.value}"
+        return f"{prefix}{self.kind}: {self.path} - {self.value}"
+    
+    __repr__ = __str__
+
+
+def diff_records(diff: Dict[str, Any], section: str = '') -> List[Difference]:
+    """
+    Turn a diff from diff_bodies into difference records.
+    
+    Args:
+        diff: Mapping of difference types to differences
+        section: Part of the response the diff covers, if any
+        
+    Returns:
+        One record per difference
+    """
+    records = []
+    for diff_type, diff_items in diff.items():
+        if isinstance(diff_items, dict):
+            for path, value in diff_items.items():
+                records.append(Difference(diff_type, value, path, section))
+        else:
+            records.append(Difference(diff_type, diff_items, section=section))
+    return records
+
+
+def diff_bodies(body1: Any, body2: Any, rules: Optional[RuleSet] = None,
+                keys: Tuple[str, ...] = (), limit: Optional[int] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Diff two response bodies, ignoring the order of list items.
+    
+    Uses the keyed list alignment from keyed_diff, or DeepDiff with
+    ignore_order=True when KEYED_LIST_COMPARISON is disabled. Field rules
+    are only applied by keyed_diff.
+    
+    Args:
+        body1: First response body
+        body2: Second response body
+        rules: Comparison rules for the endpoint (see comparison_rules.py)
+        keys: Object keys leading to the bodies within the response, for
+            matching rule paths
+        limit: Stop diffing once about this many differences are found (None
+            for no limit); exact with keyed_diff, approximate with DeepDiff
+        
+    Returns:
+        Tuple of (mapping of difference types to differences, empty if
+        equal; whether the diff stopped at the limit)
+    """
+    if KEYED_LIST_COMPARISON:
+        diff = keyed_diff(body1, body2, rules=rules, keys=keys, limit=limit)
+        return diff, diff.truncated
+    if limit is None:
+        return DeepDiff(body1, body2, ignore_order=True), False
+    if limit == 0:
+        # No room left: only find out whether there is anything to leave out
+        return {}, bool(DeepDiff(body1, body2, ignore_order=True, max_diffs=1))
+    diff = DeepDiff(body1, body2, ignore_order=True, max_diffs=limit)
+    return diff, bool(diff.get_stats().get('MAX DIFF LIMIT REACHED'))
+
+
+def _remaining(differences: List[Difference]) -> Optional[int]:
+    """How many more differences a comparison may record."""
+    if MAX_DIFFERENCES_PER_COMPARISON is None:
+        return None
+    return max(MAX_DIFFERENCES_PER_COMPARISON - len(differences), 0)
+
+
+# Recorded after the differences of a diff stopped at the budget
+TRUNCATION_NOTE = Difference(
+    'Diff stopped early',
+    f"reached {MAX_DIFFERENCES_PER_COMPARISON} differences (MAX_DIFFERENCES_PER_COMPARISON); "
+    f"the responses differ in more ways than listed"
+)
+
+
+def bodies_match(response1: ApiResponse, response2: ApiResponse) -> bool:
+    """
+    Check whether two response bodies are certainly equal, without diffing them.
+    
+    Bodies whose raw bytes hashed the same as they were received match
+    outright. Without KEYED_LIST_COMPARISON the canonical hashes are also
+    compared, which costs far less than DeepDiff; keyed_diff skips equal
+    subtrees on its own and doesn't need them.
+    
+    Args:
+        response1: First API response
+        response2: Second API response
+        
+    Returns:
+        True if the bodies are equal; False if they may differ
+    """
+    if response1.body_hash is not None and response1.body_hash == response2.body_hash:
+        return True
+    if not KEYED_LIST_COMPARISON:
+        return response1.canonical_hash() == response2.canonical_hash()
+    return False
+
+
 class ComparisonResult:
     """Class to represent the result of comparing two API responses."""
     
     def __init__(self, 
                  is_equal: bool, 
-                 differences: List[str] = None, 
+                 differences: List[Any] = None, 
                  endpoint: str = None, 
-                 params: Dict[str, Any] = None):
+                 params: Dict[str, Any] = None,
+                 truncated: bool = False):
         self.is_equal = is_equal
+        # Difference records (or plain strings), formatted with str()
         self.differences = differences or []
         self.endpoint = endpoint
         self.params = params
+        # True if the diff stopped at MAX_DIFFERENCES_PER_COMPARISON, so the
+        # responses differ in more ways than recorded
+        self.truncated = truncated
+    
+    @property
+    def difference_count(self) -> int:
+        """Number of differences found, not counting the note on a truncated diff."""
+        return len(self.differences) - (1 if self.truncated else 0)
+    
+    def remaining(self) -> Optional[int]:
+        """How many more differences the result may record (None for no limit)."""
+        return 0 if self.truncated else _remaining(self.differences)
+    
+    def add_differences(self, differences: List[Difference], truncated: bool = False) -> None:
+        """
+        Record more differences, within MAX_DIFFERENCES_PER_COMPARISON.
+        
+        Differences past the limit are left out and the result is marked
+        truncated, with the truncation note as its last entry.
+        
+        Args:
+            differences: The differences to record
+            truncated: True if whatever found differences stopped early, so
+                there are more than given
+        """
+        for difference in differences:
+            if self.remaining() == 0:
+                truncated = True
+                break
+            self.differences.append(difference)
+            self.is_equal = False
+        if truncated and not self.truncated:
+            self.differences.append(TRUNCATION_NOTE)
+            self.truncated = True
+            self.is_equal = False
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert the comparison result to a dictionary."""
         return {
             'is_equal': self.is_equal,
-            'differences': self.differences,
+            'differences': [str(diff) for diff in self.differences],
             'endpoint': self.endpoint,
-            'params': self.params
+            'params': self.params,
+            'difference_count': self.difference_count,
+            'truncated': self.truncated
         }
     
     def __str__(self) -> str:
@@ -45,7 +212,8 @@ class ComparisonResult:
         if self.is_equal:
             return f"✅ Responses match for {self.endpoint}"
         else:
-            return f"❌ Responses differ for {self.endpoint}: {len(self.differences)} differences"
+            more = "+" if self.truncated else ""
+            return f"❌ Responses differ for {self.endpoint}: {self.difference_count}{more} differences"
 
 
 def compare_responses(response1: ApiResponse, response2: ApiResponse, 
@@ -63,45 +231,43 @@ def compare_responses(response1: ApiResponse, response2: ApiResponse,
         ComparisonResult object
     """
     differences = []
+    truncated = False
     
     # Compare status codes
     if response1.status_code != response2.status_code:
-        differences.append(f"Status codes differ: {response1.status_code} vs {response2.status_code}")
+        differences.append(Difference('Status codes differ', f"{response1.status_code} vs {response2.status_code}"))
     
     # If either response has an error, add it to the differences
     if response1.error:
-        differences.append(f"API1 error: {response1.error}")
+        differences.append(Difference('API1 error', response1.error))
     if response2.error:
-        differences.append(f"API2 error: {response2.error}")
+        differences.append(Difference('API2 error', response2.error))
     
-    # Compare response bodies if both are successful
-    if response1.is_success() and response2.is_success():
+    # Compare response bodies if both are successful and may differ
+    rules = rules_for(endpoint) if endpoint else None
+    if (response1.is_success() and response2.is_success() and (rules is None or rules.compare_body)
+            and not bodies_match(response1, response2)):
         try:
-            # Use DeepDiff for semantic comparison
-            diff = DeepDiff(response1.body, response2.body, ignore_order=True)
-            
-            if diff:
-                # Add each difference to the list
-                for diff_type, diff_items in diff.items():
-                    if isinstance(diff_items, dict):
-                        for path, value in diff_items.items():
-                            differences.append(f"{diff_type}: {path} - {value}")
-                    else:
-                        differences.append(f"{diff_type}: {diff_items}")
+            # Semantic comparison, ignoring list order
+            diff, truncated = diff_bodies(response1.body, response2.body, rules, limit=_remaining(differences))
+            differences.extend(diff_records(diff))
         except Exception as e:
-            differences.append(f"Error comparing response bodies: {str(e)}")
+            differences.append(Difference('Error comparing response bodies', str(e)))
+    
+    if truncated:
+        differences.append(TRUNCATION_NOTE)
     
     # Create and return the comparison result
     is_equal = len(differences) == 0
-    result = ComparisonResult(is_equal, differences, endpoint, params)
+    result = ComparisonResult(is_equal, differences, endpoint, params, truncated)
     
-    # Log the result
+    # Log the result; differences are only formatted if the record is emitted
     if is_equal:
         logger.info(f"✅ Responses match for {endpoint}")
     else:
         logger.error(f"❌ Responses differ for {endpoint}")
         for diff in differences:
-            logger.error(f"  - {diff}")
+            logger.error("  - %s", diff)
     
     return result
 
@@ -121,66 +287,64 @@ def compare_paginated_responses(response1: ApiResponse, response2: ApiResponse,
         ComparisonResult object
     """
     differences = []
+    truncated = False
     
     # Compare status codes
     if response1.status_code != response2.status_code:
-        differences.append(f"Status codes differ: {response1.status_code} vs {response2.status_code}")
+        differences.append(Difference('Status codes differ', f"{response1.status_code} vs {response2.status_code}"))
     
     # If either response has an error, add it to the differences
     if response1.error:
-        differences.append(f"API1 error: {response1.error}")
+        differences.append(Difference('API1 error', response1.error))
     if response2.error:
-        differences.append(f"API2 error: {response2.error}")
+        differences.append(Difference('API2 error', response2.error))
     
-    # Compare response bodies if both are successful
-    if response1.is_success() and response2.is_success():
+    # Compare response bodies if both are successful and may differ
+    rules = rules_for(endpoint) if endpoint else None
+    if (response1.is_success() and response2.is_success() and (rules is None or rules.compare_body)
+            and not bodies_match(response1, response2)):
         try:
             # Extract pagination metadata
             pagination1 = {k: v for k, v in response1.body.items() if k != 'data'} if isinstance(response1.body, dict) else {}
             pagination2 = {k: v for k, v in response2.body.items() if k != 'data'} if isinstance(response2.body, dict) else {}
             
             # Compare pagination metadata
-            pagination_diff = DeepDiff(pagination1, pagination2, ignore_order=True)
-            if pagination_diff:
-                for diff_type, diff_items in pagination_diff.items():
-                    if isinstance(diff_items, dict):
-                        for path, value in diff_items.items():
-                            differences.append(f"Pagination {diff_type}: {path} - {value}")
-                    else:
-                        differences.append(f"Pagination {diff_type}: {diff_items}")
+            pagination_diff, truncated = diff_bodies(pagination1, pagination2, rules, limit=_remaining(differences))
+            differences.extend(diff_records(pagination_diff, 'Pagination'))
             
             # Extract and compare data items
             data1 = response1.body.get('data', []) if isinstance(response1.body, dict) else []
             data2 = response2.body.get('data', []) if isinstance(response2.body, dict) else []
             
-            # Compare data length
-            if len(data1) != len(data2):
-                differences.append(f"Data length differs: {len(data1)} vs {len(data2)}")
+            # Compare data length, if the pagination diff left room in the budget
+            if not truncated and len(data1) != len(data2):
+                if _remaining(differences) == 0:
+                    truncated = True
+                else:
+                    differences.append(Difference('Data length differs', f"{len(data1)} vs {len(data2)}"))
             
-            # Compare data items
-            data_diff = DeepDiff(data1, data2, ignore_order=True)
-            if data_diff:
-                for diff_type, diff_items in data_diff.items():
-                    if isinstance(diff_items, dict):
-                        for path, value in diff_items.items():
-                            differences.append(f"Data {diff_type}: {path} - {value}")
-                    else:
-                        differences.append(f"Data {diff_type}: {diff_items}")
+            # Compare data items, within what is left of the difference budget
+            if not truncated:
+                data_diff, truncated = diff_bodies(data1, data2, rules, ('data',), limit=_remaining(differences))
+                differences.extend(diff_records(data_diff, 'Data'))
         
         except Exception as e:
-            differences.append(f"Error comparing response bodies: {str(e)}")
+            differences.append(Difference('Error comparing response bodies', str(e)))
+    
+    if truncated:
+        differences.append(TRUNCATION_NOTE)
     
     # Create and return the comparison result
     is_equal = len(differences) == 0
-    result = ComparisonResult(is_equal, differences, endpoint, params)
+    result = ComparisonResult(is_equal, differences, endpoint, params, truncated)
     
-    # Log the result
+    # Log the result; differences are only formatted if the record is emitted
     if is_equal:
         logger.info(f"✅ Paginated responses match for {endpoint}")
     else:
         logger.error(f"❌ Paginated responses differ for {endpoint}")
         for diff in differences:
-            logger.error(f"  - {diff}")
+            logger.error("  - %s", diff)
     
     return result
 
@@ -202,5 +366,7 @@ def format_comparison_for_report(result: ComparisonResult) -> Dict[str, Any]:
         'endpoint': result.endpoint,
         'params': params_str,
         'status': status,
-        'differences': result.differences
+        'differences': result.differences,
+        'difference_count': result.difference_count,
+        'truncated': result.truncated
     }
@@ -0,0 +1,114 @@
+"""
+Delayed retry queue and run-wide retry budget for throttled or failed
+requests.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional
+
+from config import RETRY_BUDGET
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('retry_queue')
+
+
+class RetryLater(Exception):
+    """
+    Raised instead of sleeping before a retry while retries are deferred
+    (see deferred_retries). Whoever runs the work re-runs it after delay
+    seconds, doing other work in the meantime.
+    """
+
+    def __init__(self, delay: float):
+        super().__init__(f"Retry due in {delay:.1f} seconds")
+        self.delay = delay
+
+
+_retry_mode = threading.local()
+
+
+@contextmanager
+def deferred_retries() -> Iterator[None]:
+    """Within this block, requests in the current thread raise RetryLater instead of sleeping."""
+    previous = retries_deferred()
+    _retry_mode.deferred = True
+    try:
+        yield
+    finally:
+        _retry_mode.deferred = previous
+
+
+def retries_deferred() -> bool:
+    """Whether retries are deferred in the current thread."""
+    return getattr(_retry_mode, 'deferred', False)
+
+
+class RetryBudget:
+    """
+    Thread-safe count of the retries left in a run, shared by both API
+    implementations so that a storm of 429s can't retry forever.
+
+    A budget of None is unlimited.
+    """
+
+    def __init__(self, retries: Optional[int] = RETRY_BUDGET):
+        """
+        Args:
+            retries: Number of retries allowed in the run (None for no limit)
+        """
+        self.retries = retries
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Use up one retry. Returns False if the budget is exhausted."""
+        with self._lock:
+            if self.retries is not None and self.used >= self.retries:
+                return False
+            self.used += 1
+            if self.used == self.retries:
+                logger.warning(f"Retry budget of {self.retries} used up; failed requests "
+                               f"are no longer retried in this run")
+            return True
+
+
+class RetryQueue:
+    """
+    Requests waiting for a retry, ordered by the time they are due.
+
+    Not thread-safe: it belongs to the single loop that drains it.
+    """
+
+    def __init__(self):
+        self._heap: list = []
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any, delay: float) -> None:
+        """Queue item to be retried in delay seconds."""
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), item))
+
+    def pop_due(self) -> List[Any]:
+        """Remove and return the items that are due, earliest first."""
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def wait_time(self) -> Optional[float]:
+        """Seconds until the next item is due (None if the queue is empty)."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
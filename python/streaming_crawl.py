@@ -0,0 +1,324 @@
+"""
+Streaming crawl of all endpoints: every discovered entity immediately
+schedules the checks that depend on it, instead of waiting for a whole
+phase (collections, books, hadiths) to finish.
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+from api_client import ApiComparisonClient
+from retry_queue import RetryLater, deferred_retries
+from response_comparator import compare_responses, format_comparison_for_report
+from pagination import first_page_params, compare_first_page, compare_page
+from derived_details import compare_get_derived
+from data_store import save_collections, save_books, save_chapters, save_hadiths, append_urn, crawl_store
+from task_scheduler import TaskScheduler
+from checkpoint import Checkpoint, task_key
+from config import TEST_ALL_PAGES, DEFAULT_LIMIT, SAMPLE_SIZE, MAX_CONCURRENT_REQUESTS
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('streaming_crawl')
+
+# Number of times GET /hadiths/random is checked
+RANDOM_HADITH_CHECKS = 3
+
+
+class StreamingCrawl:
+    """
+    Crawl graph for the API.
+
+    collections -> collection detail, books list
+    books list -> book detail, chapters list, hadiths list (for sampled books)
+    chapters list -> chapter detail (for sampled chapters)
+    hadiths list -> hadith by number, hadith by URN (for sampled hadiths)
+
+    Extra pages of every list are checked as separate tasks. Tasks are
+    scheduled by method name with JSON-serializable arguments, so the
+    frontier can be checkpointed and resumed.
+    """
+
+    def __init__(self, client: ApiComparisonClient, max_workers: int = MAX_CONCURRENT_REQUESTS,
+                 checkpoint: Optional[Checkpoint] = None):
+        """
+        Args:
+            client: The API comparison client
+            max_workers: Number of checks run at the same time
+            checkpoint: Checkpoint log to record progress in (optional)
+        """
+        self.client = client
+        self.scheduler = TaskScheduler(max_workers)
+        self.checkpoint = checkpoint
+        self.results: List[Dict[str, Any]] = []
+        self._task_results = threading.local()
+        self._scheduled = set()
+        self._scheduled_lock = threading.Lock()
+
+    def run(self, resume: bool = False) -> List[Dict[str, Any]]:
+        """
+        Run the whole crawl and wait for it to finish.
+
+        Args:
+            resume: Continue from the checkpoint instead of starting over
+                (requires a checkpoint)
+
+        Returns:
+            List of test results
+        """
+        frontier = None
+        if resume and self.checkpoint:
+            self.results, frontier, finished = self.checkpoint.load()
+            if finished:
+                logger.info("Checkpointed run had already finished, nothing to resume")
+                return self.results
+            if not frontier and not self.results:
+                logger.info("Checkpoint is empty, starting a new crawl")
+                frontier = None
+        elif self.checkpoint:
+            self.checkpoint.reset()
+
+        if frontier is None:
+            self._schedule('check_collections_list')
+            for i in range(RANDOM_HADITH_CHECKS):
+                self._schedule('check_random_hadith', i)
+        else:
+            logger.info(f"Resuming {len(frontier)} tasks ({len(self.results)} results already recorded)")
+            # Tasks re-run from the frontier must not schedule children the
+            # checkpoint already knows about
+            self._scheduled = set(self.checkpoint.scheduled_keys)
+            for name, args in frontier:
+                self.scheduler.submit(self._run_task, name, args)
+
+        self.scheduler.shutdown()
+        if self.scheduler.errors:
+            logger.error(f"{len(self.scheduler.errors)} crawl tasks failed")
+        elif self.checkpoint:
+            self.checkpoint.finished()
+        return self.results
+
+    def _schedule(self, name: str, *args: Any) -> None:
+        """Schedule the check method called name, recording it in the checkpoint."""
+        key = task_key(name, args)
+        with self._scheduled_lock:
+            if key in self._scheduled:
+                return
+            self._scheduled.add(key)
+
+        if self.checkpoint:
+            self.checkpoint.task_scheduled(name, args)
+        self.scheduler.submit(self._run_task, name, args)
+
+    def _run_task(self, name: str, args: tuple) -> None:
+        """
+        Run a check and record its results once it has completed.
+
+        A check whose request has to be retried is scheduled to run again
+        when the retry is due, rather than sleeping in its worker; the
+        responses it already received come from the response cache then.
+        """
+        self._task_results.results = []
+        try:
+            with deferred_retries():
+                getattr(self, name)(*args)
+        except RetryLater as e:
+            logger.info(f"Re-scheduling {name}{args} in {e.delay:.1f} seconds")
+            self.scheduler.submit_later(e.delay, self._run_task, name, args)
+            return
+
+        task_results = self._task_results.results
+        self.results.extend(task_results)
+        if self.checkpoint:
+            self.checkpoint.task_done(name, args, task_results)
+
+    def _record(self, result) -> None:
+        self._task_results.results.append(format_comparison_for_report(result))
+
+    def _check_list(self, endpoint: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Compare the first page of a list endpoint and schedule the other pages.
+
+        Returns:
+            The API1 data items of the first page, or None if the request failed
+        """
+        response1, response2 = self.client.compare_get(endpoint, first_page_params(self.client))
+        first_page = compare_first_page(self.client, endpoint, response1, response2)
+        for result in first_page.results:
+            self._record(result)
+
+        if TEST_ALL_PAGES:
+            for page in range(2, first_page.pages + 1):
+                self._schedule('check_page', endpoint, page, first_page.pages, first_page.limit)
+
+        response1 = first_page.response1
+        if response1.is_success() and response1.body and 'data' in response1.body:
+            return response1.body['data']
+        return None
+
+    def check_page(self, endpoint: str, page: int, pages: int, limit: int = DEFAULT_LIMIT) -> None:
+        logger.info(f"Testing GET /{endpoint} page {page}/{pages}")
+        for result in compare_page(self.client, endpoint, page, limit):
+            self._record(result)
+
+    def _check_detail(self, endpoint: str, expected: Optional[Dict[str, Any]] = None):
+        response1, response2, spot_check = compare_get_derived(self.client, endpoint, expected)
+        self._record(self.client.compare(compare_responses, response1, response2, endpoint))
+        if spot_check:
+            self._record(spot_check)
+        return response1
+
+    def _list_entry(self, find, *args) -> Optional[Dict[str, Any]]:
+        """The stored API1 list entry for a detail check, if derive_details is on."""
+        return find(*args) if self.client.derive_details else None
+
+    def check_collections_list(self) -> None:
+        logger.info("Testing GET /collections")
+        collections = self._check_list('collections')
+        if collections is None:
+            return
+
+        save_collections(collections)
+        logger.info(f"Saved {len(collections)} collections for further testing")
+
+        for collection in collections:
+            collection_name = collection.get('name')
+            if not collection_name:
+                logger.warning("Collection missing 'name' field, skipping")
+                continue
+
+            self._schedule('check_collection', collection_name)
+            if collection.get('hasBooks', True):
+                self._schedule('check_books_list', collection_name, collection.get('hasChapters', True))
+
+    def check_collection(self, collection_name: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}")
+        self._check_detail(f'collections/{collection_name}')
+
+    def check_books_list(self, collection_name: str, has_chapters: bool) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/books")
+        books = self._check_list(f'collections/{collection_name}/books')
+        if books is None:
+            return
+
+        save_books(collection_name, books)
+        logger.info(f"Saved {len(books)} books for collection {collection_name}")
+
+        for book in books[:SAMPLE_SIZE]:
+            book_number = book.get('bookNumber')
+            if not book_number:
+                logger.warning("Book missing 'bookNumber' field, skipping")
+                continue
+
+            self._schedule('check_book', collection_name, book_number)
+            if has_chapters:
+                self._schedule('check_chapters_list', collection_name, book_number)
+            self._schedule('check_hadiths_list', collection_name, book_number)
+
+    def check_book(self, collection_name: str, book_number: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}")
+        self._check_detail(f'collections/{collection_name}/books/{book_number}',
+                           self._list_entry(crawl_store.find_book, collection_name, book_number))
+
+    def check_chapters_list(self, collection_name: str, book_number: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/chapters")
+        chapters = self._check_list(f'collections/{collection_name}/books/{book_number}/chapters')
+        if chapters is None:
+            return
+
+        save_chapters(collection_name, book_number, chapters)
+        logger.info(f"Saved {len(chapters)} chapters for collection {collection_name}, book {book_number}")
+
+        for chapter in chapters[:SAMPLE_SIZE]:
+            chapter_id = chapter.get('chapterId')
+            if not chapter_id:
+                logger.warning("Chapter missing 'chapterId' field, skipping")
+                continue
+            self._schedule('check_chapter', collection_name, book_number, chapter_id)
+
+    def check_chapter(self, collection_name: str, book_number: str, chapter_id: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/chapters/{chapter_id}")
+        self._check_detail(f'collections/{collection_name}/books/{book_number}/chapters/{chapter_id}',
+                           self._list_entry(crawl_store.find_chapter, collection_name, book_number, chapter_id))
+
+    def check_hadiths_list(self, collection_name: str, book_number: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/hadiths")
+        hadiths = self._check_list(f'collections/{collection_name}/books/{book_number}/hadiths')
+        if hadiths is None:
+            return
+
+        save_hadiths(collection_name, book_number, hadiths)
+        logger.info(f"Saved {len(hadiths)} hadiths for collection {collection_name}, book {book_number}")
+
+        for hadith in hadiths[:SAMPLE_SIZE]:
+            hadith_number = hadith.get('hadithNumber')
+            if not hadith_number:
+                logger.warning("Hadith missing 'hadithNumber' field, skipping")
+                continue
+
+            self._schedule('check_hadith_by_number', collection_name, hadith_number)
+
+            # The list entry already carries the URNs, so the by-URN check
+            # doesn't have to wait for the by-number check
+            urns = [entry['urn'] for entry in hadith.get('hadith', []) if 'urn' in entry]
+            if urns:
+                self._schedule('check_hadith_by_urn', urns[0])
+
+    def check_hadith_by_number(self, collection_name: str, hadith_number: str) -> None:
+        logger.info(f"Testing GET /collections/{collection_name}/hadiths/{hadith_number}")
+        response1 = self._check_detail(f'collections/{collection_name}/hadiths/{hadith_number}',
+                                       self._list_entry(crawl_store.find_hadith, collection_name, hadith_number))
+
+        if response1.is_success() and response1.body and 'hadith' in response1.body:
+            for hadith_lang in response1.body['hadith']:
+                if 'urn' in hadith_lang:
+                    append_urn(hadith_lang['urn'], collection_name, hadith_number, hadith_lang.get('lang'))
+
+    def check_hadith_by_urn(self, urn: int) -> None:
+        logger.info(f"Testing GET /hadiths/{urn}")
+        self._check_detail(f'hadiths/{urn}')
+
+    def check_random_hadith(self, index: int) -> None:
+        logger.info(f"Random hadith test {index + 1}/{RANDOM_HADITH_CHECKS}")
+        endpoint = 'hadiths/random'
+        response1, response2 = self.client.compare_get(endpoint)
+
+        # For random hadiths, we don't compare the actual content since they're random
+        differences = []
+        if not response1.is_success():
+            differences.append(f"API1 error: {response1.status_code}")
+        if not response2.is_success():
+            differences.append(f"API2 error: {response2.status_code}")
+
+        self._task_results.results.append({
+            'endpoint': endpoint,
+            'params': 'None',
+            'status': 'FAIL' if differences else 'PASS',
+            'differences': differences
+        })
+
+
+def run_streaming_tests(client: Optional[ApiComparisonClient] = None,
+                        resume: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run all endpoint tests as a single streaming crawl, checkpointing progress.
+
+    Args:
+        client: The API comparison client (a new one is created if omitted)
+        resume: Continue from the last checkpoint instead of starting over
+
+    Returns:
+        List of test results
+    """
+    logger.info("Running streaming crawl")
+
+    client = client or ApiComparisonClient()
+    crawl = StreamingCrawl(client, checkpoint=Checkpoint())
+    results = crawl.run(resume=resume)
+
+    logger.info(f"Completed streaming crawl: {len(results)} tests run "
+                f"({crawl.scheduler.completed} tasks)")
+    return results
@@ -0,0 +1,94 @@
+"""
+Worker pool for dependency-driven crawls, where each task can schedule the
+tasks that depend on it as soon as it has finished its own work.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+from config import MAX_CONCURRENT_REQUESTS
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('task_scheduler')
+
+
+class TaskScheduler:
+    """
+    Shared worker pool that tracks outstanding tasks, including tasks
+    submitted by other tasks, so callers can wait for the whole graph.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_REQUESTS):
+        """
+        Args:
+            max_workers: Number of worker threads
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crawl')
+        self._pending = 0
+        self._completed = 0
+        self._condition = threading.Condition()
+        self.errors: List[str] = []
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Schedule a task. Safe to call from inside another task.
+
+        Args:
+            fn: The task function
+            *args: Arguments passed to fn
+        """
+        with self._condition:
+            self._pending += 1
+        self._executor.submit(self._run, fn, args)
+
+    def submit_later(self, delay: float, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Schedule a task to start in delay seconds, without holding up a worker
+        in the meantime. Safe to call from inside another task.
+
+        Args:
+            delay: Seconds to wait before the task starts
+            fn: The task function
+            *args: Arguments passed to fn
+        """
+        with self._condition:
+            self._pending += 1
+        timer = threading.Timer(delay, self._executor.submit, (self._run, fn, args))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.exception(f"Task {getattr(fn, '__name__', fn)}{args} failed")
+            self.errors.append(f"{getattr(fn, '__name__', fn)}{args}: {str(e)}")
+        finally:
+            with self._condition:
+                self._pending -= 1
+                self._completed += 1
+                if self._pending == 0:
+                    self._condition.notify_all()
+
+    @property
+    def completed(self) -> int:
+        """Number of tasks that have finished."""
+        with self._condition:
+            return self._completed
+
+    def wait(self) -> None:
+        """Block until every submitted task, and every task they spawned, has finished."""
+        with self._condition:
+            while self._pending > 0:
+                self._condition.wait()
+
+    def shutdown(self) -> None:
+        """Wait for outstanding tasks and stop the worker threads."""
+        self.wait()
+        self._executor.shutdown(wait=True)
@@ -35,8 +35,15 @@ def simulate_rate_limit_response(client, endpoint, params=None):
             def __init__(self):
                 self.status_code = 429
                 self.text = '{"error": "Rate limit exceeded"}'
+                self.content = self.text.encode('utf-8')
+                self.encoding = 'utf-8'
                 self.headers = {"Retry-After": "2"}
             
+            def iter_content(self, chunk_size=1):
+                # The client streams the body and hashes it as it arrives
+                for start in range(0, len(self.content), chunk_size):
+                    yield self.content[start:start + chunk_size]
+            
             def json(self):
                 return {"error": "Rate limit exceeded"}
         
@@ -46,6 +53,7 @@ def simulate_rate_limit_response(client, endpoint, params=None):
             mock_resp = MockResponse()
             mock_resp.status_code = 200
             mock_resp.text = '{"data": "success"}'
+            mock_resp.content = mock_resp.text.encode('utf-8')
             
             # Override the json method for the success response
             def success_json():
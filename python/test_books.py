@@ -3,15 +3,17 @@ Tests for the books endpoints.
 """
 
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from api_client import ApiComparisonClient
-from response_comparator import compare_responses, compare_paginated_responses, format_comparison_for_report
+from response_comparator import compare_responses, format_comparison_for_report
+from pagination import first_page_params, compare_first_pages, compare_remaining_pages
+from derived_details import compare_get_many_derived
 from data_store import (
     load_collections, save_books, load_books,
     save_chapters, load_chapters, save_hadiths, load_hadiths
 )
-from config import TEST_ALL_PAGES, DEFAULT_LIMIT, SAMPLE_SIZE
+from config import TEST_ALL_PAGES, SAMPLE_SIZE
 
 # Set up logging
 logging.basicConfig(
@@ -36,6 +38,8 @@ def test_books_list(client: ApiComparisonClient, results: List[Dict[str, Any]])
         logger.warning("No collections found for testing GET /collections/{collectionName}/books")
         return
     
+    # (collection_name, endpoint) pairs to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -48,35 +52,28 @@ def test_books_list(client: ApiComparisonClient, results: List[Dict[str, Any]])
             continue
         
         logger.info(f"Testing GET /collections/{collection_name}/books")
-        
-        # Test with default parameters
-        endpoint = f'collections/{collection_name}/books'
-        response1, response2 = client.compare_get(endpoint)
-        
+        targets.append((collection_name, f'collections/{collection_name}/books'))
+    
+    # Test with default parameters
+    responses = client.compare_get_many([(endpoint, first_page_params(client)) for _, endpoint in targets])
+    first_pages = compare_first_pages(client, [target[-1] for target in targets], responses)
+    
+    for (collection_name, endpoint), first_page in zip(targets, first_pages):
         # Compare responses
-        result = compare_paginated_responses(response1, response2, endpoint)
-        results.append(format_comparison_for_report(result))
+        for result in first_page.results:
+            results.append(format_comparison_for_report(result))
         
         # Save books for further testing if successful
+        response1 = first_page.response1
         if response1.is_success() and response1.body and 'data' in response1.body:
             books = response1.body['data']
             save_books(collection_name, books)
             logger.info(f"Saved {len(books)} books for collection {collection_name}")
         
         # Test pagination if enabled
-        if TEST_ALL_PAGES and response1.is_success() and response1.body and 'total' in response1.body:
-            total = response1.body['total']
-            pages = (total + DEFAULT_LIMIT - 1) // DEFAULT_LIMIT
-            
-            for page in range(2, pages + 1):
-                logger.info(f"Testing GET /collections/{collection_name}/books page {page}/{pages}")
-                
-                # Test with pagination parameters
-                params = {'page': page, 'limit': DEFAULT_LIMIT}
-                response1, response2 = client.compare_get(endpoint, params)
-                
-                # Compare responses
-                result = compare_paginated_responses(response1, response2, endpoint, params)
+        if TEST_ALL_PAGES:
+            # Fetch the remaining pages in parallel; results come back in page order
+            for result in compare_remaining_pages(client, endpoint, first_page):
                 results.append(format_comparison_for_report(result))
 
 
@@ -95,6 +92,8 @@ def test_book_by_number(client: ApiComparisonClient, results: List[Dict[str, Any
         logger.warning("No collections found for testing GET /collections/{collectionName}/books/{bookNumber}")
         return
     
+    # (endpoint, book) pairs to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -123,14 +122,17 @@ def test_book_by_number(client: ApiComparisonClient, results: List[Dict[str, Any
                 continue
             
             logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}")
-            
-            # Test the endpoint
-            endpoint = f'collections/{collection_name}/books/{book_number}'
-            response1, response2 = client.compare_get(endpoint)
-            
-            # Compare responses
-            result = compare_responses(response1, response2, endpoint)
-            results.append(format_comparison_for_report(result))
+            targets.append((f'collections/{collection_name}/books/{book_number}', book))
+    
+    # Test the endpoints (with derive_details, API1's response is its list entry)
+    responses = compare_get_many_derived(client, targets)
+    
+    for (endpoint, _), (response1, response2, spot_check) in zip(targets, responses):
+        # Compare responses
+        result = compare_responses(response1, response2, endpoint)
+        results.append(format_comparison_for_report(result))
+        if spot_check:
+            results.append(format_comparison_for_report(spot_check))
 
 
 def test_chapters_list(client: ApiComparisonClient, results: List[Dict[str, Any]]) -> None:
@@ -148,6 +150,8 @@ def test_chapters_list(client: ApiComparisonClient, results: List[Dict[str, Any]
         logger.warning("No collections found for testing GET /collections/{collectionName}/books/{bookNumber}/chapters")
         return
     
+    # (collection_name, book_number, endpoint) tuples to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -176,36 +180,30 @@ def test_chapters_list(client: ApiComparisonClient, results: List[Dict[str, Any]
                 continue
             
             logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/chapters")
-            
-            # Test with default parameters
-            endpoint = f'collections/{collection_name}/books/{book_number}/chapters'
-            response1, response2 = client.compare_get(endpoint)
-            
-            # Compare responses
-            result = compare_paginated_responses(response1, response2, endpoint)
+            targets.append((collection_name, book_number,
+                            f'collections/{collection_name}/books/{book_number}/chapters'))
+    
+    # Test with default parameters
+    responses = client.compare_get_many([(endpoint, first_page_params(client)) for _, _, endpoint in targets])
+    first_pages = compare_first_pages(client, [target[-1] for target in targets], responses)
+    
+    for (collection_name, book_number, endpoint), first_page in zip(targets, first_pages):
+        # Compare responses
+        for result in first_page.results:
             results.append(format_comparison_for_report(result))
-            
-            # Save chapters for further testing if successful
-            if response1.is_success() and response1.body and 'data' in response1.body:
-                chapters = response1.body['data']
-                save_chapters(collection_name, book_number, chapters)
-                logger.info(f"Saved {len(chapters)} chapters for collection {collection_name}, book {book_number}")
-            
-            # Test pagination if enabled
-            if TEST_ALL_PAGES and response1.is_success() and response1.body and 'total' in response1.body:
-                total = response1.body['total']
-                pages = (total + DEFAULT_LIMIT - 1) // DEFAULT_LIMIT
-                
-                for page in range(2, pages + 1):
-                    logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/chapters page {page}/{pages}")
-                    
-                    # Test with pagination parameters
-                    params = {'page': page, 'limit': DEFAULT_LIMIT}
-                    response1, response2 = client.compare_get(endpoint, params)
-                    
-                    # Compare responses
-                    result = compare_paginated_responses(response1, response2, endpoint, params)
-                    results.append(format_comparison_for_report(result))
+        
+        # Save chapters for further testing if successful
+        response1 = first_page.response1
+        if response1.is_success() and response1.body and 'data' in response1.body:
+            chapters = response1.body['data']
+            save_chapters(collection_name, book_number, chapters)
+            logger.info(f"Saved {len(chapters)} chapters for collection {collection_name}, book {book_number}")
+        
+        # Test pagination if enabled
+        if TEST_ALL_PAGES:
+            # Fetch the remaining pages in parallel; results come back in page order
+            for result in compare_remaining_pages(client, endpoint, first_page):
+                results.append(format_comparison_for_report(result))
 
 
 def test_chapter_by_id(client: ApiComparisonClient, results: List[Dict[str, Any]]) -> None:
@@ -223,6 +221,8 @@ def test_chapter_by_id(client: ApiComparisonClient, results: List[Dict[str, Any]
         logger.warning("No collections found for testing GET /collections/{collectionName}/books/{bookNumber}/chapters/{chapterId}")
         return
     
+    # (endpoint, chapter) pairs to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -267,14 +267,18 @@ def test_chapter_by_id(client: ApiComparisonClient, results: List[Dict[str, Any]
                     continue
                 
                 logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/chapters/{chapter_id}")
-                
-                # Test the endpoint
-                endpoint = f'collections/{collection_name}/books/{book_number}/chapters/{chapter_id}'
-                response1, response2 = client.compare_get(endpoint)
-                
-                # Compare responses
-                result = compare_responses(response1, response2, endpoint)
-                results.append(format_comparison_for_report(result))
+                targets.append((f'collections/{collection_name}/books/{book_number}/chapters/{chapter_id}',
+                                chapter))
+    
+    # Test the endpoints (with derive_details, API1's response is its list entry)
+    responses = compare_get_many_derived(client, targets)
+    
+    for (endpoint, _), (response1, response2, spot_check) in zip(targets, responses):
+        # Compare responses
+        result = compare_responses(response1, response2, endpoint)
+        results.append(format_comparison_for_report(result))
+        if spot_check:
+            results.append(format_comparison_for_report(spot_check))
 
 
 def test_hadiths_list(client: ApiComparisonClient, results: List[Dict[str, Any]]) -> None:
@@ -292,6 +296,8 @@ def test_hadiths_list(client: ApiComparisonClient, results: List[Dict[str, Any]]
         logger.warning("No collections found for testing GET /collections/{collectionName}/books/{bookNumber}/hadiths")
         return
     
+    # (collection_name, book_number, endpoint) tuples to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -320,48 +326,45 @@ def test_hadiths_list(client: ApiComparisonClient, results: List[Dict[str, Any]]
                 continue
             
             logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/hadiths")
-            
-            # Test with default parameters
-            endpoint = f'collections/{collection_name}/books/{book_number}/hadiths'
-            response1, response2 = client.compare_get(endpoint)
-            
-            # Compare responses
-            result = compare_paginated_responses(response1, response2, endpoint)
+            targets.append((collection_name, book_number,
+                            f'collections/{collection_name}/books/{book_number}/hadiths'))
+    
+    # Test with default parameters
+    responses = client.compare_get_many([(endpoint, first_page_params(client)) for _, _, endpoint in targets])
+    first_pages = compare_first_pages(client, [target[-1] for target in targets], responses)
+    
+    for (collection_name, book_number, endpoint), first_page in zip(targets, first_pages):
+        # Compare responses
+        for result in first_page.results:
             results.append(format_comparison_for_report(result))
-            
-            # Save hadiths for further testing if successful
-            if response1.is_success() and response1.body and 'data' in response1.body:
-                hadiths = response1.body['data']
-                save_hadiths(collection_name, book_number, hadiths)
-                logger.info(f"Saved {len(hadiths)} hadiths for collection {collection_name}, book {book_number}")
-            
-            # Test pagination if enabled
-            if TEST_ALL_PAGES and response1.is_success() and response1.body and 'total' in response1.body:
-                total = response1.body['total']
-                pages = (total + DEFAULT_LIMIT - 1) // DEFAULT_LIMIT
-                
-                for page in range(2, pages + 1):
-                    logger.info(f"Testing GET /collections/{collection_name}/books/{book_number}/hadiths page {page}/{pages}")
-                    
-                    # Test with pagination parameters
-                    params = {'page': page, 'limit': DEFAULT_LIMIT}
-                    response1, response2 = client.compare_get(endpoint, params)
-                    
-                    # Compare responses
-                    result = compare_paginated_responses(response1, response2, endpoint, params)
-                    results.append(format_comparison_for_report(result))
+        
+        # Save hadiths for further testing if successful
+        response1 = first_page.response1
+        if response1.is_success() and response1.body and 'data' in response1.body:
+            hadiths = response1.body['data']
+            save_hadiths(collection_name, book_number, hadiths)
+            logger.info(f"Saved {len(hadiths)} hadiths for collection {collection_name}, book {book_number}")
+        
+        # Test pagination if enabled
+        if TEST_ALL_PAGES:
+            # Fetch the remaining pages in parallel; results come back in page order
+            for result in compare_remaining_pages(client, endpoint, first_page):
+                results.append(format_comparison_for_report(result))
 
 
-def run_books_tests() -> List[Dict[str, Any]]:
+def run_books_tests(client: Optional[ApiComparisonClient] = None) -> List[Dict[str, Any]]:
     """
     Run all tests for the books endpoints.
     
+    Args:
+        client: The API comparison client (a new one is created if omitted)
+    
     Returns:
         List of test results
     """
     logger.info("Running books tests")
     
-    client = ApiComparisonClient()
+    client = client or ApiComparisonClient()
     results = []
     
     # Test GET /collections/{collectionName}/books
@@ -3,12 +3,13 @@ Tests for the collections endpoints.
 """
 
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from api_client import ApiComparisonClient
-from response_comparator import compare_responses, compare_paginated_responses, format_comparison_for_report
+from response_comparator import compare_responses, format_comparison_for_report
+from pagination import first_page_params, compare_first_page, compare_remaining_pages
 from data_store import save_collections, load_collections
-from config import TEST_ALL_PAGES, DEFAULT_LIMIT
+from config import TEST_ALL_PAGES
 
 # Set up logging
 logging.basicConfig(
@@ -29,32 +30,24 @@ def test_collections_list(client: ApiComparisonClient, results: List[Dict[str, A
     logger.info("Testing GET /collections")
     
     # Test with default parameters
-    response1, response2 = client.compare_get('collections')
+    response1, response2 = client.compare_get('collections', first_page_params(client))
     
     # Compare responses
-    result = compare_paginated_responses(response1, response2, 'collections')
-    results.append(format_comparison_for_report(result))
+    first_page = compare_first_page(client, 'collections', response1, response2)
+    for result in first_page.results:
+        results.append(format_comparison_for_report(result))
     
     # Save collections for further testing if successful
+    response1 = first_page.response1
     if response1.is_success() and response1.body and 'data' in response1.body:
         collections = response1.body['data']
         save_collections(collections)
         logger.info(f"Saved {len(collections)} collections for further testing")
     
     # Test pagination if enabled
-    if TEST_ALL_PAGES and response1.is_success() and response1.body and 'total' in response1.body:
-        total = response1.body['total']
-        pages = (total + DEFAULT_LIMIT - 1) // DEFAULT_LIMIT
-        
-        for page in range(2, pages + 1):
-            logger.info(f"Testing GET /collections page {page}/{pages}")
-            
-            # Test with pagination parameters
-            params = {'page': page, 'limit': DEFAULT_LIMIT}
-            response1, response2 = client.compare_get('collections', params)
-            
-            # Compare responses
-            result = compare_paginated_responses(response1, response2, 'collections', params)
+    if TEST_ALL_PAGES:
+        # Fetch the remaining pages in parallel; results come back in page order
+        for result in compare_remaining_pages(client, 'collections', first_page):
             results.append(format_comparison_for_report(result))
 
 
@@ -73,6 +66,7 @@ def test_collection_by_name(client: ApiComparisonClient, results: List[Dict[str,
         logger.warning("No collections found for testing GET /collections/{collectionName}")
         return
     
+    endpoints = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -80,25 +74,28 @@ def test_collection_by_name(client: ApiComparisonClient, results: List[Dict[str,
             continue
         
         logger.info(f"Testing GET /collections/{collection_name}")
-        
-        # Test the endpoint
-        response1, response2 = client.compare_get(f'collections/{collection_name}')
-        
-        # Compare responses
-        result = compare_responses(response1, response2, f'collections/{collection_name}')
+        endpoints.append(f'collections/{collection_name}')
+    
+    # Test the endpoints, comparing each pair of responses as it arrives
+    comparisons = client.compare_get_many([(endpoint, None) for endpoint in endpoints], compare_responses)
+    
+    for result in comparisons:
         results.append(format_comparison_for_report(result))
 
 
-def run_collections_tests() -> List[Dict[str, Any]]:
+def run_collections_tests(client: Optional[ApiComparisonClient] = None) -> List[Dict[str, Any]]:
     """
     Run all tests for the collections endpoints.
     
+    Args:
+        client: The API comparison client (a new one is created if omitted)
+    
     Returns:
         List of test results
     """
     logger.info("Running collections tests")
     
-    client = ApiComparisonClient()
+    client = client or ApiComparisonClient()
     results = []
     
     # Test GET /collections
@@ -4,13 +4,14 @@ Tests for the hadiths endpoints.
 
 import logging
 import random
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from api_client import ApiComparisonClient
 from response_comparator import compare_responses, format_comparison_for_report
+from derived_details import compare_get_many_derived
 from data_store import (
     load_collections, load_books, load_hadiths,
-    save_urns, load_urns, append_urn
+    append_urn, urn_index
 )
 from config import SAMPLE_SIZE
 
@@ -37,6 +38,8 @@ def test_hadith_by_number(client: ApiComparisonClient, results: List[Dict[str, A
         logger.warning("No collections found for testing GET /collections/{collectionName}/hadiths/{hadithNumber}")
         return
     
+    # (collection_name, hadith_number, endpoint, hadith) tuples to test
+    targets = []
     for collection in collections:
         collection_name = collection.get('name')
         if not collection_name:
@@ -76,21 +79,25 @@ def test_hadith_by_number(client: ApiComparisonClient, results: List[Dict[str, A
                     continue
                 
                 logger.info(f"Testing GET /collections/{collection_name}/hadiths/{hadith_number}")
-                
-                # Test the endpoint
-                endpoint = f'collections/{collection_name}/hadiths/{hadith_number}'
-                response1, response2 = client.compare_get(endpoint)
-                
-                # Compare responses
-                result = compare_responses(response1, response2, endpoint)
-                results.append(format_comparison_for_report(result))
-                
-                # Extract and save URNs for further testing
-                if response1.is_success() and response1.body and 'hadith' in response1.body:
-                    for hadith_lang in response1.body['hadith']:
-                        if 'urn' in hadith_lang:
-                            append_urn(hadith_lang['urn'])
-                            logger.info(f"Saved URN {hadith_lang['urn']} for further testing")
+                targets.append((collection_name, hadith_number,
+                                f'collections/{collection_name}/hadiths/{hadith_number}', hadith))
+    
+    # Test the endpoints (with derive_details, API1's response is its list entry)
+    responses = compare_get_many_derived(client, [(endpoint, hadith) for _, _, endpoint, hadith in targets])
+    
+    for (collection_name, hadith_number, endpoint, _), (response1, response2, spot_check) in zip(targets, responses):
+        # Compare responses
+        result = compare_responses(response1, response2, endpoint)
+        results.append(format_comparison_for_report(result))
+        if spot_check:
+            results.append(format_comparison_for_report(spot_check))
+        
+        # Extract and save URNs for further testing
+        if response1.is_success() and response1.body and 'hadith' in response1.body:
+            for hadith_lang in response1.body['hadith']:
+                if 'urn' in hadith_lang:
+                    if append_urn(hadith_lang['urn'], collection_name, hadith_number, hadith_lang.get('lang')):
+                        logger.info(f"Saved URN {hadith_lang['urn']} for further testing")
 
 
 def test_hadith_by_urn(client: ApiComparisonClient, results: List[Dict[str, Any]]) -> None:
@@ -101,25 +108,21 @@ def test_hadith_by_urn(client: ApiComparisonClient, results: List[Dict[str, Any]
         client: The API comparison client
         results: List to append test results to
     """
-    # Load URNs from previous tests
-    urns = load_urns()
+    # Pick a sample of URNs from previous tests, spread across collections
+    sample = urn_index.sample(SAMPLE_SIZE)
     
-    if not urns:
+    if not sample:
         logger.warning("No URNs found for testing GET /hadiths/{urn}")
         return
     
-    # Test a sample of URNs
-    sample = urns[:SAMPLE_SIZE] if len(urns) > SAMPLE_SIZE else urns
-    
     for urn in sample:
         logger.info(f"Testing GET /hadiths/{urn}")
-        
-        # Test the endpoint
-        endpoint = f'hadiths/{urn}'
-        response1, response2 = client.compare_get(endpoint)
-        
-        # Compare responses
-        result = compare_responses(response1, response2, endpoint)
+    
+    # Test the endpoints, comparing each pair of responses as it arrives
+    endpoints = [f'hadiths/{urn}' for urn in sample]
+    comparisons = client.compare_get_many([(endpoint, None) for endpoint in endpoints], compare_responses)
+    
+    for result in comparisons:
         results.append(format_comparison_for_report(result))
 
 
@@ -134,13 +137,12 @@ def test_random_hadith(client: ApiComparisonClient, results: List[Dict[str, Any]
     logger.info("Testing GET /hadiths/random")
     
     # Test the endpoint multiple times to ensure randomness
-    for i in range(3):
+    endpoint = 'hadiths/random'
+    responses = client.compare_get_many([(endpoint, None)] * 3)
+    
+    for i, (response1, response2) in enumerate(responses):
         logger.info(f"Random hadith test {i+1}/3")
         
-        # Test the endpoint
-        endpoint = 'hadiths/random'
-        response1, response2 = client.compare_get(endpoint)
-        
         # For random hadiths, we don't compare the actual content since they're random
         # We just check that both APIs return valid responses
         if response1.is_success() and response2.is_success():
@@ -172,20 +174,24 @@ def test_random_hadith(client: ApiComparisonClient, results: List[Dict[str, Any]
         if response1.is_success() and response1.body and 'hadith' in response1.body:
             for hadith_lang in response1.body['hadith']:
                 if 'urn' in hadith_lang:
-                    append_urn(hadith_lang['urn'])
-                    logger.info(f"Saved URN {hadith_lang['urn']} from random hadith for further testing")
+                    if append_urn(hadith_lang['urn'], response1.body.get('collection'),
+                                  response1.body.get('hadithNumber'), hadith_lang.get('lang')):
+                        logger.info(f"Saved URN {hadith_lang['urn']} from random hadith for further testing")
 
 
-def run_hadiths_tests() -> List[Dict[str, Any]]:
+def run_hadiths_tests(client: Optional[ApiComparisonClient] = None) -> List[Dict[str, Any]]:
     """
     Run all tests for the hadiths endpoints.
     
+    Args:
+        client: The API comparison client (a new one is created if omitted)
+    
     Returns:
         List of test results
     """
     logger.info("Running hadiths tests")
     
-    client = ApiComparisonClient()
+    client = client or ApiComparisonClient()
     results = []
     
     # Test GET /collections/{collectionName}/hadiths/{hadithNumber}
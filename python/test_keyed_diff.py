@@ -0,0 +1,50 @@
+"""
+Test script for type changes in keyed_diff, checked against DeepDiff.
+"""
+
+from deepdiff import DeepDiff
+
+from keyed_diff import keyed_diff
+
+
+def check_type_changes(name, old, new, expected):
+    """
+    Check that keyed_diff reports exactly the expected type changes, and
+    that DeepDiff(ignore_order=True) sees a difference whenever it does.
+    """
+    print(f"Checking type changes: {name}")
+
+    diff = keyed_diff(old, new)
+    changed = set(diff.get('type_changes', {}))
+    print(f"keyed_diff type changes: {sorted(changed)}")
+
+    assert changed == expected, f"{name}: expected {sorted(expected)}"
+    assert not diff.keys() - {'type_changes'}, f"{name}: unexpected differences {diff}"
+    assert bool(DeepDiff(old, new, ignore_order=True)) == bool(expected), f"{name}: DeepDiff disagrees"
+
+
+def main():
+    """
+    Main function to run the test.
+    """
+    print("Testing type changes in keyed_diff...")
+
+    # bool, int and float inside hadith list items, which == takes as equal
+    old = {'data': [{'hadithNumber': '1', 'x': 1, 'f': True, 'hadith': [{'urn': 10, 'grade': 1.0}]},
+                    {'hadithNumber': '2', 'x': 2, 'f': False}]}
+    new = {'data': [{'hadithNumber': '2', 'x': 2, 'f': 0},
+                    {'hadithNumber': '1', 'x': 1.0, 'f': 1, 'hadith': [{'urn': 10, 'grade': True}]}]}
+    check_type_changes("hadith list items", old, new, {
+        "root['data'][hadithNumber='1']['x']",
+        "root['data'][hadithNumber='1']['f']",
+        "root['data'][hadithNumber='1']['hadith'][urn=10]['grade']",
+        "root['data'][hadithNumber='2']['f']"
+    })
+    check_type_changes("top-level object", {'x': True}, {'x': 1}, {"root['x']"})
+    check_type_changes("unkeyed list", [1, 2], [1.0, 2], {"root[0]"})
+    check_type_changes("equal values", old, old, set())
+
+    print("Test completed.")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Script to view failed endpoints from the failed_endpoints.json file.
+Script to view failed endpoints from the failed_endpoints.jsonl file.
 """
 
 import os
@@ -44,16 +44,24 @@ def parse_args():
 
 
 def load_failed_endpoints():
-    """Load failed endpoints from the JSON file."""
-    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.json')
+    """Load failed endpoints from the line-delimited JSON log."""
+    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.jsonl')
     
     if not os.path.exists(filepath):
         print(f"No failed endpoints file found at {filepath}")
         return []
     
+    failed_endpoints = []
     try:
         with open(filepath, 'r') as f:
-            failed_endpoints = json.load(f)
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    failed_endpoints.append(json.loads(line))
+                except ValueError:
+                    print(f"Skipping malformed line {line_number} in {filepath}")
         return failed_endpoints
     except Exception as e:
         print(f"Error loading failed endpoints: {str(e)}")
@@ -62,12 +70,11 @@ def load_failed_endpoints():
 
 def clear_failed_endpoints():
     """Clear the failed endpoints file."""
-    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.json')
+    filepath = os.path.join(OUTPUT_DIR, 'failed_endpoints.jsonl')
     
     if os.path.exists(filepath):
         try:
-            with open(filepath, 'w') as f:
-                json.dump([], f)
+            open(filepath, 'w').close()
             print(f"Cleared failed endpoints file at {filepath}")
         except Exception as e:
             print(f"Error clearing failed endpoints: {str(e)}")